@@ -1,8 +1,8 @@
 import tkinter as tk
 from tkinter import ttk
-from PIL import Image, ImageTk  # For handling the background image
 from network.path import PathFinder
 from tube.map import TubeMap
+from tube.mapview import MapView
 
 
 def get_tubemap():
@@ -21,50 +21,135 @@ def find_shortest_path():
         result_label.config(text="Please enter both stations.")
         return
 
+    # Understand misspelt names, e.g. "Picadilly Circus"
+    start_name = tubemap.name_index.resolve(start_station)
+    end_name = tubemap.name_index.resolve(end_station)
+    if start_name is None or end_name is None:
+        unknown = start_station if start_name is None else end_station
+        suggestions = tubemap.name_index.suggest(unknown, limit=3)
+        if suggestions:
+            result_label.config(text=f"Unknown station: {unknown}. Did you mean {' / '.join(suggestions)}?")
+        else:
+            result_label.config(text=f"Unknown station: {unknown}")
+        return
+
     try:
-        stations = path_finder.get_shortest_path(start_station, end_station)
-        station_names = [station.name for station in stations]
-        result_label.config(text=" -> ".join(station_names))
+        route = path_finder.get_shortest_path(start_name, end_name)
+        if route is None:
+            result_label.config(text="No route found.")
+            return
+        result_label.config(text=f"{' -> '.join(route.names)} ({route.total_time:g} min)")
+        map_view.show_route(route)
     except Exception as e:
         result_label.config(text=f"Error: {str(e)}")
 
 
+def show_suggestions(entry):
+    """Callback function to list the station names completing an entry"""
+    suggestions = tubemap.name_index.suggest(entry.get(), limit=5)
+    suggestion_list.delete(0, tk.END)
+    for name in suggestions:
+        suggestion_list.insert(tk.END, name)
+
+    if suggestions and entry.get().strip():
+        suggestion_list.target = entry
+        suggestion_list.config(height=len(suggestions))
+        suggestion_list.place(x=entry.winfo_rootx() - root.winfo_rootx(),
+                              y=entry.winfo_rooty() - root.winfo_rooty() + entry.winfo_height())
+        suggestion_list.lift()
+    else:
+        suggestion_list.place_forget()
+
+
+def accept_suggestion(event=None):
+    """Callback function to fill the entry with the selected suggestion"""
+    selection = suggestion_list.curselection()
+    if not selection or suggestion_list.target is None:
+        return
+    entry = suggestion_list.target
+    entry.delete(0, tk.END)
+    entry.insert(0, suggestion_list.get(selection[0]))
+    suggestion_list.place_forget()
+    entry.focus_set()
+
+
 # Initialize the TubeMap and PathFinder
 tubemap = get_tubemap()
 path_finder = PathFinder(tubemap)
 
+def start_pan(event):
+    """Callback function to remember where the map is grabbed"""
+    map_canvas.last_position = (event.x, event.y)
+
+
+def pan_map(event):
+    """Callback function to drag the map"""
+    x, y = map_canvas.last_position
+    map_view.pan(event.x - x, event.y - y)
+    map_canvas.last_position = (event.x, event.y)
+
+
+def zoom_map(event):
+    """Callback function to zoom with the mouse wheel"""
+    zoom_in = event.num == 4 or event.delta > 0
+    map_view.zoom(1.25 if zoom_in else 0.8, event.x, event.y)
+
+
+def resize_map(event):
+    """Callback function to fit the map when the window is resized"""
+    if (event.width, event.height) != map_canvas.last_size:
+        map_canvas.last_size = (event.width, event.height)
+        map_view.fit()
+
+
 # Create the GUI
 root = tk.Tk()
 root.title("Tube Shortest Path Finder")
-root.geometry("600x400")
-
-# Add a background image
-background_image = Image.open("images/background_img.jpg")  # Replace with your image path
-background_image = background_image.resize((600, 400))
-bg_image = ImageTk.PhotoImage(background_image)
-bg_label = tk.Label(root, image=bg_image)
-bg_label.place(relwidth=1, relheight=1)
+root.geometry("900x700")
 
 # Add input fields
-label_start = ttk.Label(root, text="Start Station:", background="#ffffff")
-label_start.place(x=150, y=100)
+controls = ttk.Frame(root, padding=10)
+controls.pack(side=tk.TOP, fill=tk.X)
+
+label_start = ttk.Label(controls, text="Start Station:")
+label_start.grid(row=0, column=0, sticky="w", padx=5)
 
-entry_start = ttk.Entry(root, width=30)
-entry_start.place(x=250, y=100)
+entry_start = ttk.Entry(controls, width=30)
+entry_start.grid(row=0, column=1, padx=5)
 
-label_end = ttk.Label(root, text="End Station:", background="#ffffff")
-label_end.place(x=150, y=150)
+label_end = ttk.Label(controls, text="End Station:")
+label_end.grid(row=0, column=2, sticky="w", padx=5)
 
-entry_end = ttk.Entry(root, width=30)
-entry_end.place(x=250, y=150)
+entry_end = ttk.Entry(controls, width=30)
+entry_end.grid(row=0, column=3, padx=5)
 
 # Add a button
-find_button = ttk.Button(root, text="Find Shortest Path", command=find_shortest_path)
-find_button.place(x=250, y=200)
+find_button = ttk.Button(controls, text="Find Shortest Path", command=find_shortest_path)
+find_button.grid(row=0, column=4, padx=5)
 
 # Add a result label
-result_label = ttk.Label(root, text="", wraplength=500, background="#ffffff")
-result_label.place(x=50, y=250)
+result_label = ttk.Label(controls, text="", wraplength=850)
+result_label.grid(row=1, column=0, columnspan=5, sticky="w", pady=(10, 0))
+
+# Geographic map of the network, with the route drawn over it
+map_canvas = tk.Canvas(root, width=900, height=600, background="white", highlightthickness=0)
+map_canvas.pack(side=tk.TOP, fill=tk.BOTH, expand=True)
+map_canvas.last_position = (0, 0)
+map_canvas.last_size = None
+map_view = MapView(map_canvas, tubemap)
+map_canvas.bind("<Configure>", resize_map)
+map_canvas.bind("<ButtonPress-1>", start_pan)
+map_canvas.bind("<B1-Motion>", pan_map)
+map_canvas.bind("<MouseWheel>", zoom_map)  # Windows and macOS
+map_canvas.bind("<Button-4>", zoom_map)  # Linux
+map_canvas.bind("<Button-5>", zoom_map)
+
+# As-you-type completion of the station names
+suggestion_list = tk.Listbox(root, width=30, height=5)
+suggestion_list.target = None
+suggestion_list.bind("<<ListboxSelect>>", accept_suggestion)
+for entry in (entry_start, entry_end):
+    entry.bind("<KeyRelease>", lambda event, entry=entry: show_suggestions(entry))
 
 # Run the main loop
 root.mainloop()
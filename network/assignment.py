@@ -0,0 +1,254 @@
+from array import array
+
+# Assignment methods
+ASSIGNMENT_METHODS = ("all_or_nothing", "incremental", "msa")
+
+
+class AssignmentResult:
+    """ Passenger flows obtained by loading a demand matrix on the network.
+
+    Attributes:
+        arc_flows (list[float]) : trips on every arc of the CompactGraph
+        connection_flows (list[float]) : trips on every Connection (both
+            directions), indexed like tubemap.connections
+        boardings (list[float]) : trips boarding a line at every station
+            (at the origin, or when changing lines), by station index
+        alightings (list[float]) : trips leaving a line at every station (at
+            the destination, or when changing lines), by station index
+        assigned_trips (float) : trips that could be routed
+        unassigned_trips (float) : trips between disconnected stations
+        total_travel_time (float) : sum of trips x travel time
+    """
+
+    def __init__(self, graph, connection_count):
+        self.graph = graph
+        self.arc_flows = [0.0] * graph.arc_count
+        self.connection_flows = [0.0] * connection_count
+        self.boardings = [0.0] * graph.station_count
+        self.alightings = [0.0] * graph.station_count
+        self.assigned_trips = 0.0
+        self.unassigned_trips = 0.0
+        self.total_travel_time = 0.0
+
+
+    def station_boardings(self, station_id):
+        return self.boardings[self.graph.station_index[station_id]]
+
+    def station_alightings(self, station_id):
+        return self.alightings[self.graph.station_index[station_id]]
+
+
+    def blend(self, other, step):
+        """ Move this result towards `other` by `step` (method of successive averages). """
+        for name in ("arc_flows", "connection_flows", "boardings", "alightings"):
+            values, other_values = getattr(self, name), getattr(other, name)
+            for index, value in enumerate(other_values):
+                values[index] += step * (value - values[index])
+        for name in ("assigned_trips", "unassigned_trips", "total_travel_time"):
+            setattr(self, name, getattr(self, name) + step * (getattr(other, name) - getattr(self, name)))
+
+
+class FlowAssignment:
+    """ Assign an origin-destination demand matrix to the network.
+
+    For every origin, one shortest-path tree is computed and all the trips
+    from that origin are accumulated down the tree in a single pass over the
+    stations in decreasing distance order: a station passes its own demand
+    plus everything it received from its descendants to its parent arc. The
+    cost is one search per origin, whatever the number of destinations.
+
+    Besides all-or-nothing, congestion-aware variants reweight the arcs with
+    the BPR function t = t0 * (1 + alpha * (flow / capacity) ** beta):
+    - "incremental" loads the demand in equal slices, reweighting in between
+    - "msa" repeats all-or-nothing on the reweighted network and averages
+      the successive solutions (method of successive averages)
+    """
+
+    def __init__(self, path_finder, capacity=None, alpha=0.15, beta=4):
+        """
+        Args:
+            path_finder (PathFinder) : provides the graph and the engine
+            capacity (float or dict) : capacity of an arc (trips), either one
+                value for every arc or a dict keyed by line id. Only used by
+                the congestion-aware methods.
+            alpha (float) : BPR alpha parameter
+            beta (float) : BPR beta parameter
+        """
+        self.path_finder = path_finder
+        self.graph = path_finder.compact_graph
+        self.engine = path_finder.engine
+        self.connection_count = len(path_finder.tubemap.connections)
+        self.alpha = alpha
+        self.beta = beta
+
+        if isinstance(capacity, dict):
+            self.capacities = [float(capacity.get(self.graph.lines[line].id, float('inf')))
+                               for line in self.graph.arc_line]
+        else:
+            self.capacities = [float('inf') if capacity is None else float(capacity)] * self.graph.arc_count
+
+
+    def assign(self, demand, method="all_or_nothing", iterations=4):
+        """ Load a demand matrix on the network.
+
+        Args:
+            demand (dict or matrix) : either a dict {(origin id, destination
+                id): trips}, or a square matrix (list of rows, or 2D NumPy
+                array) of trips indexed by station index
+            method (str) : "all_or_nothing", "incremental" or "msa"
+            iterations (int) : slices (incremental) or iterations (msa)
+
+        Returns:
+            AssignmentResult : flows, boardings and alightings.
+
+        Raises:
+            ValueError : if method is unknown.
+        """
+        if method not in ASSIGNMENT_METHODS:
+            raise ValueError(f"Unknown assignment method {method!r}, expected one of {ASSIGNMENT_METHODS}.")
+
+        rows = self.demand_rows(demand)
+
+        if method == "all_or_nothing":
+            return self.all_or_nothing(rows)
+
+        if method == "incremental":
+            result = AssignmentResult(self.graph, self.connection_count)
+            weights = None
+            for _ in range(iterations):
+                scaled = {origin: {destination: trips / iterations for destination, trips in row.items()}
+                          for origin, row in rows.items()}
+                self.add(result, self.all_or_nothing(scaled, weights))
+                weights = self.congested_weights(result.arc_flows)
+            return result
+
+        # Method of successive averages
+        result = self.all_or_nothing(rows)
+        for iteration in range(2, iterations + 1):
+            weights = self.congested_weights(result.arc_flows)
+            result.blend(self.all_or_nothing(rows, weights), 1 / iteration)
+        return result
+
+
+    def demand_rows(self, demand):
+        """ Normalise the demand to {origin index: {destination index: trips}}. """
+        station_index = self.graph.station_index
+        rows = {}
+        if isinstance(demand, dict):
+            for (origin_id, destination_id), trips in demand.items():
+                origin, destination = station_index.get(origin_id), station_index.get(destination_id)
+                if origin is None or destination is None or not trips:
+                    continue
+                row = rows.setdefault(origin, {})
+                row[destination] = row.get(destination, 0) + trips
+            return rows
+
+        for origin, row in enumerate(demand):
+            entries = {destination: float(trips) for destination, trips in enumerate(row) if trips}
+            if entries:
+                rows[origin] = entries
+        return rows
+
+
+    def all_or_nothing(self, rows, weights=None):
+        """ Load every trip on one shortest path per origin.
+
+        Args:
+            rows (dict) : {origin index: {destination index: trips}}
+            weights (array) : arc weights (None for the scheduled times)
+
+        Returns:
+            AssignmentResult : flows, boardings and alightings.
+        """
+        graph = self.graph
+        arc_tail, arc_line, arc_connection = graph.arc_tail, graph.arc_line, graph.arc_connection
+        result = AssignmentResult(graph, self.connection_count)
+        arc_flows, boardings, alightings = result.arc_flows, result.boardings, result.alightings
+
+        load = [0.0] * graph.station_count
+        for origin, row in rows.items():
+            tree = self.engine.search({origin: 0}, weights=weights)
+            distances, previous = tree.distances, tree.previous
+
+            # Trips ending at every destination
+            for destination, trips in row.items():
+                if destination == origin:
+                    continue
+                if distances[destination] == float('inf'):
+                    result.unassigned_trips += trips
+                    continue
+                load[destination] += trips
+                alightings[destination] += trips
+                result.assigned_trips += trips
+                result.total_travel_time += trips * distances[destination]
+
+            # Single reverse pass: children are farther than their parents, or
+            # as far (zero-time arcs) but deeper in the tree
+            reached = [index for index in range(graph.station_count) if load[index] or previous[index] >= 0]
+            depths = self.tree_depths(previous, reached)
+            reached.sort(key=lambda index: (distances[index], depths[index]), reverse=True)
+            for station in reached:
+                trips = load[station]
+                arc = previous[station]
+                if not trips or arc < 0:
+                    continue
+                load[station] = 0.0
+                arc_flows[arc] += trips
+
+                parent = arc_tail[arc]
+                load[parent] += trips
+                # Trips board at the origin, or change lines at the parent
+                parent_arc = previous[parent]
+                if parent == origin or arc_line[parent_arc] != arc_line[arc]:
+                    boardings[parent] += trips
+                    if parent != origin:
+                        alightings[parent] += trips
+
+            load[origin] = 0.0
+
+        for arc, flow in enumerate(arc_flows):
+            if flow:
+                result.connection_flows[arc_connection[arc]] += flow
+        return result
+
+
+    def tree_depths(self, previous, stations):
+        """ Number of arcs from the origin of a search tree to `stations`.
+
+        Returns:
+            dict : key: station index, value: depth (0 for the origin).
+        """
+        arc_tail = self.graph.arc_tail
+        depths = {}
+        for station in stations:
+            # Walk up to the origin or to a station of known depth
+            path = []
+            current = station
+            while current not in depths and previous[current] >= 0:
+                path.append(current)
+                current = arc_tail[previous[current]]
+            depth = depths.setdefault(current, 0)
+            for index in reversed(path):
+                depth += 1
+                depths[index] = depth
+        return depths
+
+
+    def congested_weights(self, arc_flows):
+        """ BPR travel times of every arc for the given flows. """
+        return array('d', [
+            time * (1 + self.alpha * (flow / capacity) ** self.beta) if capacity != float('inf') else time
+            for time, flow, capacity in zip(self.graph.arc_time, arc_flows, self.capacities)
+        ])
+
+
+    @staticmethod
+    def add(result, other):
+        """ Add the flows of `other` to `result`. """
+        for name in ("arc_flows", "connection_flows", "boardings", "alightings"):
+            values = getattr(result, name)
+            for index, value in enumerate(getattr(other, name)):
+                values[index] += value
+        result.assigned_trips += other.assigned_trips
+        result.unassigned_trips += other.unassigned_trips
+        result.total_travel_time += other.total_travel_time
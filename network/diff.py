@@ -0,0 +1,394 @@
+import heapq
+import sys
+from tube.map import TubeMap
+from network.engines import SearchResult
+from network.path import PathFinder
+
+
+def connection_times(tubemap):
+    """ Index the connections of a TubeMap.
+
+    Returns:
+        dict : key: (tuple of the two sorted station ids, line id), value:
+            travel time (the fastest one if the connection is duplicated).
+    """
+    times = {}
+    for connection in tubemap.connections:
+        key = (tuple(sorted(station.id for station in connection.stations)), connection.line.id)
+        times[key] = min(times.get(key, float('inf')), connection.time)
+    return times
+
+
+class NetworkDiff:
+    """ Structural differences between two versions of a TubeMap.
+
+    Attributes:
+        added_stations, removed_stations (list[str]) : station ids
+        renamed_stations (dict) : key: station id, value: (old name, new name)
+        added_lines, removed_lines (list[str]) : line ids
+        added_connections, removed_connections (dict) : key: connection key
+            (see connection_times), value: travel time
+        changed_connections (dict) : key: connection key, value: (old time,
+            new time)
+    """
+
+    def __init__(self, old_tubemap, new_tubemap):
+        old_stations, new_stations = old_tubemap.stations, new_tubemap.stations
+        self.added_stations = sorted(new_stations.keys() - old_stations.keys())
+        self.removed_stations = sorted(old_stations.keys() - new_stations.keys())
+        self.renamed_stations = {
+            station_id: (old_stations[station_id].name, new_stations[station_id].name)
+            for station_id in sorted(old_stations.keys() & new_stations.keys())
+            if old_stations[station_id].name != new_stations[station_id].name
+        }
+        self.added_lines = sorted(new_tubemap.lines.keys() - old_tubemap.lines.keys())
+        self.removed_lines = sorted(old_tubemap.lines.keys() - new_tubemap.lines.keys())
+
+        old_connections, new_connections = connection_times(old_tubemap), connection_times(new_tubemap)
+        self.added_connections = {key: time for key, time in new_connections.items()
+                                  if key not in old_connections}
+        self.removed_connections = {key: time for key, time in old_connections.items()
+                                    if key not in new_connections}
+        self.changed_connections = {key: (old_connections[key], time) for key, time in new_connections.items()
+                                    if key in old_connections and old_connections[key] != time}
+
+
+    def is_empty(self):
+        return not (self.added_stations or self.removed_stations or self.renamed_stations
+                    or self.added_lines or self.removed_lines or self.added_connections
+                    or self.removed_connections or self.changed_connections)
+
+
+    def worsened_connections(self):
+        """ Connections removed or slowed down, with their old time.
+
+        Returns:
+            list[tuple(tuple(str, str), float)] : (station ids, old time)
+        """
+        worsened = [(station_ids, time) for (station_ids, _), time in self.removed_connections.items()]
+        worsened += [(station_ids, old_time) for (station_ids, _), (old_time, new_time)
+                     in self.changed_connections.items() if new_time > old_time]
+        return worsened
+
+
+    def improved_connections(self):
+        """ Connections added or sped up, with their new time.
+
+        Returns:
+            list[tuple(tuple(str, str), float)] : (station ids, new time)
+        """
+        improved = [(station_ids, time) for (station_ids, _), time in self.added_connections.items()]
+        improved += [(station_ids, new_time) for (station_ids, _), (old_time, new_time)
+                     in self.changed_connections.items() if new_time < old_time]
+        return improved
+
+
+    def summary(self):
+        return {name: len(getattr(self, name)) for name in (
+            "added_stations", "removed_stations", "renamed_stations", "added_lines", "removed_lines",
+            "added_connections", "removed_connections", "changed_connections")}
+
+
+class JourneyChange:
+    """ A journey whose travel time or path differs between two versions.
+
+    Attributes:
+        start_id, end_id (str) : station ids
+        old_time, new_time (float) : travel times (inf if unreachable)
+        old_route, new_route (Route) : shortest paths (None if unreachable)
+    """
+
+    def __init__(self, start_id, end_id, old_time, new_time, old_route, new_route):
+        self.start_id = start_id
+        self.end_id = end_id
+        self.old_time = old_time
+        self.new_time = new_time
+        self.old_route = old_route
+        self.new_route = new_route
+
+    @property
+    def delta(self):
+        return self.new_time - self.old_time
+
+    def __repr__(self):
+        return f"JourneyChange({self.start_id}->{self.end_id}, {self.old_time:g} -> {self.new_time:g})"
+
+
+class NetworkComparison:
+    """ Find the journeys that changed between two versions of the network.
+
+    Instead of comparing two all-pairs runs, only the origins whose journey
+    times a changed connection can affect are searched again. If the time
+    from origin o to station x changed, then so did the time from o to one
+    end v of a changed connection: take a shortest path (in the version where
+    o -> x is faster) and v the end of its last changed connection, the rest
+    of the path is the same in both versions. The graph is undirected, so
+    one search from v in each version gives d(o, v) for every origin o.
+
+    Only the old shortest-path tree of an affected origin is searched. Its
+    new tree is repaired from it: the stations reached through a removed or
+    slowed arc lose their distance, and a Dijkstra seeded with the stations
+    that can now improve a neighbour (around those stations and at the
+    tails of added or faster arcs) fixes the rest. When the old tree uses
+    no changed arc and no new arc helps, that costs one pass over the arcs.
+
+    Every time change is found. Path changes at equal time are also reported
+    for the origins that were searched again.
+    """
+
+    def __init__(self, old_tubemap, new_tubemap, engine="python"):
+        """
+        Args:
+            old_tubemap (TubeMap) : current version of the network
+            new_tubemap (TubeMap) : version to compare it with
+            engine (str) : routing engine used by both PathFinders
+        """
+        self.diff = NetworkDiff(old_tubemap, new_tubemap)
+        self.old_path_finder = PathFinder(old_tubemap, engine=engine)
+        self.new_path_finder = PathFinder(new_tubemap, engine=engine)
+        self.stats = {"searches": 0, "repairs": 0, "affected_origins": 0, "changed_journeys": 0}
+        self._matching = None
+
+
+    @classmethod
+    def from_files(cls, old_filepath, new_filepath, engine="python"):
+        """ Compare two versions of a network JSON file (see TubeMap.import_from_json). """
+        old_tubemap, new_tubemap = TubeMap(), TubeMap()
+        old_tubemap.import_from_json(old_filepath)
+        new_tubemap.import_from_json(new_filepath)
+        return cls(old_tubemap, new_tubemap, engine=engine)
+
+
+    def distances_from(self, path_finder, station_id):
+        """ Distances from a station to every station, keyed by station id. """
+        graph = path_finder.compact_graph
+        self.stats["searches"] += 1
+        distances = path_finder.engine.search({graph.station_index[station_id]: 0}).distances
+        return dict(zip((station.id for station in graph.stations), distances))
+
+
+    def affected_origins(self):
+        """ Return the ids of the stations whose journey times may have changed.
+
+        Only the stations present in both versions are considered.
+        """
+        old_index = self.old_path_finder.compact_graph.station_index
+        new_index = self.new_path_finder.compact_graph.station_index
+        common = [station_id for station_id in old_index if station_id in new_index]
+
+        ends = {station_id for station_ids, _ in self.diff.worsened_connections() + self.diff.improved_connections()
+                for station_id in station_ids}
+        if 2 * len(ends) >= len(common):
+            return set(common)  # cheaper to search again from every origin
+        affected = set()
+        for station_id in sorted(ends):
+            if station_id not in old_index or station_id not in new_index:
+                continue  # journeys only reach added or removed stations through common ones
+            old = self.distances_from(self.old_path_finder, station_id)
+            new = self.distances_from(self.new_path_finder, station_id)
+            affected.update(origin for origin in common if new[origin] != old[origin])
+        return affected
+
+
+    def changed_journeys(self):
+        """ Compare the journeys between the stations present in both versions.
+
+        Returns:
+            list[JourneyChange] : changed journeys, largest change first.
+        """
+        old_finder, new_finder = self.old_path_finder, self.new_path_finder
+        old_index = old_finder.compact_graph.station_index
+        new_index = new_finder.compact_graph.station_index
+        common = [station_id for station_id in old_index if station_id in new_index]
+
+        affected = self.affected_origins()
+        old_graph, new_graph = old_finder.compact_graph, new_finder.compact_graph
+        stations, _, lines, _ = self.match_graphs()
+        changes = []
+        for origin in sorted(affected):
+            self.stats["searches"] += 1
+            old_tree = old_finder.engine.search({old_index[origin]: 0})
+            new_tree = self.repaired_tree(old_tree)
+            old_previous, new_previous = old_tree.previous, new_tree.previous
+            same_path = {old_index[origin]: True}
+
+            def is_same_path(station):
+                # Iterative walk up the old tree, memoised per old station index
+                chain = []
+                while station not in same_path:
+                    old_arc, new_arc = old_previous[station], new_previous[stations[station]]
+                    if old_arc < 0 or new_arc < 0:
+                        same_path[station] = old_arc < 0 and new_arc < 0  # unreached in both
+                        break
+                    tail = old_graph.arc_tail[old_arc]
+                    if (new_graph.arc_tail[new_arc] != stations[tail]
+                            or new_graph.arc_line[new_arc] != lines[old_graph.arc_line[old_arc]]):
+                        same_path[station] = False
+                        break
+                    chain.append(station)
+                    station = tail
+                result = same_path[station]
+                for visited in chain:
+                    same_path[visited] = result
+                return result
+
+            for destination in common:
+                if destination == origin:
+                    continue
+                old_time = old_tree.distances[old_index[destination]]
+                new_time = new_tree.distances[new_index[destination]]
+                if old_time == new_time and is_same_path(old_index[destination]):
+                    continue
+                changes.append(JourneyChange(
+                    origin, destination, old_time, new_time,
+                    self.route(old_finder, old_tree, old_index[destination]),
+                    self.route(new_finder, new_tree, new_index[destination])))
+
+        changes.sort(key=lambda change: (-abs(change.delta), change.start_id, change.end_id))
+        self.stats["affected_origins"] = len(affected)
+        self.stats["changed_journeys"] = len(changes)
+        return changes
+
+
+    def match_graphs(self):
+        """ Match the stations, arcs and lines of the old graph with the new one.
+
+        Returns:
+            tuple : (new index of every old station, new arc of every old arc
+                (the fastest one with the same ends and line), new index of
+                every old line, -1 if gone; new arcs that were added or are
+                faster than before).
+        """
+        if self._matching is None:
+            old_graph, new_graph = self.old_path_finder.compact_graph, self.new_path_finder.compact_graph
+            stations = [new_graph.station_index.get(station.id, -1) for station in old_graph.stations]
+            new_lines = {line.id: index for index, line in enumerate(new_graph.lines)}
+            lines = [new_lines.get(line.id, -1) for line in old_graph.lines]
+
+            def fastest_arcs(graph, station_map, line_map):
+                fastest = {}  # key: (tail, head, line) in new indices, value: arc
+                for arc in range(len(graph.arc_head)):
+                    key = (station_map(graph.arc_tail[arc]), station_map(graph.arc_head[arc]),
+                           line_map(graph.arc_line[arc]))
+                    if key not in fastest or graph.arc_time[arc] < graph.arc_time[fastest[key]]:
+                        fastest[key] = arc
+                return fastest
+
+            old_arcs = fastest_arcs(old_graph, stations.__getitem__, lines.__getitem__)
+            new_arcs = fastest_arcs(new_graph, int, int)
+            arcs = [-1] * len(old_graph.arc_head)
+            for key, arc in old_arcs.items():
+                if key in new_arcs:
+                    for duplicate in range(old_graph.indptr[old_graph.arc_tail[arc]],
+                                           old_graph.indptr[old_graph.arc_tail[arc] + 1]):
+                        if (old_graph.arc_head[duplicate] == old_graph.arc_head[arc]
+                                and old_graph.arc_line[duplicate] == old_graph.arc_line[arc]):
+                            arcs[duplicate] = new_arcs[key]
+            improved = [arc for key, arc in new_arcs.items() if key not in old_arcs
+                        or new_graph.arc_time[arc] < old_graph.arc_time[old_arcs[key]]]
+            self._matching = (stations, arcs, lines, improved)
+        return self._matching
+
+
+    def repaired_tree(self, old_tree):
+        """ New shortest-path tree of an origin, repaired from its old one.
+
+        Args:
+            old_tree (SearchResult) : full search of the old graph
+
+        Returns:
+            SearchResult : distances and previous arcs on the new graph.
+        """
+        old_graph, new_graph = self.old_path_finder.compact_graph, self.new_path_finder.compact_graph
+        stations, arcs, _, improved = self.match_graphs()
+        self.stats["repairs"] += 1
+
+        # Keep the old path of the stations whose path has no removed or
+        # slower arc (faster arcs only make the distance an upper bound)
+        distances = [float('inf')] * new_graph.station_count
+        previous = [-1] * new_graph.station_count
+        kept = {}  # key: old station index, value: True if its old path is kept
+        lost = []  # new indices of the stations whose old path is broken
+        for station, old_distance in enumerate(old_tree.distances):
+            if old_distance == float('inf') or station in kept:
+                continue
+            chain = []
+            current = station
+            while current not in kept:
+                arc = old_tree.previous[current]
+                if arc < 0:
+                    kept[current] = True
+                    break
+                new_arc = arcs[arc]
+                if new_arc < 0 or new_graph.arc_time[new_arc] > old_graph.arc_time[arc]:
+                    kept[current] = False
+                    break
+                chain.append(current)
+                current = old_graph.arc_tail[arc]
+            result = kept[current]
+            for index in chain:
+                kept[index] = result
+        for station, is_kept in kept.items():
+            if stations[station] < 0:
+                continue
+            if is_kept:
+                arc = old_tree.previous[station]
+                distances[stations[station]] = old_tree.distances[station]
+                previous[stations[station]] = arcs[arc] if arc >= 0 else -1
+            else:
+                lost.append(stations[station])
+
+        # Dijkstra from the stations that can improve a neighbour: those
+        # around the lost stations, and the tails of the faster arcs
+        arc_tail, arc_head, arc_time, indptr = (new_graph.arc_tail, new_graph.arc_head, new_graph.arc_time,
+                                                new_graph.indptr)
+        seeds = {arc_tail[arc] for arc in improved
+                 if distances[arc_tail[arc]] + arc_time[arc] < distances[arc_head[arc]]}
+        for station in lost:
+            seeds.update(arc_head[arc] for arc in range(indptr[station], indptr[station + 1])
+                         if distances[arc_head[arc]] != float('inf'))
+        queue = [(distances[station], station) for station in seeds]
+        heapq.heapify(queue)
+        while queue:
+            distance, current = heapq.heappop(queue)
+            if distance > distances[current]:
+                continue
+            for arc in range(indptr[current], indptr[current + 1]):
+                head = arc_head[arc]
+                new_distance = distance + arc_time[arc]
+                if new_distance < distances[head]:
+                    distances[head] = new_distance
+                    previous[head] = arc
+                    heapq.heappush(queue, (new_distance, head))
+        return SearchResult(distances, previous)
+
+
+    @staticmethod
+    def route(path_finder, tree, index):
+        if tree.distances[index] == float('inf'):
+            return None
+        return path_finder.build_route(tree.previous, index, tree.distances[index])
+
+
+def print_report(comparison, limit=20):
+    """ Print the structural diff and the most changed journeys. """
+    for name, count in comparison.diff.summary().items():
+        print(f"{name.replace('_', ' ')}: {count}")
+
+    changes = comparison.changed_journeys()
+    print(f"\n{len(changes)} journeys changed "
+          f"({comparison.stats['affected_origins']} origins searched again, "
+          f"{comparison.stats['searches']} searches)")
+    for change in changes[:limit]:
+        old_names = change.old_route.names if change.old_route is not None else "unreachable"
+        new_names = change.new_route.names if change.new_route is not None else "unreachable"
+        print(f"{change.start_id} -> {change.end_id}: {change.old_time:g} -> {change.new_time:g} min")
+        print(f"    old: {old_names}")
+        print(f"    new: {new_names}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Usage: python -m network.diff OLD_JSON NEW_JSON")
+        sys.exit(1)
+    print_report(NetworkComparison.from_files(sys.argv[1], sys.argv[2]))
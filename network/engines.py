@@ -0,0 +1,575 @@
+import heapq
+import threading
+import warnings
+from time import perf_counter
+from network.graph import ChainGraph
+
+try:
+    import numpy as np
+    from scipy.sparse import csr_matrix
+    from scipy.sparse.csgraph import dijkstra as csgraph_dijkstra
+except ImportError:  # NumPy/SciPy are optional
+    np = None
+    csr_matrix = None
+    csgraph_dijkstra = None
+
+
+class SearchResult:
+    """ Outcome of one shortest-path search over a CompactGraph.
+
+    Attributes:
+        distances (list[float]) : distance of every station from the sources
+            (inf if not reached)
+        previous (list[int]) : arc through which every station was reached
+            (-1 for sources and unreached stations)
+        best_target (int) : index of the target minimising distance + offset
+            (None if no target was reached, or no target was given)
+        settled (int) : number of stations settled by the search
+        exhausted (bool) : True if the search stopped because its budget ran
+            out, before settling its best target
+        lower_bound (float) : if exhausted, no target still to be settled
+            can be reached in less than this (distance + offset)
+    """
+
+    def __init__(self, distances, previous, best_target=None, settled=0, exhausted=False, lower_bound=0.0):
+        self.distances = distances
+        self.previous = previous
+        self.best_target = best_target
+        self.settled = settled
+        self.exhausted = exhausted
+        self.lower_bound = lower_bound
+
+
+class SearchWorkspace:
+    """ Distance and previous-arc lists reused by successive searches.
+
+    Allocating two lists sized to the whole network costs O(N) per search,
+    however close the target. A workspace keeps them allocated, and records
+    the stations a search touched so that the next search only resets
+    those: the cost of a search then depends on the area it explores.
+
+    The lists of a SearchResult obtained with a workspace are the
+    workspace's own lists, valid until the next search using it.
+
+    Attributes:
+        distances (list[float]) : distance of every station (inf if unset)
+        previous (list[int]) : arc reaching every station (-1 if unset)
+        touched (list[int]) : stations set by the last search (may repeat)
+    """
+
+    __slots__ = ("distances", "previous", "touched")
+
+    def __init__(self, station_count):
+        self.distances = [float('inf')] * station_count
+        self.previous = [-1] * station_count
+        self.touched = []
+
+
+    def reset(self):
+        """ Clear what the last search wrote, in O(touched). """
+        distances, previous = self.distances, self.previous
+        for index in self.touched:
+            distances[index] = float('inf')
+            previous[index] = -1
+        self.touched.clear()
+
+
+class WorkspacePool:
+    """ One SearchWorkspace per thread, created on first use.
+
+    The graph is never written by a search, so threads sharing it only need
+    their own workspace to run searches concurrently without locks.
+    """
+
+    def __init__(self, station_count):
+        """
+        Args:
+            station_count (int) : size of the workspaces
+        """
+        self.station_count = station_count
+        self.created = 0  # number of workspaces (i.e. threads) so far
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+
+    def get(self):
+        """ Return the workspace of the calling thread. """
+        workspace = getattr(self._local, "workspace", None)
+        if workspace is None:
+            workspace = self._local.workspace = SearchWorkspace(self.station_count)
+            with self._lock:
+                self.created += 1
+        return workspace
+
+
+class RoutingEngine:
+    """ Interface of the shortest-path engines used by PathFinder.
+
+    An engine works on the station indices of a CompactGraph. Subclasses
+    must implement `search()`; `one_to_all()` can be overridden when the
+    engine handles batches of sources more efficiently.
+    """
+
+    name = None
+
+    def __init__(self, graph):
+        """
+        Args:
+            graph (CompactGraph) : the graph to search
+        """
+        self.graph = graph
+
+
+    def search(self, sources, targets=None, route_filter=None, weights=None, workspace=None,
+               max_settled=None, deadline=None):
+        """ Run a multi-source shortest-path search.
+
+        Every source starts with its own initial distance, and reaching a
+        target costs its distance plus its own offset. The search stops once
+        no unsettled station can improve on the best target.
+
+        Args:
+            sources (dict) : key: station index, value: initial distance
+            targets (dict) : key: station index, value: non-negative offset
+                added when the journey ends there. If None, every reachable
+                station is settled.
+            route_filter (RouteFilter) : if given, only the stations and arcs
+                it allows are used (sources are not checked).
+            weights (array) : if given, travel time of every arc, used
+                instead of the scheduled arc times (e.g. a time-of-day 
+                profile).
+            workspace (SearchWorkspace) : if given, lists reused instead of
+                allocated (the result is only valid until its next use)
+            max_settled (int) : if given, the search gives up after settling
+                that many stations (the result is then `exhausted`)
+            deadline (float) : if given, the search gives up once
+                time.perf_counter() passes it (checked every 16 stations)
+
+        Returns:
+            SearchResult : distances, previous arcs and best target.
+        """
+        raise NotImplementedError
+
+
+    def one_to_all(self, sources):
+        """ Compute the distances from each source to every station.
+
+        Args:
+            sources (list[int]) : station indices
+
+        Returns:
+            list : one row of distances (indexed by station) per source.
+        """
+        return [self.search({source: 0}).distances for source in sources]
+
+
+    def nearest_sources(self, sources, route_filter=None):
+        """ Find, for every station, its closest source, in one search.
+
+        Args:
+            sources (list[int]) : station indices
+            route_filter (RouteFilter) : restrictions, or None
+
+        Returns:
+            tuple(list, list) : (distances, origins) where origins[i] is the
+                index of the source closest to station i (-1 if unreached).
+        """
+        result = self.search({source: 0 for source in sources}, route_filter=route_filter)
+        distances, previous = result.distances, result.previous
+        arc_tail = self.graph.arc_tail
+
+        # Parents are settled before their children: inherit their origin
+        origins = [-1] * self.graph.station_count
+        reached = sorted((index for index, distance in enumerate(distances) if distance != float('inf')),
+                         key=distances.__getitem__)
+        for index in reached:
+            arc = previous[index]
+            origins[index] = index if arc < 0 else origins[arc_tail[arc]]
+        return distances, origins
+
+
+class HeapEngine(RoutingEngine):
+    """ Heap-based Dijkstra, independent of the adjacency layout.
+
+    Subclasses only tell how to iterate over the arcs leaving a station,
+    through `arcs()`.
+    """
+
+    def arcs(self, index):
+        """ Return the (head, arc, time) triples of the arcs leaving `index`. """
+        raise NotImplementedError
+
+
+    def search(self, sources, targets=None, route_filter=None, weights=None, workspace=None,
+               max_settled=None, deadline=None):
+        arcs = self.arcs
+        budgeted = max_settled is not None or deadline is not None
+        if workspace is not None:
+            workspace.reset()
+            distances, previous, touched = workspace.distances, workspace.previous, workspace.touched
+        else:
+            distances = [float('inf')] * self.graph.station_count
+            previous = [-1] * self.graph.station_count
+            touched = []
+
+        # Filters are plain bitmask and set checks on the shared graph
+        if route_filter is not None:
+            zone_mask, line_mask = route_filter.zone_mask, route_filter.line_mask
+            excluded_stations, excluded_arcs = route_filter.excluded_stations, route_filter.excluded_arcs
+            station_zones, arc_line_bits = self.graph.station_zones, self.graph.arc_line_bits
+
+        ## Initialize the priority queue with every source station
+        priority_queue = []
+        for index, offset in sources.items():
+            if offset < distances[index]:
+                distances[index] = offset
+                touched.append(index)
+                priority_queue.append((offset, index))
+        heapq.heapify(priority_queue)
+
+        best_target, best_total = None, float('inf')
+        settled = 0
+
+        ## Stop when priority_queue is empty
+        while priority_queue:
+            current_distance, current = heapq.heappop(priority_queue)
+
+            # Skip outdated queue entries
+            if current_distance > distances[current]:
+                continue
+
+            # Stop if no remaining station can beat the best target
+            if current_distance >= best_total:
+                break
+            settled += 1
+
+            if targets is not None and current in targets:
+                total = current_distance + targets[current]
+                if total < best_total:
+                    best_target, best_total = current, total
+                if current_distance >= best_total:
+                    break
+
+            # Out of budget: nothing left can beat current_distance
+            if budgeted and ((max_settled is not None and settled >= max_settled)
+                             or (deadline is not None and not settled & 15 and perf_counter() > deadline)):
+                return SearchResult(distances, previous, best_target, settled, True, current_distance)
+
+            # Relax every arc leaving the current station
+            for neighbour, arc, time in arcs(current):
+                if route_filter is not None and (
+                        arc_line_bits[arc] & line_mask
+                        or not station_zones[neighbour] & zone_mask
+                        or neighbour in excluded_stations
+                        or arc in excluded_arcs):
+                    continue
+                if weights is not None:
+                    time = weights[arc]
+                new_distance = current_distance + time
+                if new_distance < distances[neighbour]:
+                    distances[neighbour] = new_distance
+                    previous[neighbour] = arc
+                    touched.append(neighbour)
+                    heapq.heappush(priority_queue, (new_distance, neighbour))
+
+        return SearchResult(distances, previous, best_target, settled)
+
+
+class PythonEngine(HeapEngine):
+    """ Heap-based Dijkstra over per-station lists of (head, arc, time). """
+
+    name = "python"
+
+    def arcs(self, index):
+        return self.graph.adjacency[index]
+
+
+class CSREngine(HeapEngine):
+    """ Heap-based Dijkstra over the flat CSR arrays of the graph. """
+
+    name = "csr"
+
+    def arcs(self, index):
+        start, end = self.graph.indptr[index], self.graph.indptr[index + 1]
+        return zip(self.graph.arc_head[start:end], range(start, end), self.graph.arc_time[start:end])
+
+
+class SciPyEngine(RoutingEngine):
+    """ Vectorised engine based on `scipy.sparse.csgraph.dijkstra`.
+
+    Batches of sources are solved in a single call, which returns a 2D NumPy
+    array of distances. Searches with source or target offsets are not
+    supported by csgraph and go through the CSR engine instead.
+    """
+
+    name = "scipy"
+
+    def __init__(self, graph):
+        super().__init__(graph)
+        if csgraph_dijkstra is None:
+            raise ImportError("The scipy engine requires numpy and scipy.")
+        self.fallback = CSREngine(graph)
+
+        self.arc_tail = np.array(graph.arc_tail, dtype=np.int64)
+        self.arc_head = np.array(graph.arc_head, dtype=np.int64)
+        self.arc_time = np.array(graph.arc_time, dtype=np.float64)
+
+        # csr_matrix sums duplicate entries: keep the fastest parallel arc
+        fastest = {}
+        for arc in range(graph.arc_count):
+            key = (graph.arc_tail[arc], graph.arc_head[arc])
+            if key not in fastest or graph.arc_time[arc] < fastest[key]:
+                fastest[key] = graph.arc_time[arc]
+
+        tails = np.array([tail for tail, _ in fastest], dtype=np.int32)
+        heads = np.array([head for _, head in fastest], dtype=np.int32)
+        times = np.array(list(fastest.values()), dtype=np.float64)
+        self.matrix = csr_matrix((times, (tails, heads)),
+                                 shape=(graph.station_count, graph.station_count))
+
+
+    def search(self, sources, targets=None, route_filter=None, weights=None, workspace=None,
+               max_settled=None, deadline=None):
+        # csgraph has no notion of offsets or budgets, and filtering or
+        # reweighting it would mean copying it. Its own arrays are always
+        # allocated, so the workspace only serves the fallback.
+        if (route_filter is not None or weights is not None or len(sources) != 1
+                or any(sources.values()) or (targets and any(targets.values()))
+                or max_settled is not None or deadline is not None):
+            return self.fallback.search(sources, targets, route_filter, weights, workspace,
+                                        max_settled, deadline)
+
+        source = next(iter(sources))
+        distances = csgraph_dijkstra(self.matrix, indices=source)
+        previous = self.previous_arcs(distances)
+        previous[source] = -1
+
+        best_target = None
+        if targets:
+            reached = [target for target in targets if np.isfinite(distances[target])]
+            if reached:
+                best_target = min(reached, key=lambda target: distances[target])
+
+        settled = int(np.isfinite(distances).sum())
+        return SearchResult(distances.tolist(), previous.tolist(), best_target, settled)
+
+
+    def previous_arcs(self, distances):
+        """ Rebuild the shortest-path tree from a vector of distances.
+
+        Ties are broken like the heap engines do: a station keeps the first
+        tight arc relaxed, i.e. the one whose tail was settled first in
+        (distance, index) order, then the first in CSR order.
+
+        Args:
+            distances (numpy.ndarray) : distances from the source
+
+        Returns:
+            numpy.ndarray : arc through which every station is reached
+                (-1 if none).
+        """
+        previous = np.full(self.graph.station_count, -1, dtype=np.int64)
+        tail_distances = distances[self.arc_tail]
+        tight = np.isfinite(tail_distances) & np.isclose(
+            tail_distances + self.arc_time, distances[self.arc_head], rtol=0, atol=1e-9)
+        arcs = np.nonzero(tight)[0]
+        if len(arcs) == 0:
+            return previous
+
+        # Sort by head, then by settling order of the tail, then by arc
+        tails = self.arc_tail[arcs]
+        order = np.lexsort((arcs, tails, tail_distances[arcs], self.arc_head[arcs]))
+        arcs = arcs[order]
+        heads, first = np.unique(self.arc_head[arcs], return_index=True)
+        previous[heads] = arcs[first]
+        return previous
+
+
+    def nearest_sources(self, sources, route_filter=None):
+        if route_filter is not None:
+            return self.fallback.nearest_sources(sources, route_filter)
+        if len(sources) == 0:
+            return [float('inf')] * self.graph.station_count, [-1] * self.graph.station_count
+        distances, _, origins = csgraph_dijkstra(self.matrix, indices=list(sources),
+                                                 min_only=True, return_predecessors=True)
+        return distances.tolist(), origins.astype(np.int64).tolist()
+
+
+    def one_to_all(self, sources):
+        if len(sources) == 0:
+            return np.empty((0, self.graph.station_count))
+        return np.atleast_2d(csgraph_dijkstra(self.matrix, indices=list(sources)))
+
+
+class ChainEngine(RoutingEngine):
+    """ Heap-based Dijkstra on the junction graph (see ChainGraph).
+
+    Only junctions go through the priority queue. Sources and targets
+    inside a chain enter or leave it through both of its ends, and a
+    journey staying inside one chain is found by walking the chain from
+    its source. Once the search stops, the chains leaving the settled
+    junctions are walked to give their stations a distance and a previous
+    arc, so results are the same as the other engines'. Filtered or
+    reweighted searches go through the CSR engine instead, since the
+    super-edges would have to be checked or summed again.
+    """
+
+    name = "chains"
+
+    def __init__(self, graph):
+        super().__init__(graph)
+        self.chains = ChainGraph(graph)
+        self.fallback = CSREngine(graph)
+
+
+    def search(self, sources, targets=None, route_filter=None, weights=None, workspace=None,
+               max_settled=None, deadline=None):
+        if route_filter is not None or weights is not None:
+            return self.fallback.search(sources, targets, route_filter, weights, workspace,
+                                        max_settled, deadline)
+        chains = self.chains
+        junction, edge_indptr, edge_head = chains.junction, chains.edge_indptr, chains.edge_head
+        edge_time, edge_start, chain_arcs = chains.edge_time, chains.edge_start, chains.chain_arcs
+        budgeted = max_settled is not None or deadline is not None
+        if workspace is not None:
+            workspace.reset()
+            distances, previous, touched = workspace.distances, workspace.previous, workspace.touched
+        else:
+            distances = [float('inf')] * self.graph.station_count
+            previous = [-1] * self.graph.station_count
+            touched = []
+
+        priority_queue = []
+        for index, offset in sources.items():
+            if offset < distances[index]:
+                distances[index] = offset
+                previous[index] = -1
+                touched.append(index)
+                if junction[index]:
+                    priority_queue.append((offset, index))
+        # Sources inside a chain: walk it both ways, up to the junctions
+        for index, offset in sources.items():
+            if not junction[index] and distances[index] == offset:
+                for edge, position in chains.chain_positions(index):
+                    self.walk_chain(edge, position + 1, offset - chains.chain_prefix[edge_start[edge] + position],
+                                    distances, previous, touched, priority_queue)
+        heapq.heapify(priority_queue)
+
+        # Targets inside a chain are reached from the junction at either end
+        best_target, best_total = None, float('inf')
+        junction_targets = {}  # key: junction, value: (offset, target)
+        for target, offset in (targets or {}).items():
+            if junction[target]:
+                candidates = [(target, offset)]
+            else:
+                total = distances[target] + offset  # from a source in the same chain
+                if total < best_total:
+                    best_target, best_total = target, total
+                candidates = []
+                for edge, position in chains.chain_positions(target):
+                    tail = self.graph.arc_tail[chain_arcs[edge_start[edge]]]
+                    candidates.append((tail, offset + chains.chain_prefix[edge_start[edge] + position]))
+            for station, station_offset in candidates:
+                if station not in junction_targets or station_offset < junction_targets[station][0]:
+                    junction_targets[station] = (station_offset, target)
+
+        settled_junctions = []
+        settled, exhausted, lower_bound = 0, False, 0.0
+        while priority_queue:
+            current_distance, current = heapq.heappop(priority_queue)
+            if current_distance > distances[current]:
+                continue
+            if current_distance >= best_total:
+                break
+            settled += 1
+            settled_junctions.append(current)
+
+            if current in junction_targets:
+                offset, target = junction_targets[current]
+                if current_distance + offset < best_total:
+                    best_target, best_total = target, current_distance + offset
+                if current_distance >= best_total:
+                    break
+
+            if budgeted and ((max_settled is not None and settled >= max_settled)
+                             or (deadline is not None and not settled & 15 and perf_counter() > deadline)):
+                exhausted, lower_bound = True, current_distance
+                break
+
+            # Relax every super-edge leaving the current junction
+            for edge in range(edge_indptr[current], edge_indptr[current + 1]):
+                head = edge_head[edge]
+                new_distance = current_distance + edge_time[edge]
+                if new_distance < distances[head]:
+                    distances[head] = new_distance
+                    previous[head] = chain_arcs[edge_start[edge + 1] - 1]
+                    touched.append(head)
+                    heapq.heappush(priority_queue, (new_distance, head))
+
+        # Give the chain stations their distance and previous arc
+        for current in settled_junctions:
+            for edge in range(edge_indptr[current], edge_indptr[current + 1]):
+                self.walk_chain(edge, 0, distances[current], distances, previous, touched)
+
+        return SearchResult(distances, previous, best_target, settled, exhausted, lower_bound)
+
+
+    def walk_chain(self, edge, position, start_distance, distances, previous, touched, priority_queue=None):
+        """ Update the stations of a super-edge from arc `position` on.
+
+        `start_distance` is the distance of the super-edge tail (possibly
+        virtual, for a source inside the chain). The head junction is only
+        updated if `priority_queue` is given, and is then queued.
+        """
+        chains = self.chains
+        arc_head = self.graph.arc_head
+        start, end = chains.edge_start[edge], chains.edge_start[edge + 1]
+        for index in range(start + position, end):
+            arc = chains.chain_arcs[index]
+            head = arc_head[arc]
+            new_distance = start_distance + chains.chain_prefix[index]
+            if index == end - 1 and (priority_queue is None or not chains.junction[head]):
+                break
+            if new_distance < distances[head]:
+                distances[head] = new_distance
+                previous[head] = arc
+                touched.append(head)
+                if index == end - 1:
+                    priority_queue.append((new_distance, head))
+
+
+# Engines by name, in fallback order (each one falls back to the next one)
+ENGINES = {
+    "scipy": SciPyEngine,
+    "csr": CSREngine,
+    "python": PythonEngine,
+    "chains": ChainEngine,
+}
+
+
+def get_engine(name, graph):
+    """ Create the routing engine `name` for `graph`.
+
+    If the engine cannot be created (e.g. SciPy is not installed), the next
+    engine in ENGINES is tried instead, with a warning.
+
+    Args:
+        name (str) : one of "scipy", "csr", "python" or "chains"
+        graph (CompactGraph) : the graph to search
+
+    Returns:
+        RoutingEngine : the engine created.
+
+    Raises:
+        ValueError : if `name` is not a known engine.
+    """
+    if name not in ENGINES:
+        raise ValueError(f"Unknown routing engine {name!r}, expected one of {list(ENGINES)}.")
+
+    names = list(ENGINES)
+    for candidate in names[names.index(name):]:
+        try:
+            return ENGINES[candidate](graph)
+        except ImportError as error:
+            warnings.warn(f"{error} Falling back to the next routing engine.")
+    raise RuntimeError("No routing engine is available.")
@@ -1,3 +1,5 @@
+import zlib
+from array import array
 from tube.map import TubeMap
 
 class NeighbourGraphBuilder:
@@ -115,6 +117,555 @@ class NeighbourGraphBuilder:
         return graph
 
 
+    def build_compact(self, tubemap):
+        """ Builds an index-based (CSR) version of the neighbour graph.
+
+        Stations and lines are numbered in the order of `tubemap.stations` 
+        and `tubemap.lines`. Every connection gives two directed arcs (one 
+        per direction), and the arcs leaving station i are the slice
+        indptr[i]:indptr[i + 1] of the arc arrays.
+
+        Args:
+            tubemap (TubeMap) : tube map serving as a reference for building 
+                the graph.
+
+        Returns:
+            CompactGraph : the compact graph. 
+                If the input data (tubemap) is invalid, the graph is empty.
+        """
+        if not isinstance(tubemap, TubeMap):
+            return CompactGraph([], [], [])
+
+        stations = list(tubemap.stations.values())
+        lines = list(tubemap.lines.values())
+        station_index = {station_id: index for index, station_id in enumerate(tubemap.stations)}
+        line_index = {line_id: index for index, line_id in enumerate(tubemap.lines)}
+
+        # Collect (tail, head, time, line, connection) for every directed arc
+        arcs = []
+        for connection_index, connection in enumerate(tubemap.connections):
+            if len(connection.stations) != 2:
+                continue  # Skip invalid connections
+            station1, station2 = connection.stations
+            index1, index2 = station_index[station1.id], station_index[station2.id]
+            line = line_index[connection.line.id]
+            arcs.append((index1, index2, connection.time, line, connection_index))
+            arcs.append((index2, index1, connection.time, line, connection_index))
+
+        return CompactGraph(stations, lines, arcs)
+
+
+    def build_components(self, compact_graph):
+        """ Builds the connected-component index of a compact graph.
+
+        Args:
+            compact_graph (CompactGraph) : graph returned by build_compact()
+
+        Returns:
+            ComponentIndex : the index, with every station and connection
+                enabled.
+        """
+        return ComponentIndex(compact_graph)
+
+
+    def build_chains(self, compact_graph):
+        """ Builds the compressed (junction) version of a compact graph.
+
+        Args:
+            compact_graph (CompactGraph) : graph returned by build_compact()
+
+        Returns:
+            ChainGraph : the graph with its chains of degree-2 stations
+                collapsed into super-edges.
+        """
+        return ChainGraph(compact_graph)
+
+
+class CompactGraph:
+    """ Index-based (CSR) representation of the neighbour graph.
+
+    Attributes:
+        stations (list[Station]) : station table (station index -> Station)
+        lines (list[Line]) : line table (line index -> Line)
+        station_index (dict) : key: station id, value: station index
+        line_index (dict) : key: line id, value: line index
+        name_index (dict) : key: station name, value: list of station indices
+        indptr (array) : arcs leaving station i are indptr[i]:indptr[i + 1]
+        arc_tail, arc_head (array) : station indices at both ends of an arc
+        arc_time (array) : travel time of an arc (in minutes)
+        arc_line (array) : line index of an arc
+        arc_connection (array) : index of the arc's Connection in 
+            tubemap.connections
+        adjacency (list[list[tuple]]) : for every station, the 
+            (head, arc, time) tuples of its arcs (pure-Python view)
+        station_zones (list[int]) : bitmask of the zones of every station
+            (bit z set for zone z)
+        arc_line_bits (list[int]) : 1 << line index of every arc
+    """
+
+    def __init__(self, stations, lines, arcs):
+        """
+        Args:
+            stations (list[Station]) : station table
+            lines (list[Line]) : line table
+            arcs (list[tuple]) : (tail, head, time, line, connection) tuples
+        """
+        self.stations = stations
+        self.lines = lines
+        self.station_index = {station.id: index for index, station in enumerate(stations)}
+        self.line_index = {line.id: index for index, line in enumerate(lines)}
+        self.name_index = {}  # key: station name, value: list of station indices
+        for index, station in enumerate(stations):
+            self.name_index.setdefault(station.name, []).append(index)
+
+        # Sort the arcs by tail station to lay them out contiguously
+        arcs = sorted(arcs, key=lambda arc: arc[0])
+
+        self.indptr = array('i', [0] * (len(stations) + 1))
+        for tail, *_ in arcs:
+            self.indptr[tail + 1] += 1
+        for index in range(len(stations)):
+            self.indptr[index + 1] += self.indptr[index]
+
+        self.arc_tail = array('i', [arc[0] for arc in arcs])
+        self.arc_head = array('i', [arc[1] for arc in arcs])
+        self.arc_time = array('d', [arc[2] for arc in arcs])
+        self.arc_line = array('H', [arc[3] for arc in arcs])
+        self.arc_connection = array('i', [arc[4] for arc in arcs])
+
+        self.adjacency = [
+            [(self.arc_head[arc], arc, self.arc_time[arc])
+             for arc in range(self.indptr[index], self.indptr[index + 1])]
+            for index in range(len(stations))
+        ]
+
+        # Bitmasks used by RouteFilter checks
+        self.station_zones = [sum(1 << zone for zone in station.zones) for station in stations]
+        self.arc_line_bits = [1 << line for line in self.arc_line]
+
+
+    @property
+    def station_count(self):
+        return len(self.stations)
+
+    @property
+    def arc_count(self):
+        return len(self.arc_head)
+
+
+    def neighbours(self, index):
+        """ Return the (head, arc) pairs of the arcs leaving station `index`. """
+        return [(self.arc_head[arc], arc) for arc in range(self.indptr[index], self.indptr[index + 1])]
+
+
+    def route_arcs(self, route):
+        """ Return the arc followed by every leg of a Route (the fastest arc
+        of the leg's line between its two stations). """
+        arcs = []
+        for (tail, head), line in zip(zip(route.indices, route.indices[1:]), route.line_indices):
+            arcs.append(min((arc for arc in range(self.indptr[tail], self.indptr[tail + 1])
+                             if self.arc_head[arc] == head and self.arc_line[arc] == line),
+                            key=self.arc_time.__getitem__))
+        return arcs
+
+
+    def checksum(self):
+        """ CRC32 of the station ids and of the arcs (ends, times and lines).
+
+        Files of precomputed data (hub labels, transfer patterns) store it
+        to detect that they were built for another version of the map, even
+        if only a connection or a travel time changed.
+        """
+        checksum = zlib.crc32("\0".join(station.id for station in self.stations).encode())
+        for values in (self.arc_tail, self.arc_head, self.arc_time, self.arc_line):
+            checksum = zlib.crc32(values.tobytes(), checksum)
+        return checksum
+
+
+class RouteFilter:
+    """ Query-time restrictions applied on a shared CompactGraph.
+
+    Nothing is copied: the search checks every arc against three precomputed
+    values, so a filtered query costs about the same as an unfiltered one.
+
+    Attributes:
+        zone_mask (int) : bitmask of the allowed zones (-1 allows all). A
+            station is allowed if any of its zones is allowed.
+        line_mask (int) : bitmask of the excluded line indices
+        excluded_stations (frozenset[int]) : indices of excluded stations
+        excluded_arcs (frozenset[int]) : indices of excluded arcs
+    """
+
+    def __init__(self, graph, allowed_zones=None, excluded_lines=None, excluded_stations=None,
+                 excluded_arcs=None):
+        """
+        Args:
+            graph (CompactGraph) : the graph the filter applies to
+            allowed_zones (iterable[int]) : zones the route must stay in
+                (None allows every zone)
+            excluded_lines (iterable[str]) : ids or names of lines to avoid
+            excluded_stations (iterable[str]) : ids or names of stations to
+                avoid
+            excluded_arcs (iterable[int]) : indices of arcs to avoid
+        """
+        self.graph = graph
+
+        self.zone_mask = -1
+        if allowed_zones is not None:
+            self.zone_mask = sum(1 << zone for zone in set(allowed_zones))
+
+        excluded_lines = set(excluded_lines or ())
+        self.line_mask = 0
+        for index, line in enumerate(graph.lines):
+            if line.id in excluded_lines or line.name in excluded_lines:
+                self.line_mask |= 1 << index
+
+        excluded = set()
+        for station in excluded_stations or ():
+            if station in graph.station_index:
+                excluded.add(graph.station_index[station])
+            excluded.update(graph.name_index.get(station, ()))
+        self.excluded_stations = frozenset(excluded)
+        self.excluded_arcs = frozenset(excluded_arcs or ())
+
+
+    def allows_station(self, index):
+        """ Check whether a station may be used by a filtered route. """
+        return bool(self.graph.station_zones[index] & self.zone_mask) and index not in self.excluded_stations
+
+
+    def allows_arc(self, arc):
+        """ Check whether an arc (and the station it leads to) may be used. """
+        return (not self.graph.arc_line_bits[arc] & self.line_mask and arc not in self.excluded_arcs
+                and self.allows_station(self.graph.arc_head[arc]))
+
+
+class ChainGraph:
+    """ A CompactGraph with its chains of degree-2 stations collapsed.
+
+    A station is a chain station if it has exactly two arcs, to two
+    different stations: a plain stop on one line segment. Every other
+    station is a junction (termini, interchanges, stations shared by
+    several lines). A maximal run of chain stations between two junctions
+    becomes one super-edge per direction, keeping the original arcs in
+    order and their summed time, so a search only needs to settle the
+    junctions. A loop made of chain stations only gets one of them promoted
+    to junction.
+
+    Attributes:
+        graph (CompactGraph) : the full graph
+        junction (list[bool]) : whether every station is a junction
+        edge_indptr (array) : super-edges leaving station i are
+            edge_indptr[i]:edge_indptr[i + 1] (none for chain stations)
+        edge_head (array) : junction at the end of a super-edge
+        edge_time (array) : summed time of a super-edge
+        edge_twin (array) : super-edge running the other way
+        edge_start (array) : arcs of super-edge e are
+            chain_arcs[edge_start[e]:edge_start[e + 1]]
+        chain_arcs (array) : original arcs of every super-edge, from its
+            tail to its head
+        chain_prefix (array) : time from the tail of the super-edge to the
+            head of every arc of chain_arcs
+        station_edge (array) : for chain stations, one super-edge through
+            the station (-1 for junctions)
+        station_position (array) : position in chain_arcs (relative to the
+            edge start) of the arc of station_edge ending at the station
+    """
+
+    def __init__(self, graph):
+        """
+        Args:
+            graph (CompactGraph) : the graph to compress
+        """
+        self.graph = graph
+        count = graph.station_count
+        indptr, arc_head = graph.indptr, graph.arc_head
+
+        chain = [indptr[index + 1] - indptr[index] == 2
+                 and arc_head[indptr[index]] != arc_head[indptr[index] + 1]
+                 for index in range(count)]
+        self.junction = [not is_chain for is_chain in chain]
+
+        # Loops of chain stations have no junction to start from: promote one
+        covered = [False] * count
+        for index in range(count):
+            if self.junction[index]:
+                for arc in range(indptr[index], indptr[index + 1]):
+                    for station in self.walk(arc):
+                        covered[station] = True
+        for index in range(count):
+            if chain[index] and not covered[index]:
+                self.junction[index] = True
+                for station in self.walk(indptr[index]):
+                    covered[station] = True
+
+        self.edge_indptr = array('i', [0] * (count + 1))
+        self.edge_head, self.edge_time = array('i'), array('d')
+        self.edge_start, self.chain_arcs, self.chain_prefix = array('i', [0]), array('i'), array('d')
+        self.station_edge = array('i', [-1] * count)
+        self.station_position = array('i', [-1] * count)
+        first_arcs = {}  # key: first arc of a super-edge, value: super-edge
+        for index in range(count):
+            if self.junction[index]:
+                for arc in range(indptr[index], indptr[index + 1]):
+                    edge = len(self.edge_head)
+                    first_arcs[arc] = edge
+                    total = 0.0
+                    for position, chain_arc in enumerate(self.walk_arcs(arc)):
+                        total += graph.arc_time[chain_arc]
+                        self.chain_arcs.append(chain_arc)
+                        self.chain_prefix.append(total)
+                        head = arc_head[chain_arc]
+                        if not self.junction[head] and self.station_edge[head] == -1:
+                            self.station_edge[head] = edge
+                            self.station_position[head] = position
+                    self.edge_head.append(head)
+                    self.edge_time.append(total)
+                    self.edge_start.append(len(self.chain_arcs))
+            self.edge_indptr[index + 1] = len(self.edge_head)
+
+        # The twin of a super-edge starts with the reverse of its last arc
+        self.arc_twin = self.twin_arcs()
+        self.edge_twin = array('i', [first_arcs[self.arc_twin[self.chain_arcs[self.edge_start[edge + 1] - 1]]]
+                                     for edge in range(len(self.edge_head))])
+
+
+    def twin_arcs(self):
+        """ Return the arc running the other way along the same connection, for every arc. """
+        graph = self.graph
+        by_connection = {(graph.arc_connection[arc], graph.arc_tail[arc]): arc for arc in range(graph.arc_count)}
+        return array('i', [by_connection[(graph.arc_connection[arc], graph.arc_head[arc])]
+                           for arc in range(graph.arc_count)])
+
+
+    def walk_arcs(self, arc):
+        """ Follow the arcs of a chain from `arc` until a junction is reached. """
+        graph = self.graph
+        start = graph.arc_tail[arc]
+        arcs = [arc]
+        while not self.junction[graph.arc_head[arc]] and graph.arc_head[arc] != start:
+            station = graph.arc_head[arc]
+            first = graph.indptr[station]
+            # Leave through the arc that does not go back
+            arc = first if graph.arc_head[first] != graph.arc_tail[arc] else first + 1
+            arcs.append(arc)
+        return arcs
+
+
+    def walk(self, arc):
+        """ Return the stations reached by walk_arcs(arc). """
+        return [self.graph.arc_head[chain_arc] for chain_arc in self.walk_arcs(arc)]
+
+
+    def chain_positions(self, station):
+        """ Return the (super-edge, position) pairs of a chain station, in
+        both directions. """
+        edge, position = self.station_edge[station], self.station_position[station]
+        twin = self.edge_twin[edge]
+        length = self.edge_start[edge + 1] - self.edge_start[edge]
+        return [(edge, position), (twin, length - 2 - position)]
+
+
+    @property
+    def junction_count(self):
+        return sum(self.junction)
+
+    @property
+    def edge_count(self):
+        return len(self.edge_head)
+
+
+    def statistics(self):
+        """ Report how much the graph was compressed.
+
+        Returns:
+            dict : number of stations, junctions, arcs and super-edges.
+        """
+        return {
+            "stations": self.graph.station_count,
+            "junctions": self.junction_count,
+            "arcs": self.graph.arc_count,
+            "super_edges": self.edge_count,
+        }
+
+
+class ComponentIndex:
+    """ Connected components of a CompactGraph, kept up to date as stations
+    and connections are disabled and enabled again.
+
+    Every connection gives arcs in both directions, so components are those
+    of the undirected graph. Each station carries the label of its
+    component, and each label the set of its stations, so "can a reach b?"
+    and "which stations can a reach?" are answered in O(1).
+
+    Enabling is a union-find merge: the labels of the smaller component are
+    rewritten (union by size), which costs O(log n) amortised per station.
+    Disabling cannot be undone by a union-find, so only the component that
+    contained the disabled station or connection is searched again, in time
+    proportional to its size.
+
+    Attributes:
+        labels (list[int]) : component label of every station (-1 if the
+            station is disabled)
+        members (dict) : key: label, value: set of station indices
+        disabled_stations (set[int]) : indices of the disabled stations
+        disabled_connections (set[int]) : indices (in tubemap.connections)
+            of the disabled connections
+    """
+
+    def __init__(self, graph):
+        """
+        Args:
+            graph (CompactGraph) : the graph to index
+        """
+        self.graph = graph
+        self.disabled_stations = set()
+        self.disabled_connections = set()
+
+        # Arcs of every connection, to disable both directions at once
+        self.connection_arcs = {}
+        for arc, connection in enumerate(graph.arc_connection):
+            self.connection_arcs.setdefault(connection, []).append(arc)
+
+        self.labels = [-1] * graph.station_count
+        self.members = {}
+        self._next_label = 0
+        self.label_stations(range(graph.station_count))
+
+
+    def arc_enabled(self, arc):
+        """ Check whether an arc can be used: its connection and head are enabled. """
+        return (self.graph.arc_connection[arc] not in self.disabled_connections
+                and self.graph.arc_head[arc] not in self.disabled_stations)
+
+
+    def label_stations(self, stations):
+        """ Give fresh labels to the components spanned by `stations`.
+
+        Args:
+            stations (iterable[int]) : enabled stations, closed under the
+                enabled arcs (e.g. the stations of an old component)
+        """
+        graph = self.graph
+        unlabelled = set(stations)
+        for station in unlabelled:
+            self.labels[station] = -1
+        for source in sorted(unlabelled):
+            if self.labels[source] != -1:
+                continue
+            label = self._next_label
+            self._next_label += 1
+            component = {source}
+            self.labels[source] = label
+            stack = [source]
+            while stack:
+                station = stack.pop()
+                for arc in range(graph.indptr[station], graph.indptr[station + 1]):
+                    head = graph.arc_head[arc]
+                    if self.labels[head] == -1 and head in unlabelled and self.arc_enabled(arc):
+                        self.labels[head] = label
+                        component.add(head)
+                        stack.append(head)
+            self.members[label] = component
+
+
+    def union(self, first, second):
+        """ Merge the components of two enabled stations (union by size). """
+        first_label, second_label = self.labels[first], self.labels[second]
+        if first_label == second_label:
+            return
+        if len(self.members[first_label]) < len(self.members[second_label]):
+            first_label, second_label = second_label, first_label
+        smaller = self.members.pop(second_label)
+        for station in smaller:
+            self.labels[station] = first_label
+        self.members[first_label] |= smaller
+
+
+    def split(self, station):
+        """ Search the old component of `station` again after a removal. """
+        old = self.members.pop(self.labels[station])
+        self.label_stations(old - self.disabled_stations)
+        for disabled in old & self.disabled_stations:
+            self.labels[disabled] = -1
+
+
+    def disable_station(self, index):
+        """ Remove a station (and every arc through it) from the components. """
+        if index in self.disabled_stations:
+            return
+        self.disabled_stations.add(index)
+        self.split(index)
+
+
+    def enable_station(self, index):
+        """ Put a disabled station back, merging it with its neighbours. """
+        if index not in self.disabled_stations:
+            return
+        self.disabled_stations.discard(index)
+        label = self._next_label
+        self._next_label += 1
+        self.labels[index] = label
+        self.members[label] = {index}
+        for arc in range(self.graph.indptr[index], self.graph.indptr[index + 1]):
+            if self.arc_enabled(arc):
+                self.union(index, self.graph.arc_head[arc])
+
+
+    def disable_connection(self, connection):
+        """ Remove a connection (index in tubemap.connections). """
+        if connection in self.disabled_connections or connection not in self.connection_arcs:
+            return
+        self.disabled_connections.add(connection)
+        tail = self.graph.arc_tail[self.connection_arcs[connection][0]]
+        if tail not in self.disabled_stations:
+            self.split(tail)
+
+
+    def enable_connection(self, connection):
+        """ Put a disabled connection back, merging its two components. """
+        if connection not in self.disabled_connections:
+            return
+        self.disabled_connections.discard(connection)
+        for arc in self.connection_arcs[connection]:
+            tail = self.graph.arc_tail[arc]
+            if tail not in self.disabled_stations and self.arc_enabled(arc):
+                self.union(tail, self.graph.arc_head[arc])
+
+
+    def connected(self, first, second):
+        """ Check whether station `second` can be reached from station `first`. """
+        return self.labels[first] != -1 and self.labels[first] == self.labels[second]
+
+
+    def reachable(self, index):
+        """ Return the stations reachable from a station (itself included).
+
+        The set is shared with the index: copy it before modifying it.
+
+        Returns:
+            set[int] : station indices (empty if the station is disabled).
+        """
+        label = self.labels[index]
+        return self.members[label] if label != -1 else frozenset()
+
+
+    @property
+    def component_count(self):
+        return len(self.members)
+
+
+    @property
+    def intact(self):
+        """ True while no station or connection is disabled. """
+        return not self.disabled_stations and not self.disabled_connections
+
+
+    def excluded_arcs(self):
+        """ Return the arcs of the disabled connections, for a RouteFilter. """
+        return [arc for connection in self.disabled_connections for arc in self.connection_arcs[connection]]
+
+
 def calculate_total_connections(network: dict) -> int:
     total_connections = 0
     
@@ -0,0 +1,322 @@
+import heapq
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from network.route import Route
+
+# Header of a serialised index: magic, format version, number of stations,
+# number of label entries, checksum of the graph (CompactGraph.checksum:
+# station ids, arc ends, times and lines; little-endian)
+LABELS_HEADER = struct.Struct("<4sHIII")
+LABELS_MAGIC = b"TUBL"
+LABELS_FORMAT_VERSION = 1
+
+
+class HubLabelIndex:
+    """ Two-hop hub labelling of a CompactGraph (pruned landmark labelling).
+
+    Every station v gets a label: a list of (hub, distance) pairs sorted by
+    hub rank, such that for any two stations a and b, some hub on a shortest
+    a-b path appears in both labels. The travel time between a and b is then
+    the minimum of d(a, hub) + d(hub, b) over their common hubs, found by
+    merging the two sorted labels.
+
+    Labels are built with one pruned Dijkstra per station, in decreasing
+    order of importance (degree): a search from hub h stops expanding a
+    station as soon as the labels built so far already give a distance as
+    short as the current one.
+
+    Each label entry also keeps the arc through which the station was reached
+    from the hub, so that paths can be recovered, not only travel times.
+    """
+
+    def __init__(self, graph):
+        """
+        Args:
+            graph (CompactGraph) : the graph to index
+        """
+        self.graph = graph
+        self.order = array('i')  # rank -> station index
+        self.hubs = []  # per station: array of hub ranks (sorted)
+        self.distances = []  # per station: array of distances to the hubs
+        self.parents = []  # per station: array of arcs towards the hubs (-1 at the hub)
+
+
+    def build(self):
+        """ Compute the labels of every station.
+
+        Returns:
+            HubLabelIndex : self, for chaining.
+        """
+        graph = self.graph
+        count = graph.station_count
+
+        # Most connected stations first: they cover the most shortest paths
+        order = sorted(range(count), key=lambda index: -(graph.indptr[index + 1] - graph.indptr[index]))
+        self.order = array('i', order)
+        self.hubs = [array('i') for _ in range(count)]
+        self.distances = [array('d') for _ in range(count)]
+        self.parents = [array('i') for _ in range(count)]
+
+        # Scratch space reused by every pruned search
+        tentative = [float('inf')] * count
+        hub_distances = [float('inf')] * count  # distances from the current hub, by hub rank
+
+        for rank, hub in enumerate(order):
+            # Index the current hub's label by rank for O(1) pruning tests
+            for hub_rank, distance in zip(self.hubs[hub], self.distances[hub]):
+                hub_distances[hub_rank] = distance
+
+            touched = [hub]
+            settled = set()
+            tentative[hub] = 0
+            priority_queue = [(0, hub, -1)]
+
+            while priority_queue:
+                current_distance, current, parent_arc = heapq.heappop(priority_queue)
+                if current_distance > tentative[current] or current in settled:
+                    continue
+                settled.add(current)
+
+                # Prune if the labels already give a path at least as short
+                if self.query_with(hub_distances, current) <= current_distance:
+                    continue
+
+                self.hubs[current].append(rank)
+                self.distances[current].append(current_distance)
+                self.parents[current].append(parent_arc)
+
+                for arc in range(graph.indptr[current], graph.indptr[current + 1]):
+                    neighbour = graph.arc_head[arc]
+                    new_distance = current_distance + graph.arc_time[arc]
+                    if new_distance < tentative[neighbour]:
+                        if tentative[neighbour] == float('inf'):
+                            touched.append(neighbour)
+                        tentative[neighbour] = new_distance
+                        heapq.heappush(priority_queue, (new_distance, neighbour, arc))
+
+            # Reset the scratch space touched by this search only
+            for index in touched:
+                tentative[index] = float('inf')
+            for hub_rank in self.hubs[hub]:
+                hub_distances[hub_rank] = float('inf')
+
+        return self
+
+
+    def query_with(self, hub_distances, station):
+        """ Best distance from the current hub to `station` through the labels. """
+        best = float('inf')
+        for hub_rank, distance in zip(self.hubs[station], self.distances[station]):
+            total = hub_distances[hub_rank] + distance
+            if total < best:
+                best = total
+        return best
+
+
+    def query(self, start, end):
+        """ Merge the labels of two stations.
+
+        Args:
+            start (int) : station index
+            end (int) : station index
+
+        Returns:
+            tuple(float, int) : (travel time, rank of the best common hub).
+                The travel time is inf (and the hub None) if `end` cannot be
+                reached from `start`.
+        """
+        hubs_start, hubs_end = self.hubs[start], self.hubs[end]
+        distances_start, distances_end = self.distances[start], self.distances[end]
+
+        best, best_hub = float('inf'), None
+        i, j = 0, 0
+        # Both labels are sorted by hub rank: walk them in step
+        while i < len(hubs_start) and j < len(hubs_end):
+            hub_start, hub_end = hubs_start[i], hubs_end[j]
+            if hub_start == hub_end:
+                total = distances_start[i] + distances_end[j]
+                if total < best:
+                    best, best_hub = total, hub_start
+                i += 1
+                j += 1
+            elif hub_start < hub_end:
+                i += 1
+            else:
+                j += 1
+        return best, best_hub
+
+
+    def travel_time(self, start_station_id, end_station_id):
+        """ Shortest travel time between two stations, without the path.
+
+        Args:
+            start_station_id (str) : id of the starting station
+            end_station_id (str) : id of the ending station
+
+        Returns:
+            float : travel time (in minutes). Returns None if a station does
+                not exist or the stations are not connected.
+        """
+        start = self.graph.station_index.get(start_station_id)
+        end = self.graph.station_index.get(end_station_id)
+        if start is None or end is None:
+            return None
+        best, _ = self.query(start, end)
+        return None if best == float('inf') else best
+
+
+    def shortest_path(self, start_station_id, end_station_id):
+        """ Recover ONE shortest path between two stations from the labels.
+
+        Returns:
+            Route : the path, going through the best common hub.
+                Returns None if a station does not exist or the stations are
+                not connected.
+        """
+        start = self.graph.station_index.get(start_station_id)
+        end = self.graph.station_index.get(end_station_id)
+        if start is None or end is None:
+            return None
+        best, hub_rank = self.query(start, end)
+        if hub_rank is None:
+            return None
+
+        # start -> hub, following the parent arcs towards the hub
+        indices, line_indices = array('I', [start]), array('H')
+        for arc in self.arcs_to_hub(start, hub_rank):
+            line_indices.append(self.graph.arc_line[arc])
+            indices.append(self.graph.arc_tail[arc])
+
+        # hub -> end is the reverse of end -> hub
+        end_indices, end_lines = array('I', [end]), array('H')
+        for arc in self.arcs_to_hub(end, hub_rank):
+            end_lines.append(self.graph.arc_line[arc])
+            end_indices.append(self.graph.arc_tail[arc])
+        end_indices.reverse()
+        end_lines.reverse()
+
+        # Both halves share the hub
+        indices.extend(end_indices[1:])
+        line_indices.extend(end_lines)
+
+        return Route(self.graph.stations, self.graph.lines, indices, best, line_indices)
+
+
+    def arcs_to_hub(self, station, hub_rank):
+        """ Return the arcs from the hub's search tree, walking from `station` up to the hub. """
+        arcs = []
+        current = station
+        while True:
+            position = bisect_left(self.hubs[current], hub_rank)
+            arc = self.parents[current][position]
+            if arc < 0:
+                return arcs
+            arcs.append(arc)
+            current = self.graph.arc_tail[arc]
+
+
+    def statistics(self):
+        """ Report label size statistics.
+
+        Returns:
+            dict : number of stations, total/average/maximum label size and
+                approximate memory used by the labels (in bytes).
+        """
+        sizes = [len(hubs) for hubs in self.hubs]
+        entries = sum(sizes)
+        entry_size = array('i').itemsize * 2 + array('d').itemsize
+        return {
+            "stations": len(sizes),
+            "label_entries": entries,
+            "average_label_size": entries / len(sizes) if sizes else 0,
+            "max_label_size": max(sizes, default=0),
+            "memory_bytes": entries * entry_size,
+        }
+
+
+    def to_bytes(self):
+        """ Serialise the labels, e.g. to store them alongside the map.
+
+        Returns:
+            bytes : header, hub order, label sizes, then the flat hub,
+                distance and parent arrays.
+        """
+        sizes = array('i', [len(hubs) for hubs in self.hubs])
+        hubs, distances, parents = array('i'), array('d'), array('i')
+        for station in range(len(self.hubs)):
+            hubs.extend(self.hubs[station])
+            distances.extend(self.distances[station])
+            parents.extend(self.parents[station])
+
+        header = LABELS_HEADER.pack(LABELS_MAGIC, LABELS_FORMAT_VERSION, len(sizes),
+                                    len(hubs), self.graph.checksum())
+        chunks = [header]
+        for values in (self.order, sizes, hubs, distances, parents):
+            values = array(values.typecode, values)
+            if sys.byteorder == "big":
+                values.byteswap()
+            chunks.append(values.tobytes())
+        return b"".join(chunks)
+
+
+    @classmethod
+    def from_bytes(cls, data, graph):
+        """ Load labels written by `to_bytes()` for the same graph.
+
+        Args:
+            data (bytes) : serialised labels
+            graph (CompactGraph) : the graph the labels were built on
+
+        Returns:
+            HubLabelIndex : the loaded index. Returns None if the data is not
+                valid or was built for a different graph (other stations,
+                connections, times or lines).
+        """
+        index = cls(graph)
+        if len(data) < LABELS_HEADER.size:
+            return None
+        magic, version, count, entries, checksum = LABELS_HEADER.unpack_from(data)
+        if (magic != LABELS_MAGIC or version != LABELS_FORMAT_VERSION
+                or count != graph.station_count or checksum != graph.checksum()):
+            return None
+
+        offset = LABELS_HEADER.size
+        arrays = []
+        for typecode, length in (('i', count), ('i', count), ('i', entries), ('d', entries), ('i', entries)):
+            values = array(typecode)
+            end = offset + length * values.itemsize
+            if end > len(data):
+                return None
+            values.frombytes(data[offset:end])
+            if sys.byteorder == "big":
+                values.byteswap()
+            arrays.append(values)
+            offset = end
+        order, sizes, hubs, distances, parents = arrays
+
+        index.order = order
+        start = 0
+        for size in sizes:
+            index.hubs.append(hubs[start:start + size])
+            index.distances.append(distances[start:start + size])
+            index.parents.append(parents[start:start + size])
+            start += size
+        return index
+
+
+    def save(self, filepath):
+        """ Write the serialised labels to `filepath`. """
+        with open(filepath, 'wb') as f:
+            f.write(self.to_bytes())
+
+
+    @classmethod
+    def load(cls, filepath, graph):
+        """ Read labels saved with `save()`. Returns None if invalid. """
+        try:
+            with open(filepath, 'rb') as f:
+                return cls.from_bytes(f.read(), graph)
+        except OSError:
+            return None
@@ -0,0 +1,248 @@
+import heapq
+import time
+from array import array
+from network.engines import CSREngine, SearchResult
+
+# Landmark selection strategies
+LANDMARK_STRATEGIES = ("farthest", "avoid")
+
+
+class LandmarkIndex:
+    """ ALT (A*, Landmarks, Triangle inequality) preprocessing of a graph.
+
+    A few landmark stations are chosen and the distance from each of them to
+    every station is stored. For any landmark L, the triangle inequality
+    gives |d(L, t) - d(L, v)| <= d(v, t), so the maximum over the landmarks
+    is a lower bound on the remaining time from v to the target t. It is used
+    as the A* heuristic, which only relies on the network itself and not on
+    the quality of the station coordinates.
+
+    More landmarks give tighter bounds (fewer settled stations) at the cost
+    of one distance vector per landmark in memory and one full search per
+    landmark at build time.
+    """
+
+    def __init__(self, graph, count=8, strategy="farthest"):
+        """
+        Args:
+            graph (CompactGraph) : the graph to preprocess
+            count (int) : number of landmarks
+            strategy (str) : "farthest" (each landmark is the station
+                farthest from the ones already chosen) or "avoid" (grow the
+                landmark set in the regions where the current bounds are
+                the weakest)
+        """
+        if strategy not in LANDMARK_STRATEGIES:
+            raise ValueError(f"Unknown landmark strategy {strategy!r}, expected one of {LANDMARK_STRATEGIES}.")
+        self.graph = graph
+        self.count = count
+        self.strategy = strategy
+        self.engine = CSREngine(graph)
+        self.landmarks = []  # station indices
+        self.distances = []  # per landmark: array of distances to every station
+        self.vectors = []  # per station: tuple of distances from every landmark
+        self.build_seconds = 0.0
+
+
+    def build(self):
+        """ Select the landmarks and precompute their distance vectors.
+
+        Returns:
+            LandmarkIndex : self, for chaining.
+        """
+        start_time = time.perf_counter()
+        self.landmarks, self.distances = [], []
+
+        count = min(self.count, self.graph.station_count)
+        while len(self.landmarks) < count:
+            if self.strategy == "farthest":
+                landmark = self.select_farthest()
+            else:
+                landmark = self.select_avoid()
+            if landmark is None or landmark in self.landmarks:
+                break
+            self.landmarks.append(landmark)
+            self.distances.append(array('d', self.engine.search({landmark: 0}).distances))
+
+        # Transpose for the heuristic: one small tuple per station
+        self.vectors = list(zip(*self.distances)) if self.distances else []
+        self.build_seconds = time.perf_counter() - start_time
+        return self
+
+
+    def select_farthest(self):
+        """ Pick the station farthest from the current landmarks.
+
+        The first landmark is the station farthest from the most connected
+        one. Stations that no landmark reaches (other components) come first.
+        """
+        if not self.landmarks:
+            graph = self.graph
+            root = max(range(graph.station_count), key=lambda index: graph.indptr[index + 1] - graph.indptr[index])
+            distances = [self.engine.search({root: 0}).distances]
+        else:
+            distances = self.distances
+
+        best, best_distance = None, -1.0
+        for index in range(self.graph.station_count):
+            if index in self.landmarks:
+                continue
+            closest = min(row[index] for row in distances)
+            if closest > best_distance:
+                best, best_distance = index, closest
+        return best
+
+
+    def select_avoid(self):
+        """ Pick a landmark with the "avoid" heuristic (Goldberg & Werneck).
+
+        From a root station, the shortest-path tree is weighted by how much
+        the current bounds underestimate the real distance from the root.
+        The walk then descends into the heaviest subtree that contains no
+        landmark, and the leaf it ends at becomes the next landmark.
+        """
+        graph = self.graph
+        covered = [False] * graph.station_count
+        for landmark in self.landmarks:
+            covered[landmark] = True
+
+        # Root: farthest station from the landmarks (or most connected one)
+        root = self.select_farthest() if self.landmarks else max(
+            range(graph.station_count), key=lambda index: graph.indptr[index + 1] - graph.indptr[index])
+        if root is None:
+            return None
+
+        result = self.engine.search({root: 0})
+        root_vector = [row[root] for row in self.distances]
+
+        # Weight of every station: d(root, v) - lower_bound(root, v)
+        weights = [0.0] * graph.station_count
+        for index, distance in enumerate(result.distances):
+            if distance != float('inf'):
+                weights[index] = distance - self.bound(root_vector, [row[index] for row in self.distances])
+
+        # Children lists of the shortest-path tree, then subtree sizes bottom-up
+        children = [[] for _ in range(graph.station_count)]
+        for index, arc in enumerate(result.previous):
+            if arc >= 0:
+                children[graph.arc_tail[arc]].append(index)
+        order = sorted((index for index, distance in enumerate(result.distances) if distance != float('inf')),
+                       key=lambda index: -result.distances[index])
+        sizes = [0.0] * graph.station_count
+        for index in order:
+            if covered[index]:
+                sizes[index] = 0.0
+                continue
+            subtree = [sizes[child] for child in children[index]]
+            # A subtree containing a landmark already has good bounds
+            if any(covered[child] for child in children[index]):
+                sizes[index] = 0.0
+                covered[index] = True
+            else:
+                sizes[index] = weights[index] + sum(subtree)
+
+        # Descend towards the heaviest subtree until a leaf
+        current = root
+        while children[current]:
+            heaviest = max(children[current], key=lambda child: sizes[child])
+            if sizes[heaviest] <= 0:
+                break
+            current = heaviest
+        return current
+
+
+    @staticmethod
+    def bound(vector_from, vector_to):
+        """ Lower bound on the distance between two stations from their landmark distances. """
+        best = 0.0
+        for distance_from, distance_to in zip(vector_from, vector_to):
+            if distance_from == float('inf') or distance_to == float('inf'):
+                if distance_from != distance_to:
+                    # Only one of them is reachable from this landmark
+                    return float('inf')
+                continue
+            difference = abs(distance_to - distance_from)
+            if difference > best:
+                best = difference
+        return best
+
+
+    def search(self, source, target, workspace=None, max_settled=None, deadline=None):
+        """ A* search from `source` to `target` using the landmark bounds.
+
+        Args:
+            source (int) : station index
+            target (int) : station index
+            workspace (SearchWorkspace) : if given, lists reused instead of
+                allocated (see RoutingEngine.search)
+            max_settled (int), deadline (float) : search budget (see
+                RoutingEngine.search)
+
+        Returns:
+            SearchResult : distances and previous arcs of the search (best
+                target is `target` if reached, None otherwise).
+        """
+        graph = self.graph
+        indptr, arc_head, arc_time = graph.indptr, graph.arc_head, graph.arc_time
+        if workspace is not None:
+            workspace.reset()
+            distances, previous, touched = workspace.distances, workspace.previous, workspace.touched
+        else:
+            distances = [float('inf')] * graph.station_count
+            previous = [-1] * graph.station_count
+            touched = []
+
+        vectors = self.vectors
+        target_vector = vectors[target] if vectors else ()
+        bound = self.bound
+        heuristics = {}
+
+        distances[source] = 0
+        touched.append(source)
+        priority_queue = [(bound(vectors[source], target_vector) if vectors else 0, 0, source)]
+        settled = 0
+        budgeted = max_settled is not None or deadline is not None
+
+        while priority_queue:
+            estimate, current_distance, current = heapq.heappop(priority_queue)
+            if current_distance > distances[current]:
+                continue
+            settled += 1
+            if current == target:
+                return SearchResult(distances, previous, target, settled)
+
+            # Out of budget: the smallest estimate bounds the remaining journey
+            if budgeted and ((max_settled is not None and settled >= max_settled)
+                             or (deadline is not None and not settled & 15 and time.perf_counter() > deadline)):
+                return SearchResult(distances, previous, None, settled, True, estimate)
+
+            for arc in range(indptr[current], indptr[current + 1]):
+                neighbour = arc_head[arc]
+                new_distance = current_distance + arc_time[arc]
+                if new_distance < distances[neighbour]:
+                    distances[neighbour] = new_distance
+                    previous[neighbour] = arc
+                    touched.append(neighbour)
+                    heuristic = heuristics.get(neighbour)
+                    if heuristic is None:
+                        heuristic = bound(vectors[neighbour], target_vector) if vectors else 0
+                        heuristics[neighbour] = heuristic
+                    if heuristic != float('inf'):
+                        heapq.heappush(priority_queue, (new_distance + heuristic, new_distance, neighbour))
+
+        return SearchResult(distances, previous, None, settled)
+
+
+    def statistics(self):
+        """ Report the memory/speed trade-off of the landmarks.
+
+        Returns:
+            dict : number of landmarks, strategy, memory used by the distance
+                vectors (in bytes) and preprocessing time (in seconds).
+        """
+        return {
+            "landmarks": len(self.landmarks),
+            "strategy": self.strategy,
+            "memory_bytes": sum(row.itemsize * len(row) for row in self.distances),
+            "build_seconds": self.build_seconds,
+        }
@@ -0,0 +1,142 @@
+import heapq
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional
+    np = None
+
+# How the travel times of a group are combined into one score
+MEETING_OBJECTIVES = ("max", "sum")
+
+
+def combine(times, objective):
+    """ Score of a meeting station from the travel times of every origin. """
+    return max(times) if objective == "max" else sum(times)
+
+
+def meeting_points_batched(engine, origins, k, objective, route_filter=None):
+    """ Rank meeting stations from full one-to-all searches.
+
+    All origins are solved in one batch by the engine (a single vectorised
+    call with the SciPy engine), then the time vectors are merged with
+    NumPy when available. With a route filter, every origin is searched
+    on its own, checking the filter.
+
+    Args:
+        engine (RoutingEngine) : engine used for the searches
+        origins (list[int]) : station indices of the travellers
+        k (int) : number of meeting stations to return
+        objective (str) : "max" or "sum"
+        route_filter (RouteFilter) : restrictions, or None
+
+    Returns:
+        list[tuple(int, float, list[float])] : (station index, score, time
+            from every origin) of the k best stations, best first.
+    """
+    if route_filter is None:
+        rows = engine.one_to_all(origins)
+    else:
+        rows = [engine.search({origin: 0}, route_filter=route_filter).distances for origin in origins]
+
+    if np is not None:
+        matrix = np.asarray(rows, dtype=np.float64)
+        scores = matrix.max(axis=0) if objective == "max" else matrix.sum(axis=0)
+        reachable = np.nonzero(np.isfinite(scores))[0]
+        # Stable sort on the score keeps ties in station order
+        best = reachable[np.argsort(scores[reachable], kind="stable")[:k]]
+        return [(int(index), float(scores[index]), matrix[:, index].tolist()) for index in best]
+
+    columns = list(zip(*rows))
+    scores = [(combine(times, objective), index) for index, times in enumerate(columns)]
+    best = heapq.nsmallest(k, (score for score in scores if score[0] != float('inf')))
+    return [(index, score, list(columns[index])) for score, index in best]
+
+
+def meeting_points_incremental(graph, origins, k, objective, route_filter=None):
+    """ Rank meeting stations, stopping the searches as early as possible.
+
+    One Dijkstra per origin is run in lockstep, always advancing the search
+    with the smallest radius. A station gets its score once every search has
+    settled it. A station missing origin i is at least radius_i away from
+    it, which bounds the score of every incomplete station: the searches
+    stop once k complete stations score no more than that bound.
+
+    Args:
+        graph (CompactGraph) : the graph to search
+        origins (list[int]) : station indices of the travellers
+        k (int) : number of meeting stations to return
+        objective (str) : "max" or "sum"
+        route_filter (RouteFilter) : restrictions, or None
+
+    Returns:
+        list[tuple(int, float, list[float])] : same as meeting_points_batched.
+    """
+    count = len(origins)
+    indptr, arc_head, arc_time = graph.indptr, graph.arc_head, graph.arc_time
+
+    distances = [[float('inf')] * graph.station_count for _ in origins]
+    settled = [[False] * graph.station_count for _ in origins]
+    queues = []
+    for search, origin in enumerate(origins):
+        distances[search][origin] = 0
+        queues.append([(0, origin)])
+
+    settled_by = [0] * graph.station_count  # number of searches that settled a station
+    partial = set()  # stations settled by some, but not all, searches
+    complete = []  # (score, station index)
+    check_every = max(count, 1)
+    steps = 0
+
+    def radius(search):
+        queue = queues[search]
+        return queue[0][0] if queue else float('inf')
+
+    def lower_bound():
+        radii = [radius(search) for search in range(count)]
+        # Stations that no search has settled yet
+        bound = combine(radii, objective)
+        for index in partial:
+            times = [distances[search][index] if settled[search][index] else radii[search]
+                     for search in range(count)]
+            bound = min(bound, combine(times, objective))
+        return bound
+
+    while True:
+        # Advance the search with the smallest radius
+        search = min(range(count), key=radius)
+        queue = queues[search]
+        if not queue:
+            break  # every search is exhausted
+
+        current_distance, current = heapq.heappop(queue)
+        if settled[search][current] or current_distance > distances[search][current]:
+            continue
+        settled[search][current] = True
+
+        settled_by[current] += 1
+        if settled_by[current] == count:
+            partial.discard(current)
+            times = [distances[other][current] for other in range(count)]
+            complete.append((combine(times, objective), current))
+        else:
+            partial.add(current)
+
+        for arc in range(indptr[current], indptr[current + 1]):
+            if route_filter is not None and not route_filter.allows_arc(arc):
+                continue
+            neighbour = arc_head[arc]
+            new_distance = current_distance + arc_time[arc]
+            if new_distance < distances[search][neighbour]:
+                distances[search][neighbour] = new_distance
+                heapq.heappush(queue, (new_distance, neighbour))
+
+        # Stop once no incomplete station can enter the top k
+        steps += 1
+        if len(complete) >= k and steps % check_every == 0:
+            kth_score = heapq.nsmallest(k, complete)[-1][0]
+            if kth_score <= lower_bound():
+                break
+
+    best = heapq.nsmallest(k, complete)
+    return [(index, score, [distances[search][index] for search in range(count)])
+            for score, index in best]
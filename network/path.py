@@ -1,5 +1,18 @@
-import heapq
-from network.graph import NeighbourGraphBuilder
+import threading
+import time
+from array import array
+from network.graph import NeighbourGraphBuilder, RouteFilter
+from network.engines import WorkspacePool, get_engine
+from network.hublabels import HubLabelIndex
+from network.landmarks import LandmarkIndex
+from network.transfers import MAX_TRANSFERS, TransferPatternIndex
+from network.popularity import PopularityStore, TreeCache
+from network.meeting import MEETING_OBJECTIVES, meeting_points_batched, meeting_points_incremental
+from network.route import Route
+from network.routetable import export_route_table
+
+# Average walking speed (in metres per minute), i.e. about 4.8 km/h
+WALKING_SPEED = 80
 
 class PathFinder:
     """
@@ -9,23 +22,71 @@ class PathFinder:
       your code into several sub-methods)
     """
 
-    def __init__(self, tubemap):
+    def __init__(self, tubemap, engine="python"):
         """
         Args:
             tubemap (TubeMap) : The TubeMap to use.
+            engine (str) : routing engine used for the searches, one of
+                "python" (heap Dijkstra on adjacency lists), "csr" (heap 
+                Dijkstra on flat arrays), "scipy" (vectorised, needs 
+                NumPy/SciPy, falls back to "csr" if they are missing) or
+                "chains" (heap Dijkstra on the junctions only, see ChainGraph).
         """
         self.tubemap = tubemap
 
         graph_builder = NeighbourGraphBuilder()
         self.graph = graph_builder.build(self.tubemap)
+        self.compact_graph = graph_builder.build_compact(self.tubemap)
+        self.components = graph_builder.build_components(self.compact_graph)
+        self.engine = get_engine(engine, self.compact_graph)
+
+        # Per-thread search lists, so that short queries do not pay for the
+        # whole network and threads can share this PathFinder without locks
+        self.workspaces = WorkspacePool(self.compact_graph.station_count)
+
+        # Index tables used by Route results
+        self.station_list = self.compact_graph.stations
+        self.line_list = self.compact_graph.lines
+
+        # Optional two-hop labels for travel-time-only queries
+        self.hub_labels = None
+
+        # Optional ALT landmarks for goal-directed searches
+        self.landmarks = None
+
+        # Transfer patterns for line-aware queries (origins computed on demand)
+        self.transfer_patterns = None
+
+        # Arc weights of every time-of-day bucket, computed once
+        self.weight_profiles = self.build_weight_profiles()
+
+        # Instrumentation: query counters and preprocessing trade-offs
+        self.stats = {"queries": 0, "settled": 0, "unreachable": 0,
+                      "budget_exceeded": 0, "approximate": 0, "table_fallbacks": 0,
+                      "tree_cache_hits": 0, "tree_cache_misses": 0,
+                      "warmup_origins": 0, "warmup_done": 0, "warmup_seconds": 0.0}
+
+        # Optional QueryRecorder logging every get_shortest_path call
+        self.recorder = None
+
+        # Optional origin/destination counts and shortest-path tree cache
+        # (see warm_up)
+        self.popularity = None
+        self.tree_cache = None
+        self.tree_origins = set()  # warmed-up origins, whose trees are kept
+        self.tree_min_queries = 20  # queries from an origin before its tree is built
+        self.warmup_thread = None
 
 
     def find_station_by_name(self, station_name):
-        """Helper method to find a station object by its name."""
-        for station in self.tubemap.stations.values():  # Iterate over dictionary values (Station objects)
-            if station.name == station_name:
-                return station
-        return None
+        """Helper method to find a station object by its name.
+
+        Returns None if no station, or several stations (of different
+        networks), have this name: qualify it with a namespace then, e.g.
+        "dlr:Bank" (see TubeMap.find_stations_by_name).
+        """
+        stations = self.tubemap.find_stations_by_name(station_name)
+        return stations[0] if len(stations) == 1 else None
     
 
     def find_station_by_id(self, station_id):
@@ -35,7 +96,9 @@ class PathFinder:
         return None
             
         
-    def get_shortest_path(self, start_station_name, end_station_name):
+    def get_shortest_path(self, start_station_name, end_station_name,
+                          allowed_zones=None, excluded_lines=None, excluded_stations=None,
+                          departure_time=None, deadline=None, max_settled=None):
         """ Find ONE shortest path from start_station_name to end_station_name.
         
         The shortest path is the path that takes the least amount of time.
@@ -63,15 +126,39 @@ class PathFinder:
         Args:
             start_station_name (str): name of the starting station
             end_station_name (str): name of the ending station
+            allowed_zones (iterable[int]) : if given, the route only uses
+                stations in these zones
+            excluded_lines (iterable[str]) : ids or names of lines to avoid
+            excluded_stations (iterable[str]) : ids or names of stations to
+                avoid
+            departure_time (datetime.time, str or int) : if given, travel 
+                times of the time-of-day bucket containing this time are 
+                used (see TubeMap.import_profiles_from_json)
+            deadline (float) : if given, seconds the query may take (e.g.
+                0.005). Past it, the search stops and the best route found
+                so far is returned, or else a route from the precomputed
+                tables (see fallback_route), flagged as approximate.
+            max_settled (int) : if given, maximum number of stations the
+                search may settle, with the same fallbacks
 
         Returns:
-            list[Station] : list of Station objects corresponding to ONE 
+            Route : list-like sequence of Station objects corresponding to ONE 
                 shortest path from start_station_name to end_station_name.
+                It also gives the total time and the line of every leg.
                 Returns None if start_station_name or end_station_name does not 
-                exist.
+                exist or is disabled, or if no route satisfies the restrictions
+                (or none was found within the budget).
                 Returns a list with one Station object (the station itself) if 
                 start_station_name and end_station_name are the same.
+                If the budget ran out, `route.approximate` is True and
+                `route.error_bound` bounds how much faster the best route is.
         """
+        started = time.perf_counter()
+        if self.recorder is not None:
+            self.recorder.record(start_station_name, end_station_name, allowed_zones=allowed_zones,
+                                 excluded_lines=excluded_lines, excluded_stations=excluded_stations,
+                                 departure_time=departure_time, deadline=deadline, max_settled=max_settled)
+
         # Retrieve start and end stations by name
         start_station = self.find_station_by_name(start_station_name)
         end_station = self.find_station_by_name(end_station_name)
@@ -79,62 +166,684 @@ class PathFinder:
         if not start_station or not end_station:
             return None
         
+        if self.popularity is not None:
+            self.popularity.record(start_station.id, end_station.id)
+
+        start = self.compact_graph.station_index[start_station.id]
+        end = self.compact_graph.station_index[end_station.id]
+
+        # Different components: no search can succeed, even a filtered one
+        if not self.components.connected(start, end):
+            self.stats["unreachable"] += 1
+            return None
+
+        # Restrictions are checked during the search, on the shared graph
+        route_filter = self.get_route_filter(allowed_zones, excluded_lines, excluded_stations)
+        if route_filter is not None and not (route_filter.allows_station(start)
+                                             and route_filter.allows_station(end)):
+            return None
+
         # If start and end stations are the same, return the station itself
-        if start_station == end_station:
-            return [start_station]
+        if start == end:
+            return self.build_route([], end, 0)
         
-        # Initialize Dijkstra's algorithm
-        ## All distances are initialized to infinity
-        distances = {station.id: float('inf') for station in self.tubemap.stations.values()}
+        weights = self.get_weights(departure_time)
 
-        ## The distance from the start station to itself is None
-        previous = {station.id: None for station in self.tubemap.stations.values()}
+        # Cached trees answer unrestricted queries without any search
+        if self.tree_cache is not None and route_filter is None and weights is None:
+            tree = self.tree_cache.get(start)
+            if tree is not None:
+                self.stats["tree_cache_hits"] += 1
+            else:
+                self.stats["tree_cache_misses"] += 1
+                # Only popular origins are worth a whole-network search
+                if max_settled is None and deadline is None and self.is_popular(start_station.id, start):
+                    tree = self.cache_tree(start)
+            if tree is not None:
+                self.stats["queries"] += 1
+                distances, previous = tree
+                if distances[end] == float('inf'):
+                    return None
+                return self.build_route(previous, end, distances[end])
 
-        ## The distance from the start station to itself is 0
-        distances[start_station.id] = 0
-        
-        ## Initialize the priority queue with the start station
-        priority_queue = [(0, start_station.id)]
-        heapq.heapify(priority_queue)
-        
-        # Run Dijkstra's algorithm 
-        ## Stop when priority_queue is empty
-        while priority_queue:
-            current_distance, current_station_id = heapq.heappop(priority_queue)
-
-            # Stop if we reached the destination
-            if current_station_id == end_station.id:
-                break
-            
-            # Iterate over every neighbors
-            for neighbor_id, connections in self.graph.get(current_station_id, {}).items():
-                # Find shortest connection time between all neighbors
-                total_time = min(conn.time for conn in connections)
-                # Add the connection time to the current distance 
-                new_distance = current_distance + total_time
-                
-                # If the new distance is shorter than the previous distance
-                if new_distance < distances[neighbor_id]:
-                    # Update the distance to the neighbor and the previous station
-                    distances[neighbor_id] = new_distance
-                    previous[neighbor_id] = current_station_id
-                    # Add the neighbor to the priority queue
-                    heapq.heappush(priority_queue, (new_distance, neighbor_id))
-        
-        # Reconstruct the path
-        path = []
-        current_id = end_station.id
-        # Reconstruct the path by following the previous station
-        while current_id is not None:
-            # Insert the station at the beginning of the path
-            path.insert(0, self.find_station_by_id(current_id))
-            current_id = previous[current_id]
-        
-        # If path reconstruction failed (no valid path)
-        if path[0] != start_station:
+        workspace = self.workspaces.get()
+        if deadline is not None:
+            deadline += started
+        if route_filter is not None or weights is not None:
+            result = self.engine.search({start: 0}, {end: 0}, route_filter, weights, workspace,
+                                        max_settled, deadline)
+        elif self.landmarks is not None:
+            result = self.landmarks.search(start, end, workspace, max_settled, deadline)
+        else:
+            result = self.engine.search({start: 0}, {end: 0}, workspace=workspace,
+                                        max_settled=max_settled, deadline=deadline)
+        self.stats["queries"] += 1
+        self.stats["settled"] += result.settled
+
+        if result.exhausted:
+            self.stats["budget_exceeded"] += 1
+            return self.best_effort_route(result, start, end, route_filter, weights)
+
+        # If the end station was never reached (no valid path)
+        if result.best_target is None:
             return None
-        
-        return path
+
+        return self.build_route(result.previous, end, result.distances[end])
+
+
+    def get_route_filter(self, allowed_zones=None, excluded_lines=None, excluded_stations=None):
+        """ Combine restrictions with the closures of the network.
+
+        Returns:
+            RouteFilter : filter of the restrictions and of the disabled
+                stations and connections, or None if there are none.
+        """
+        if allowed_zones is None and not excluded_lines and not excluded_stations and self.components.intact:
+            return None
+        excluded_stations = list(excluded_stations or ()) + [
+            self.compact_graph.stations[index].id for index in self.components.disabled_stations]
+        return RouteFilter(self.compact_graph, allowed_zones, excluded_lines, excluded_stations,
+                           self.components.excluded_arcs())
+
+
+    def best_effort_route(self, result, start, end, route_filter, weights):
+        """ Make the most of a search whose budget ran out.
+
+        The candidates are the route to `end` the search had reached (not
+        necessarily the best one, since `end` was not settled) and the
+        route of the precomputed tables; the fastest one is returned. No
+        route can be faster than the search's lower bound, which gives the
+        error bound.
+
+        Returns:
+            Route : flagged as approximate (unless the table route is known
+                to be optimal), or None if there is no candidate.
+        """
+        candidates = []
+        if result.distances[end] != float('inf'):
+            candidates.append(self.build_route(result.previous, end, result.distances[end]))
+        table_route = self.fallback_route(start, end, route_filter, weights)
+        if table_route is not None:
+            candidates.append(table_route)
+        if not candidates:
+            return None
+
+        route = min(candidates, key=lambda candidate: candidate.total_time)
+        if route is table_route:
+            self.stats["table_fallbacks"] += 1
+            # Optimal on the full network and allowed here: optimal here too
+            if weights is None:
+                return route
+        route.approximate = True
+        route.error_bound = max(0.0, route.total_time - result.lower_bound)
+        self.stats["approximate"] += 1
+        return route
+
+
+    def fallback_route(self, start, end, route_filter=None, weights=None):
+        """ Look a route up in the precomputed tables, without searching.
+
+        The hub labels are used if they were built, else the transfer
+        patterns if those of `start` were computed. Both were computed on
+        the full network with the scheduled times, so the route is only
+        kept if `route_filter` allows it, and is timed again with `weights`.
+
+        Returns:
+            Route : the route, or None if no table can answer.
+        """
+        if self.hub_labels is not None:
+            route = self.hub_labels.shortest_path(self.station_list[start].id, self.station_list[end].id)
+        elif self.transfer_patterns is not None and self.transfer_patterns.has_origin(start):
+            route = self.transfer_patterns.query(start, end)
+        else:
+            return None
+        if route is None:
+            return None
+
+        arcs = self.compact_graph.route_arcs(route)
+        if route_filter is not None and not all(route_filter.allows_arc(arc) for arc in arcs):
+            return None
+        if weights is not None:
+            route.total_time = sum(weights[arc] for arc in arcs)
+        return route
+
+
+    def build_weight_profiles(self):
+        """ Precompute the arc weights of every time-of-day bucket.
+
+        Returns:
+            dict : key: bucket name, value: array of arc travel times.
+        """
+        profiles = self.tubemap.profiles
+        connections = self.tubemap.connections
+        arc_connection = self.compact_graph.arc_connection
+        return {
+            bucket_name: array('d', [profiles.connection_time(connections[connection], bucket_name)
+                                     for connection in arc_connection])
+            for bucket_name in profiles.bucket_names
+        }
+
+
+    def get_weights(self, departure_time):
+        """ Return the arc weights for a departure time.
+
+        Returns:
+            array : weights of the matching bucket, or None to use the
+                scheduled times (no departure time, or no matching bucket).
+        """
+        if departure_time is None or not self.weight_profiles:
+            return None
+        return self.weight_profiles.get(self.tubemap.profiles.find_bucket(departure_time))
+
+
+    def build_route(self, previous, end, total_time):
+        """ Follow the `previous` arcs back from station index `end`.
+
+        Args:
+            previous (list[int]) : arc through which every station was 
+                reached (-1 for the sources), as given by a SearchResult
+            end (int) : index of the last station of the route
+            total_time (float) : total travel time of the route
+
+        Returns:
+            Route : stations from the search source to `end`.
+        """
+        arc_tail = self.compact_graph.arc_tail
+        arc_line = self.compact_graph.arc_line
+
+        indices = array('I', [end])
+        line_indices = array('H')
+        current = end
+        # Reconstruct the path by following the previous arcs
+        while previous and previous[current] >= 0:
+            arc = previous[current]
+            line_indices.append(arc_line[arc])
+            current = arc_tail[arc]
+            indices.append(current)
+
+        indices.reverse()
+        line_indices.reverse()
+        return Route(self.station_list, self.line_list, indices, total_time, line_indices)
+
+
+    def find_stations_by_names(self, station_names):
+        """ Return the indices of the stations named in `station_names`.
+
+        Unknown names are ignored.
+        """
+        indices = []
+        for station_name in station_names:
+            station = self.find_station_by_name(station_name)
+            if station:
+                indices.append(self.compact_graph.station_index[station.id])
+        return indices
+
+
+    def find_connections(self, station1_name, station2_name, line=None):
+        """ Return the indices (in tubemap.connections) of the connections
+        between two stations, optionally only those of one line (id or name).
+        """
+        station1 = self.find_station_by_name(station1_name)
+        station2 = self.find_station_by_name(station2_name)
+        if not station1 or not station2:
+            return []
+        return [index for index, connection in enumerate(self.tubemap.connections)
+                if {station.id for station in connection.stations} == {station1.id, station2.id}
+                and (line is None or line in (connection.line.id, connection.line.name))]
+
+
+    def disable_station(self, station_name):
+        """ Close a station: routes no longer start, end or pass there.
+
+        Returns:
+            bool : False if the station does not exist.
+        """
+        indices = self.find_stations_by_names([station_name])
+        for index in indices:
+            self.components.disable_station(index)
+        return bool(indices)
+
+
+    def enable_station(self, station_name):
+        """ Reopen a station closed with disable_station(). """
+        indices = self.find_stations_by_names([station_name])
+        for index in indices:
+            self.components.enable_station(index)
+        return bool(indices)
+
+
+    def disable_connection(self, station1_name, station2_name, line=None):
+        """ Close the connections between two stations (of every line, or
+        only of `line`, given by id or name).
+
+        Returns:
+            bool : False if there is no such connection.
+        """
+        connections = self.find_connections(station1_name, station2_name, line)
+        for connection in connections:
+            self.components.disable_connection(connection)
+        return bool(connections)
+
+
+    def enable_connection(self, station1_name, station2_name, line=None):
+        """ Reopen connections closed with disable_connection(). """
+        connections = self.find_connections(station1_name, station2_name, line)
+        for connection in connections:
+            self.components.enable_connection(connection)
+        return bool(connections)
+
+
+    def get_reachable_stations(self, station_name):
+        """ Return every station that can be reached from a station.
+
+        Answered from the component index, without any search.
+
+        Returns:
+            list[Station] : reachable stations (the station itself included),
+                in station table order. Empty if the station does not exist
+                or is disabled.
+        """
+        station = self.find_station_by_name(station_name)
+        if not station:
+            return []
+        reachable = self.components.reachable(self.compact_graph.station_index[station.id])
+        return [self.station_list[index] for index in sorted(reachable)]
+
+
+    def get_nearest_targets(self, target_station_names):
+        """ Find, for every station, the nearest of several target stations.
+
+        A single search is seeded with all the targets at once. Connections
+        take the same time in both directions, so searching from the targets
+        on the (symmetric) graph gives the time from every station to its
+        nearest target. For the same reason, passing source stations instead
+        tells, for every station, which source reaches it first.
+
+        Args:
+            target_station_names (list[str]) : names of the target stations
+
+        Returns:
+            dict : key: station id, value: (nearest target Station, time) for
+                every station that can reach a target. Empty if no target 
+                name exists. Disabled stations and connections are avoided.
+        """
+        targets = self.find_stations_by_names(target_station_names)
+        route_filter = self.get_route_filter()
+        if route_filter is not None:
+            targets = [target for target in targets if route_filter.allows_station(target)]
+        if not targets:
+            return {}
+
+        distances, origins = self.engine.nearest_sources(targets, route_filter)
+        nearest = {}
+        for index, origin in enumerate(origins):
+            if origin >= 0:
+                nearest[self.station_list[index].id] = (self.station_list[origin], distances[index])
+        return nearest
+
+
+    def get_shortest_path_to_nearest(self, start_station_name, target_station_names):
+        """ Find ONE shortest path from a station to the nearest of several targets.
+
+        Args:
+            start_station_name (str) : name of the starting station
+            target_station_names (list[str]) : names of the candidate targets
+
+        Returns:
+            Route : path to the nearest target. Returns None if the start
+                station or every target is unknown or disabled, or no target
+                is reachable.
+        """
+        start_station = self.find_station_by_name(start_station_name)
+        targets = self.find_stations_by_names(target_station_names)
+        if not start_station or not targets:
+            return None
+        start = self.compact_graph.station_index[start_station.id]
+        route_filter = self.get_route_filter()
+        if route_filter is not None:
+            targets = [target for target in targets if route_filter.allows_station(target)]
+            if not route_filter.allows_station(start) or not targets:
+                return None
+
+        result = self.engine.search({start: 0}, {target: 0 for target in targets}, route_filter,
+                                    workspace=self.workspaces.get())
+        if result.best_target is None:
+            return None
+        return self.build_route(result.previous, result.best_target, result.distances[result.best_target])
+
+
+    def get_meeting_points(self, origin_station_names, k=3, objective="max", early_stop=True):
+        """ Find the best stations for a group of travellers to meet.
+
+        Args:
+            origin_station_names (list[str]) : starting station of every 
+                traveller
+            k (int) : number of meeting stations to return
+            objective (str) : "max" to minimise the longest journey, "sum" to
+                minimise the total travel time of the group
+            early_stop (bool) : if True, the searches from every origin run 
+                in lockstep and stop as soon as no remaining station can 
+                beat the current top k. If False, full one-to-all searches 
+                are run as one batch (vectorised with the SciPy engine).
+
+        Returns:
+            list[tuple(Station, float, list[float])] : (meeting station, 
+                score, travel time from every origin) of the k best 
+                stations, best first. Disabled stations and connections
+                are avoided.
+                Returns None if an origin does not exist or is disabled.
+
+        Raises:
+            ValueError : if objective is not "max" or "sum".
+        """
+        if objective not in MEETING_OBJECTIVES:
+            raise ValueError(f"Unknown objective {objective!r}, expected one of {MEETING_OBJECTIVES}.")
+
+        origins = self.find_stations_by_names(origin_station_names)
+        if len(origins) != len(origin_station_names):
+            return None
+        route_filter = self.get_route_filter()
+        if route_filter is not None and not all(route_filter.allows_station(origin) for origin in origins):
+            return None
+        if not origins or k <= 0:
+            return []
+
+        if early_stop:
+            best = meeting_points_incremental(self.compact_graph, origins, k, objective, route_filter)
+        else:
+            best = meeting_points_batched(self.engine, origins, k, objective, route_filter)
+        return [(self.station_list[index], score, times) for index, score, times in best]
+
+
+    def build_hub_labels(self, filepath=None):
+        """ Build (or load) the hub labels used by get_travel_time().
+
+        Args:
+            filepath (str) : if given, labels are loaded from this file when
+                it matches the map, and (re)built and saved there otherwise.
+
+        Returns:
+            HubLabelIndex : the labels now used by this PathFinder.
+        """
+        labels = HubLabelIndex.load(filepath, self.compact_graph) if filepath else None
+        if labels is None:
+            labels = HubLabelIndex(self.compact_graph).build()
+            if filepath:
+                labels.save(filepath)
+        self.hub_labels = labels
+        return labels
+
+
+    def build_landmarks(self, count=8, strategy="farthest"):
+        """ Switch get_shortest_path() to ALT (A* with landmark bounds).
+
+        Args:
+            count (int) : number of landmarks. More landmarks settle fewer
+                stations per query but use one distance vector each.
+            strategy (str) : landmark selection, "farthest" or "avoid"
+
+        Returns:
+            LandmarkIndex : the landmarks now used by this PathFinder.
+        """
+        self.landmarks = LandmarkIndex(self.compact_graph, count, strategy).build()
+        self.stats["landmarks"] = self.landmarks.statistics()
+        return self.landmarks
+
+
+    def warm_up(self, filepath, top=20, cache_size=64, background=True, min_queries=20):
+        """ Count the queries in a popularity file and prefill the tree cache.
+
+        The origins most often queried (as counted in `filepath` by
+        previous runs) get their shortest-path tree computed, in a
+        background thread by default, so queries can be served meanwhile.
+        From then on, every query is counted in `filepath`, and unrestricted
+        queries are answered from the tree of their origin. On a miss, the
+        tree is only computed for a warmed-up origin or one queried at least
+        `min_queries` times; other queries get a normal, early-stopping
+        search. Progress is reported in `stats`: "warmup_done" out of
+        "warmup_origins" trees, then "warmup_seconds" once finished.
+
+        Args:
+            filepath (str) : SQLite file of the origin/destination counts
+            top (int) : number of popular origins to warm up
+            cache_size (int) : maximum number of trees kept
+            background (bool) : warm up in a daemon thread
+            min_queries (int) : see above
+
+        Returns:
+            threading.Thread : the warm-up thread (None if not background).
+        """
+        if self.popularity is not None:
+            self.popularity.close()
+        self.popularity = PopularityStore(filepath)
+        if self.tree_cache is None:
+            self.tree_cache = TreeCache(cache_size)
+
+        station_index = self.compact_graph.station_index
+        origins = [station_index[origin] for origin, _ in self.popularity.top_origins(top)
+                   if origin in station_index][:self.tree_cache.size]
+        self.tree_origins = set(origins)
+        self.tree_min_queries = min_queries
+        self.stats["warmup_origins"] = len(origins)
+        self.stats["warmup_done"] = 0
+        self.stats["warmup_seconds"] = 0.0
+        if not background:
+            self.warm_trees(origins)
+            return None
+        self.warmup_thread = threading.Thread(target=self.warm_trees, args=(origins,),
+                                              name="tree-cache-warmup", daemon=True)
+        self.warmup_thread.start()
+        return self.warmup_thread
+
+
+    def warm_trees(self, origins):
+        """ Compute the trees of `origins` not cached yet, in order. """
+        started = time.perf_counter()
+        for origin in origins:
+            if origin not in self.tree_cache:
+                self.cache_tree(origin)
+            self.stats["warmup_done"] += 1
+        self.stats["warmup_seconds"] = time.perf_counter() - started
+
+
+    def is_popular(self, station_id, origin):
+        """ Check whether the tree of an origin is worth computing (see warm_up). """
+        if origin in self.tree_origins:
+            return True
+        return self.popularity is not None and self.popularity.origin_count(station_id) >= self.tree_min_queries
+
+
+    def cache_tree(self, origin):
+        """ Search the whole network from station index `origin` and cache
+        the resulting (distances, previous) tree. """
+        result = self.engine.search({origin: 0})
+        tree = (result.distances, result.previous)
+        self.tree_cache.put(origin, tree)
+        return tree
+
+
+    def build_transfer_patterns(self, processes=None, filepath=None, max_transfers=MAX_TRANSFERS):
+        """ Precompute (or load) the transfer patterns of every station.
+
+        Args:
+            processes (int) : number of worker processes used to build them
+            filepath (str) : if given, patterns are loaded from this file
+                when it matches the map, and (re)built and saved there
+                otherwise.
+            max_transfers (int) : maximum number of changes of line
+
+        Returns:
+            TransferPatternIndex : the patterns now used by this PathFinder.
+        """
+        patterns = TransferPatternIndex.load(filepath, self.compact_graph) if filepath else None
+        if patterns is None or patterns.max_transfers != max_transfers:
+            patterns = TransferPatternIndex(self.compact_graph, max_transfers).build(processes)
+            if filepath:
+                patterns.save(filepath)
+        self.transfer_patterns = patterns
+        return patterns
+
+
+    def export_route_table(self, filepath, compress=True):
+        """ Write the route of every station pair to a compact file that
+        offline clients read with RouteTableReader (see
+        network.routetable.export_route_table).
+
+        Returns:
+            dict : sizes and export time.
+        """
+        return export_route_table(self, filepath, compress)
+
+
+    def get_shortest_path_with_transfers(self, start_station_name, end_station_name, max_transfers=None):
+        """ Find the fastest journey with at most max_transfers changes of line.
+
+        The journey is evaluated on the transfer patterns of the start
+        station (see build_transfer_patterns). Without precomputed patterns,
+        the patterns of the start station are computed on its first query.
+        Patterns describe the full network: if the journey they give uses a
+        disabled station or connection, the fastest open route is searched
+        instead, and kept only if it has few enough changes.
+
+        Args:
+            start_station_name (str): name of the starting station
+            end_station_name (str): name of the ending station
+            max_transfers (int) : maximum number of changes of line (None
+                for no limit other than the one of the patterns)
+
+        Returns:
+            Route : the journey. Returns None if a station does not exist or
+                is disabled, or no journey has few enough changes.
+        """
+        start_station = self.find_station_by_name(start_station_name)
+        end_station = self.find_station_by_name(end_station_name)
+
+        if not start_station or not end_station:
+            return None
+
+        if self.transfer_patterns is None:
+            self.transfer_patterns = TransferPatternIndex(self.compact_graph)
+        start = self.compact_graph.station_index[start_station.id]
+        end = self.compact_graph.station_index[end_station.id]
+        route_filter = self.get_route_filter()
+        if route_filter is not None and not (route_filter.allows_station(start)
+                                             and route_filter.allows_station(end)):
+            return None
+
+        route = self.transfer_patterns.query(start, end, max_transfers)
+        if route is None or route_filter is None or all(
+                route_filter.allows_arc(arc) for arc in self.compact_graph.route_arcs(route)):
+            return route
+
+        # The journey crosses a closure: search the open network instead
+        result = self.engine.search({start: 0}, {end: 0}, route_filter, workspace=self.workspaces.get())
+        if result.best_target is None:
+            return None
+        route = self.build_route(result.previous, end, result.distances[end])
+        changes = sum(1 for line, next_line in zip(route.line_indices, route.line_indices[1:])
+                      if line != next_line)
+        if max_transfers is None:
+            max_transfers = self.transfer_patterns.max_transfers
+        return route if changes <= max_transfers else None
+
+
+    def get_travel_time(self, start_station_name, end_station_name):
+        """ Shortest travel time between two stations, without the path.
+
+        Uses the hub labels when they have been built (a merge of two short
+        sorted arrays), and a regular search otherwise.
+
+        Args:
+            start_station_name (str): name of the starting station
+            end_station_name (str): name of the ending station
+
+        Returns:
+            float : travel time (in minutes). Returns None if a station does
+                not exist or there is no path between them.
+        """
+        start_station = self.find_station_by_name(start_station_name)
+        end_station = self.find_station_by_name(end_station_name)
+
+        if not start_station or not end_station:
+            return None
+
+        # Labels are computed on the full network
+        if self.hub_labels is not None and self.components.intact:
+            return self.hub_labels.travel_time(start_station.id, end_station.id)
+
+        route = self.get_shortest_path(start_station_name, end_station_name)
+        return None if route is None else route.total_time
+
+
+    def find_nearest_stations(self, latitude, longitude, k=3):
+        """ Find the k stations closest to a coordinate.
+
+        Args:
+            latitude (float) : latitude of the point (in degrees)
+            longitude (float) : longitude of the point (in degrees)
+            k (int) : maximum number of stations to return
+
+        Returns:
+            list[tuple(Station, float)] : (station, distance in metres) pairs,
+                sorted by increasing distance.
+        """
+        nearest = self.tubemap.spatial_index.nearest(latitude, longitude, k)
+        return [(self.find_station_by_id(station_id), distance) 
+                for station_id, distance in nearest]
+
+
+    def get_shortest_path_between_coordinates(self, start, end, candidates=3,
+                                              walking_speed=WALKING_SPEED):
+        """ Find ONE shortest path between two coordinates.
+
+        The `candidates` stations closest to `start` seed a single
+        multi-source search, each with the time needed to walk to it. The
+        `candidates` stations closest to `end` are its targets, each with the
+        time needed to walk from it to `end`. The returned path is the one
+        minimising walking + travel time.
+
+        Args:
+            start (tuple(float, float)) : (latitude, longitude) of the origin
+            end (tuple(float, float)) : (latitude, longitude) of the destination
+            candidates (int) : number of nearby stations tried at each end
+            walking_speed (float) : walking speed (in metres per minute)
+
+        Returns:
+            Route : ONE shortest path between the stations used to enter and
+                leave the network. Its total_time includes the walks.
+                Disabled stations and connections are avoided.
+                Returns None if no station is known or no path exists.
+        """
+        route_filter = self.get_route_filter()
+        # Look further when some of the closest stations may be closed
+        k = candidates if route_filter is None else candidates + len(self.components.disabled_stations)
+        start_stations = self.tubemap.spatial_index.nearest(*start, k=k)
+        end_stations = self.tubemap.spatial_index.nearest(*end, k=k)
+        if route_filter is not None:
+            station_index = self.compact_graph.station_index
+            start_stations = [(station_id, distance) for station_id, distance in start_stations
+                              if route_filter.allows_station(station_index[station_id])][:candidates]
+            end_stations = [(station_id, distance) for station_id, distance in end_stations
+                            if route_filter.allows_station(station_index[station_id])][:candidates]
+
+        if not start_stations or not end_stations:
+            return None
+
+        # Walking times (in minutes) become the search offsets
+        station_index = self.compact_graph.station_index
+        sources = {station_index[station_id]: distance / walking_speed 
+                   for station_id, distance in start_stations}
+        targets = {station_index[station_id]: distance / walking_speed 
+                   for station_id, distance in end_stations}
+
+        result = self.engine.search(sources, targets, route_filter, workspace=self.workspaces.get())
+
+        if result.best_target is None:
+            return None
+
+        best_target = result.best_target
+        total_time = result.distances[best_target] + targets[best_target]
+        return self.build_route(result.previous, best_target, total_time)
 
 
 def test_shortest_path():
@@ -0,0 +1,168 @@
+import sqlite3
+import threading
+from collections import OrderedDict
+
+
+class PopularityStore:
+    """ Origin/destination query counts, persisted in a SQLite file.
+
+    Queries are counted in memory and added to the file every
+    `flush_every` queries (and on flush()/close()), so recording costs a
+    dictionary update per query. The counts survive restarts and tell a
+    new PathFinder which origins to warm its tree cache with.
+
+    Example:
+        with PopularityStore("popularity.db") as store:
+            store.record("245", "110")
+            store.top_origins(10)
+    """
+
+    def __init__(self, filepath, flush_every=100):
+        """
+        Args:
+            filepath (str) : path of the SQLite file (created if missing)
+            flush_every (int) : number of recorded queries between two writes
+        """
+        self.filepath = filepath
+        self.flush_every = flush_every
+        self._lock = threading.Lock()
+        self._pending = {}  # key: (origin id, destination id), value: count
+        self._pending_count = 0
+        self._connection = sqlite3.connect(filepath, check_same_thread=False)
+        with self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS od_counts ("
+                "origin TEXT NOT NULL, destination TEXT NOT NULL, count INTEGER NOT NULL, "
+                "PRIMARY KEY (origin, destination))")
+        # key: origin id, value: number of queries, persisted ones included
+        self._origin_counts = dict(self._connection.execute(
+            "SELECT origin, SUM(count) FROM od_counts GROUP BY origin").fetchall())
+
+
+    def record(self, origin, destination):
+        """ Count one query from station id `origin` to `destination`. """
+        with self._lock:
+            if self._connection is None:
+                return
+            key = (origin, destination)
+            self._pending[key] = self._pending.get(key, 0) + 1
+            self._origin_counts[origin] = self._origin_counts.get(origin, 0) + 1
+            self._pending_count += 1
+            if self._pending_count >= self.flush_every:
+                self._write()
+
+
+    def flush(self):
+        """ Add the counts recorded since the last write to the file. """
+        with self._lock:
+            if self._connection is not None:
+                self._write()
+
+
+    def _write(self):
+        if not self._pending:
+            return
+        rows = [(origin, destination, count) for (origin, destination), count in self._pending.items()]
+        with self._connection:
+            self._connection.executemany(
+                "INSERT INTO od_counts (origin, destination, count) VALUES (?, ?, ?) "
+                "ON CONFLICT (origin, destination) DO UPDATE SET count = count + excluded.count", rows)
+        self._pending = {}
+        self._pending_count = 0
+
+
+    def origin_count(self, origin):
+        """ Return the number of queries from station id `origin` so far. """
+        return self._origin_counts.get(origin, 0)
+
+
+    def top_origins(self, n):
+        """ Return the `n` station ids most often queried from.
+
+        Returns:
+            list[tuple(str, int)] : (origin id, number of queries), most
+                popular first (ties by id).
+        """
+        self.flush()
+        with self._lock:
+            if self._connection is None:
+                return []
+            return self._connection.execute(
+                "SELECT origin, SUM(count) AS total FROM od_counts GROUP BY origin "
+                "ORDER BY total DESC, origin LIMIT ?", (n,)).fetchall()
+
+
+    def top_pairs(self, n):
+        """ Return the `n` most queried (origin id, destination id, count). """
+        self.flush()
+        with self._lock:
+            if self._connection is None:
+                return []
+            return self._connection.execute(
+                "SELECT origin, destination, count FROM od_counts "
+                "ORDER BY count DESC, origin, destination LIMIT ?", (n,)).fetchall()
+
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._write()
+                self._connection.close()
+                self._connection = None
+
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class TreeCache:
+    """ Least-recently-used cache of shortest-path trees, by origin.
+
+    A tree is the (distances, previous) lists of a search from one origin
+    on the full network with the scheduled times, so it answers every
+    unrestricted query from that origin with no search at all. The cache
+    is shared by the query threads and the warm-up thread.
+    """
+
+    def __init__(self, size=64):
+        """
+        Args:
+            size (int) : maximum number of trees kept
+        """
+        self.size = size
+        self._trees = OrderedDict()  # key: origin index, value: (distances, previous)
+        self._lock = threading.Lock()
+
+
+    def get(self, origin):
+        """ Return the tree of station index `origin`, or None. """
+        with self._lock:
+            tree = self._trees.get(origin)
+            if tree is not None:
+                self._trees.move_to_end(origin)
+            return tree
+
+
+    def put(self, origin, tree):
+        with self._lock:
+            self._trees[origin] = tree
+            self._trees.move_to_end(origin)
+            while len(self._trees) > self.size:
+                self._trees.popitem(last=False)
+
+
+    def clear(self):
+        with self._lock:
+            self._trees.clear()
+
+
+    def __contains__(self, origin):
+        with self._lock:
+            return origin in self._trees
+
+
+    def __len__(self):
+        return len(self._trees)
@@ -0,0 +1,187 @@
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, but required by this module
+    np = None
+
+try:
+    from scipy.sparse import csr_matrix
+    from scipy.sparse.csgraph import dijkstra as csgraph_dijkstra
+except ImportError:  # SciPy is only needed for re-optimised routes
+    csr_matrix = None
+    csgraph_dijkstra = None
+
+# Percentiles reported by default
+DEFAULT_PERCENTILES = (50, 90, 95)
+
+
+class DelayModel:
+    """ Random delays added to the scheduled connection times.
+
+    Every connection is delayed with some probability, and the delay (in
+    minutes) follows an exponential distribution. Both parameters can be
+    overridden per line.
+    """
+
+    def __init__(self, probability=0.1, mean_delay=2.0, line_parameters=None):
+        """
+        Args:
+            probability (float) : probability that a connection is delayed
+            mean_delay (float) : mean delay of a delayed connection (minutes)
+            line_parameters (dict) : key: line id, value: (probability,
+                mean_delay) for the connections of that line
+        """
+        self.probability = probability
+        self.mean_delay = mean_delay
+        self.line_parameters = line_parameters or {}
+
+
+    def sample(self, connections, samples, rng):
+        """ Draw the delays of every connection for every scenario.
+
+        Args:
+            connections (list[Connection]) : the connections to delay
+            samples (int) : number of scenarios
+            rng (numpy.random.Generator) : random generator
+
+        Returns:
+            numpy.ndarray : (samples, connections) array of delays (minutes).
+        """
+        probabilities = np.array([self.line_parameters.get(connection.line.id, (self.probability,))[0]
+                                  for connection in connections], dtype=np.float64)
+        means = np.array([self.line_parameters.get(connection.line.id, (None, self.mean_delay))[1]
+                          for connection in connections], dtype=np.float64)
+
+        shape = (samples, len(connections))
+        delayed = rng.random(shape) < probabilities
+        return delayed * rng.exponential(1.0, shape) * means
+
+
+class ReliabilitySimulator:
+    """ Monte Carlo simulation of travel times under random delays.
+
+    All the scenarios are drawn at once as a (samples, connections) NumPy
+    array, and evaluated in batch:
+    - fixed routes (planned on the scheduled times) sum the sampled times of
+      their arcs with one fancy-indexing operation
+    - re-optimised routes are recomputed in every scenario with a single
+      SciPy call: the scenarios are stacked as disjoint copies of the graph,
+      and a multi-source search from every copy of the origin solves them all.
+    """
+
+    def __init__(self, path_finder, delay_model=None, seed=None):
+        """
+        Args:
+            path_finder (PathFinder) : gives the graph and the planned routes
+            delay_model (DelayModel) : delay distribution (default DelayModel())
+            seed (int) : seed of the random generator
+
+        Raises:
+            ImportError : if NumPy is not installed.
+        """
+        if np is None:
+            raise ImportError("The reliability simulation requires numpy.")
+        self.path_finder = path_finder
+        self.graph = path_finder.compact_graph
+        self.connections = path_finder.tubemap.connections
+        self.delay_model = delay_model or DelayModel()
+        self.rng = np.random.default_rng(seed)
+
+        self.arc_connection = np.array(self.graph.arc_connection, dtype=np.int64)
+        self.arc_tail = np.array(self.graph.arc_tail, dtype=np.int64)
+        self.arc_head = np.array(self.graph.arc_head, dtype=np.int64)
+        self.arc_time = np.array(self.graph.arc_time, dtype=np.float64)
+
+
+    def sample_arc_times(self, samples):
+        """ Return a (samples, arcs) array of sampled arc travel times. """
+        delays = self.delay_model.sample(self.connections, samples, self.rng)
+        # Both directions of a connection share the same delay
+        return self.arc_time + delays[:, self.arc_connection]
+
+
+    def route_arcs(self, route):
+        """ Return the arc indices followed by a Route (see CompactGraph.route_arcs). """
+        return np.array(self.graph.route_arcs(route), dtype=np.int64)
+
+
+    def simulate(self, station_pairs, samples=1000, percentiles=DEFAULT_PERCENTILES, reoptimise=False):
+        """ Simulate the travel times between pairs of stations.
+
+        Args:
+            station_pairs (list[tuple(str, str)]) : (start, end) station names
+            samples (int) : number of delay scenarios
+            percentiles (tuple[float]) : percentiles to report
+            reoptimise (bool) : also report the travel times when the route
+                is re-planned in every scenario (requires SciPy)
+
+        Returns:
+            dict : key: (start, end), value: {"scheduled": time, "fixed":
+                statistics, "reoptimised": statistics (if asked)}, where
+                statistics is a dict with "mean" and "p<percentile>" keys.
+                Pairs without a route are left out.
+
+        Raises:
+            ImportError : if reoptimise is True and SciPy is not installed.
+        """
+        if reoptimise and csgraph_dijkstra is None:
+            raise ImportError("Re-optimised routes require scipy.")
+
+        arc_times = self.sample_arc_times(samples)
+        report = {}
+
+        for start_name, end_name in station_pairs:
+            route = self.path_finder.get_shortest_path(start_name, end_name)
+            if route is None:
+                continue
+
+            arcs = self.route_arcs(route)
+            fixed = arc_times[:, arcs].sum(axis=1) if len(arcs) else np.zeros(samples)
+            report[(start_name, end_name)] = {
+                "scheduled": route.total_time,
+                "fixed": self.describe(fixed, percentiles),
+            }
+
+            if reoptimise:
+                times = self.reoptimised_times(arc_times, route.indices[0], route.indices[-1])
+                report[(start_name, end_name)]["reoptimised"] = self.describe(times, percentiles)
+
+        return report
+
+
+    def reoptimised_times(self, arc_times, start, end):
+        """ Shortest travel time from start to end in every scenario.
+
+        Scenario s uses the stations s * N .. s * N + N - 1 of one big
+        block-diagonal graph, so one multi-source search from every copy of
+        `start` computes all the scenarios at once.
+        """
+        samples = arc_times.shape[0]
+        count = self.graph.station_count
+        offsets = (np.arange(samples) * count)[:, None]
+
+        tails = (offsets + self.arc_tail).ravel()
+        heads = (offsets + self.arc_head).ravel()
+        # csr_matrix would sum parallel arcs: keep the fastest one instead
+        matrix = self.fastest_parallel_arcs(tails, heads, arc_times.ravel(), samples * count)
+
+        distances = csgraph_dijkstra(matrix, indices=offsets.ravel() + start, min_only=True)
+        return distances.reshape(samples, count)[:, end]
+
+
+    @staticmethod
+    def fastest_parallel_arcs(tails, heads, times, size):
+        """ Sparse matrix keeping the minimum time of parallel arcs. """
+        order = np.lexsort((times, heads, tails))
+        tails, heads, times = tails[order], heads[order], times[order]
+        first = np.ones(len(tails), dtype=bool)
+        first[1:] = (tails[1:] != tails[:-1]) | (heads[1:] != heads[:-1])
+        return csr_matrix((times[first], (tails[first], heads[first])), shape=(size, size))
+
+
+    @staticmethod
+    def describe(times, percentiles):
+        """ Mean and percentiles of a vector of travel times. """
+        statistics = {"mean": float(times.mean())}
+        for percentile, value in zip(percentiles, np.percentile(times, percentiles)):
+            statistics[f"p{percentile:g}"] = float(value)
+        return statistics
@@ -0,0 +1,190 @@
+import logging
+import os
+import threading
+from tube.map import TubeMap
+from network.path import PathFinder
+
+logger = logging.getLogger(__name__)
+
+
+class NetworkSnapshot:
+    """ One consistent version of the network: a TubeMap and its PathFinder.
+
+    A snapshot is never modified once it has been published by the
+    ReloadManager. Queries that grabbed a snapshot keep using it until they
+    finish, even if a newer version is swapped in meanwhile.
+    """
+
+    def __init__(self, tubemap, path_finder, version, signature):
+        """
+        Args:
+            tubemap (TubeMap) : the imported map
+            path_finder (PathFinder) : path finder built on `tubemap`
+            version (int) : increasing version number of the snapshot
+            signature (tuple) : (mtime_ns, size) of the file it was built from
+        """
+        self.tubemap = tubemap
+        self.path_finder = path_finder
+        self.version = version
+        self.signature = signature
+
+    def __repr__(self):
+        return f"NetworkSnapshot(version={self.version}, stations={len(self.tubemap.stations)})"
+
+
+class ReloadManager:
+    """ Hot-reload the network data without blocking in-flight queries.
+
+    The manager follows read-copy-update semantics: readers take the current
+    snapshot with a single attribute read (atomic in CPython) and never wait,
+    while a new TubeMap + PathFinder is built on the side and then published
+    by swapping the reference. Only writers (reloads) are serialised.
+
+    Example:
+        manager = ReloadManager("data/london.json")
+        manager.start()  # poll the file in a background thread
+        stations = manager.get_shortest_path("Covent Garden", "Green Park")
+    """
+
+    def __init__(self, filepath, poll_interval=5.0, path_finder_factory=PathFinder):
+        """
+        Args:
+            filepath (str) : path to the JSON file describing the network
+            poll_interval (float) : seconds between two checks of the file
+            path_finder_factory (callable) : builds a PathFinder from a TubeMap
+        """
+        self.filepath = filepath
+        self.poll_interval = poll_interval
+        self.path_finder_factory = path_finder_factory
+
+        self._reload_lock = threading.Lock()  # serialises writers only
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._snapshot = None
+
+        # Signature of the last file that could not be imported, so that it
+        # is not imported again until it changes
+        self.failed_signature = None
+        self.last_error = None
+
+        self.reload()
+
+
+    @property
+    def snapshot(self):
+        """ The current NetworkSnapshot (None if nothing could be loaded). """
+        return self._snapshot
+
+
+    def get_signature(self):
+        """ Return (mtime_ns, size) of the data file, or None if missing. """
+        try:
+            stat = os.stat(self.filepath)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+
+    def has_changed(self):
+        """ Check whether the data file differs from the current snapshot. """
+        signature = self.get_signature()
+        if signature is None or signature == self.failed_signature:
+            return False
+        return self._snapshot is None or signature != self._snapshot.signature
+
+
+    def build_snapshot(self, signature):
+        """ Build a new snapshot from the data file.
+
+        Returns:
+            NetworkSnapshot : the new snapshot, or None if the file could not
+                be imported (the TubeMap ends up without any station).
+        """
+        tubemap = TubeMap()
+        tubemap.import_from_json(self.filepath)
+        if not tubemap.stations:
+            return None
+
+        version = self._snapshot.version + 1 if self._snapshot else 1
+        return NetworkSnapshot(tubemap, self.path_finder_factory(tubemap), version, signature)
+
+
+    def reload(self, force=False):
+        """ Rebuild the snapshot if the data file changed, then publish it.
+
+        The rebuild happens entirely outside of the readers' path: queries
+        keep being served by the previous snapshot until the swap. If the
+        file cannot be imported, the error is logged and kept in
+        `last_error`, and the file is not imported again until it changes.
+
+        Args:
+            force (bool) : rebuild even if the file signature did not change
+
+        Returns:
+            bool : True if a new snapshot was published.
+        """
+        with self._reload_lock:
+            if not force and not self.has_changed():
+                return False
+
+            signature = self.get_signature()
+            try:
+                snapshot = self.build_snapshot(signature)
+            except Exception as error:  # e.g. a missing station or a non-numeric time
+                logger.exception("Could not import %s", self.filepath)
+                self.last_error = error
+                snapshot = None
+            if snapshot is None:
+                # Keep serving the previous version if the new data is invalid
+                self.failed_signature = signature
+                return False
+            self.failed_signature = None
+
+            # Publishing is a single reference assignment
+            self._snapshot = snapshot
+            return True
+
+
+    def start(self):
+        """ Start polling the data file in a background daemon thread. """
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._poll, name="network-reload", daemon=True)
+        self._thread.start()
+
+
+    def stop(self):
+        """ Stop the background polling thread. """
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+    def _poll(self):
+        while not self._stop_event.wait(self.poll_interval):
+            self.reload()
+
+
+    def get_shortest_path(self, start_station_name, end_station_name, **options):
+        """ Answer a query on the current snapshot.
+
+        Station names are resolved with the typo-tolerant name index of the
+        snapshot (see NameIndex.resolve), e.g. "Picadilly Circus" is
+        understood as "Piccadilly Circus". Other keyword arguments (e.g.
+        excluded_lines, departure_time) are passed on to
+        PathFinder.get_shortest_path().
+
+        Returns:
+            list[Station] : see PathFinder.get_shortest_path(). Returns None
+                if no snapshot has been loaded.
+        """
+        # Grab the snapshot once so the whole query sees a single version
+        snapshot = self._snapshot
+        if snapshot is None:
+            return None
+        name_index = snapshot.tubemap.name_index
+        start_station_name = name_index.resolve(start_station_name) or start_station_name
+        end_station_name = name_index.resolve(end_station_name) or end_station_name
+        return snapshot.path_finder.get_shortest_path(start_station_name, end_station_name, **options)
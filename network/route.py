@@ -0,0 +1,155 @@
+import struct
+import sys
+from array import array
+from collections.abc import Sequence
+
+# Header of a serialised route: magic, format version, number of stations,
+# total time (little-endian)
+ROUTE_HEADER = struct.Struct("<4sHId")
+ROUTE_MAGIC = b"TUBR"
+ROUTE_FORMAT_VERSION = 1
+
+
+class Route(Sequence):
+    """ A route stored as station indices, materialised on access.
+
+    A route keeps the path as a compact array of station indices, the total
+    travel time and, for every leg between two consecutive stations, the
+    index of the line used. `Station` objects, names or legs are only built
+    when they are asked for.
+
+    A route still behaves like the list of stations returned by
+    `PathFinder.get_shortest_path()`: it can be indexed, iterated over, and
+    compared to a list of Station objects.
+    """
+
+    def __init__(self, stations, lines, indices, total_time, line_indices):
+        """
+        Args:
+            stations (list[Station]) : station table (station index -> Station)
+            lines (list[Line]) : line table (line index -> Line)
+            indices (array) : station indices along the route
+            total_time (float) : total travel time of the route (in minutes)
+            line_indices (array) : line index of every leg
+                (one less than the number of stations)
+        """
+        self.station_table = stations
+        self.line_table = lines
+        self.indices = indices
+        self.total_time = total_time
+        self.line_indices = line_indices
+        self._stations = None
+
+        # Set by budgeted searches: the route may be slower than the best
+        # one, by at most error_bound minutes
+        self.approximate = False
+        self.error_bound = 0.0
+
+
+    @property
+    def stations(self):
+        """ list[Station] : stations along the route (built once). """
+        if self._stations is None:
+            self._stations = [self.station_table[index] for index in self.indices]
+        return self._stations
+
+    @property
+    def names(self):
+        """ list[str] : names of the stations along the route. """
+        return [self.station_table[index].name for index in self.indices]
+
+    @property
+    def station_ids(self):
+        """ list[str] : ids of the stations along the route. """
+        return [self.station_table[index].id for index in self.indices]
+
+    @property
+    def lines(self):
+        """ list[Line] : line used for every leg of the route. """
+        return [self.line_table[index] for index in self.line_indices]
+
+    @property
+    def legs(self):
+        """ list[tuple(Station, Station, Line)] : every leg of the route. """
+        return [(self.station_table[self.indices[i]],
+                 self.station_table[self.indices[i + 1]],
+                 self.line_table[line_index])
+                for i, line_index in enumerate(self.line_indices)]
+
+
+    def __len__(self):
+        return len(self.indices)
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return [self.station_table[index] for index in self.indices[item]]
+        return self.station_table[self.indices[item]]
+
+    def __iter__(self):
+        return iter(self.stations)
+
+    def __eq__(self, other):
+        if isinstance(other, Route):
+            return self.indices == other.indices and self.station_table is other.station_table
+        if isinstance(other, (list, tuple)):
+            return self.stations == list(other)
+        return NotImplemented
+
+    def __repr__(self):
+        return repr(self.stations)
+
+
+    def to_bytes(self):
+        """ Serialise the route to a compact little-endian byte string.
+
+        Only indices are written, so the reader needs the same station and
+        line tables (i.e. the same TubeMap version) to decode it.
+
+        Returns:
+            bytes : header, then uint32 station indices, then uint16 line
+                indices.
+        """
+        indices = array("I", self.indices)
+        line_indices = array("H", self.line_indices)
+        if sys.byteorder == "big":
+            indices.byteswap()
+            line_indices.byteswap()
+        header = ROUTE_HEADER.pack(ROUTE_MAGIC, ROUTE_FORMAT_VERSION,
+                                   len(indices), float(self.total_time))
+        return header + indices.tobytes() + line_indices.tobytes()
+
+
+    @classmethod
+    def from_bytes(cls, data, stations, lines):
+        """ Decode a route written by `to_bytes()`.
+
+        Args:
+            data (bytes) : serialised route
+            stations (list[Station]) : station table used to encode the route
+            lines (list[Line]) : line table used to encode the route
+
+        Returns:
+            Route : the decoded route.
+                Returns None if `data` is not a valid serialised route.
+        """
+        if len(data) < ROUTE_HEADER.size:
+            return None
+        magic, version, count, total_time = ROUTE_HEADER.unpack_from(data)
+        if magic != ROUTE_MAGIC or version != ROUTE_FORMAT_VERSION:
+            return None
+
+        offset = ROUTE_HEADER.size
+        indices = array("I")
+        line_indices = array("H")
+        end_indices = offset + count * indices.itemsize
+        end_lines = end_indices + max(count - 1, 0) * line_indices.itemsize
+        if len(data) != end_lines:
+            return None
+
+        indices.frombytes(data[offset:end_indices])
+        line_indices.frombytes(data[end_indices:end_lines])
+        if sys.byteorder == "big":
+            indices.byteswap()
+            line_indices.byteswap()
+
+        return cls(stations, lines, indices, total_time, line_indices)
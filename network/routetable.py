@@ -0,0 +1,434 @@
+import argparse
+import os
+import random
+import struct
+import threading
+import time
+import zlib
+
+# Header of a route table file: magic, format version, flags, number of
+# stations, lines and arcs, checksum of the graph (CompactGraph.checksum:
+# station ids, arc ends, times and lines), size of the tables that precede
+# the trees (little-endian)
+TABLE_HEADER = struct.Struct("<4sHHIIIII")
+TABLE_MAGIC = b"TUBX"
+TABLE_FORMAT_VERSION = 2
+
+# Flag: every tree is deflated with zlib
+FLAG_DEFLATE = 1
+
+
+def encode_varint(value, out):
+    """ Append a non-negative integer to a bytearray, 7 bits per byte. """
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def decode_varint(data, offset):
+    """ Read one varint from `data` at `offset`.
+
+    Returns:
+        tuple(int, int) : the value and the offset after it.
+    """
+    value, shift = 0, 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+
+def decode_varints(data):
+    """ Decode a whole buffer of varints. """
+    # Small values are one byte each: the buffer is already decoded
+    if data.isascii():
+        return list(data)
+    values, offset = [], 0
+    while offset < len(data):
+        value, offset = decode_varint(data, offset)
+        values.append(value)
+    return values
+
+
+def zigzag(value):
+    """ Map signed integers to non-negative ones (0, -1, 1, -2 -> 0, 1, 2, 3). """
+    return value * 2 if value >= 0 else -value * 2 - 1
+
+
+def unzigzag(value):
+    return value >> 1 if not value & 1 else -(value >> 1) - 1
+
+
+def encode_string(text, out):
+    data = text.encode('utf-8')
+    encode_varint(len(data), out)
+    out.extend(data)
+
+
+def decode_string(data, offset):
+    length, offset = decode_varint(data, offset)
+    return bytes(data[offset:offset + length]).decode('utf-8'), offset + length
+
+
+def export_route_table(path_finder, filepath, compress=True):
+    """ Precompute the route of every station pair and write it to a file.
+
+    The file stores one shortest-path tree per origin. In a tree, every
+    destination keeps only which of its own arcs leads back towards the
+    origin (a next hop on the reverse journey): a small integer, one byte
+    as a varint, since stations have few arcs. The arcs themselves (head,
+    line, time) are stored once, heads delta-encoded per station. Routes are
+    the ones `path_finder.get_shortest_path()` returns, with the stations
+    and connections closed at export time left out.
+
+    Layout: header, line names, station ids and names, arc table, the
+    varint size of every tree, then the trees. A reader only decodes the
+    tables and the tree of the origin it is asked about.
+
+    Args:
+        path_finder (PathFinder) : the network to export
+        filepath (str) : output file
+        compress (bool) : deflate every tree with zlib (smaller file,
+            slower lookups)
+
+    Returns:
+        dict : {"stations", "bytes" (file size), "table_bytes",
+            "tree_bytes", "seconds" (time to export)}
+    """
+    started = time.perf_counter()
+    graph = path_finder.compact_graph
+    count = graph.station_count
+
+    # Position of every arc in the slice of its tail, by (connection, tail),
+    # to find the reverse of an arc of the tree
+    position = {}
+    for station in range(count):
+        for arc in range(graph.indptr[station], graph.indptr[station + 1]):
+            position[(graph.arc_connection[arc], station)] = arc - graph.indptr[station]
+
+    tables = bytearray()
+    for line in graph.lines:
+        encode_string(line.name, tables)
+    for station in graph.stations:
+        encode_string(station.id, tables)
+        encode_string(station.name, tables)
+    for station in range(count):
+        start, end = graph.indptr[station], graph.indptr[station + 1]
+        encode_varint(end - start, tables)
+        previous_head = station
+        for arc in range(start, end):
+            encode_varint(zigzag(graph.arc_head[arc] - previous_head), tables)
+            previous_head = graph.arc_head[arc]
+            encode_varint(graph.arc_line[arc], tables)
+            encode_varint(int(round(graph.arc_time[arc] * 60)), tables)  # seconds
+
+    # Honour the closures of the PathFinder, like get_shortest_path() does
+    route_filter = path_finder.get_route_filter()
+
+    trees = []
+    for origin in range(count):
+        tree = bytearray()
+        if route_filter is not None and not route_filter.allows_station(origin):
+            tree.extend(bytes(count))
+        else:
+            previous = path_finder.engine.search({origin: 0}, route_filter=route_filter).previous
+            for destination in range(count):
+                arc = previous[destination]
+                # 0: origin or unreachable, k + 1: k-th arc of the destination
+                encode_varint(0 if arc < 0 else position[(graph.arc_connection[arc], destination)] + 1, tree)
+        trees.append(zlib.compress(bytes(tree), 9) if compress else bytes(tree))
+
+    sizes = bytearray()
+    for tree in trees:
+        encode_varint(len(tree), sizes)
+    tables.extend(sizes)
+
+    header = TABLE_HEADER.pack(TABLE_MAGIC, TABLE_FORMAT_VERSION, FLAG_DEFLATE if compress else 0,
+                               count, len(graph.lines), graph.arc_count, graph.checksum(), len(tables))
+    with open(filepath, 'wb') as f:
+        f.write(header)
+        f.write(tables)
+        for tree in trees:
+            f.write(tree)
+
+    tree_bytes = sum(len(tree) for tree in trees)
+    return {
+        "stations": count,
+        "bytes": TABLE_HEADER.size + len(tables) + tree_bytes,
+        "table_bytes": TABLE_HEADER.size + len(tables),
+        "tree_bytes": tree_bytes,
+        "seconds": time.perf_counter() - started,
+    }
+
+
+class TableRoute:
+    """ A route read from a route table: plain names, ids and times.
+
+    Attributes:
+        names (list[str]) : station names along the route
+        station_ids (list[str]) : station ids along the route
+        lines (list[str]) : line name of every leg
+        total_time (float) : travel time (in minutes)
+    """
+
+    __slots__ = ("names", "station_ids", "lines", "total_time")
+
+    def __init__(self, names, station_ids, lines, total_time):
+        self.names = names
+        self.station_ids = station_ids
+        self.lines = lines
+        self.total_time = total_time
+
+    def __len__(self):
+        return len(self.names)
+
+    def __repr__(self):
+        return f"TableRoute({' -> '.join(self.names)}, {self.total_time:g} min)"
+
+
+class RouteTableReader:
+    """ Answer journeys from a file written by export_route_table().
+
+    Opening reads the header and the tables (names and arcs), not the trees:
+    a lookup reads and decodes the tree of its origin only, and keeps the
+    last `cache_size` decoded trees. Lookups are thread-safe.
+    """
+
+    def __init__(self, filepath, cache_size=32, graph=None):
+        """
+        Args:
+            filepath (str) : route table file
+            cache_size (int) : number of decoded trees kept in memory
+            graph (CompactGraph) : current graph of the network, if known:
+                a table exported for another version of it is rejected
+
+        Raises:
+            ValueError : if the file is not a valid route table, or was
+                exported for another graph than `graph`.
+        """
+        self._file = open(filepath, 'rb')
+        self._lock = threading.Lock()
+        try:
+            self._read_tables()
+        except (ValueError, IndexError, struct.error, UnicodeDecodeError):
+            self._file.close()
+            raise ValueError(f"{filepath} is not a valid route table.")
+        if graph is not None and self.checksum != graph.checksum():
+            self._file.close()
+            raise ValueError(f"{filepath} was exported for another version of the network.")
+        self.cache_size = cache_size
+        self._cache = {}  # key: origin, value: decoded tree (oldest first)
+        self.stats = {"lookups": 0, "tree_hits": 0, "tree_misses": 0}
+
+
+    def _read_tables(self):
+        header = self._file.read(TABLE_HEADER.size)
+        (magic, version, self.flags, count, line_count, arc_count,
+         self.checksum, table_size) = TABLE_HEADER.unpack(header)
+        if magic != TABLE_MAGIC or version != TABLE_FORMAT_VERSION:
+            raise ValueError("Unknown route table format.")
+        tables = self._file.read(table_size)
+        if len(tables) != table_size:
+            raise ValueError("Truncated route table.")
+
+        offset = 0
+        self.line_names = []
+        for _ in range(line_count):
+            name, offset = decode_string(tables, offset)
+            self.line_names.append(name)
+
+        self.station_ids, self.station_names = [], []
+        for _ in range(count):
+            station_id, offset = decode_string(tables, offset)
+            name, offset = decode_string(tables, offset)
+            self.station_ids.append(station_id)
+            self.station_names.append(name)
+        self.index_by_id = {station_id: index for index, station_id in enumerate(self.station_ids)}
+        self.index_by_name = {}
+        for index, name in enumerate(self.station_names):
+            self.index_by_name.setdefault(name, index)
+
+        # Arcs of every station, as (head, line, time in seconds)
+        self.arcs = []
+        for station in range(count):
+            degree, offset = decode_varint(tables, offset)
+            arcs, head = [], station
+            for _ in range(degree):
+                delta, offset = decode_varint(tables, offset)
+                line, offset = decode_varint(tables, offset)
+                seconds, offset = decode_varint(tables, offset)
+                head += unzigzag(delta)
+                arcs.append((head, line, seconds))
+            self.arcs.append(arcs)
+        if sum(len(arcs) for arcs in self.arcs) != arc_count:
+            raise ValueError("Inconsistent arc table.")
+
+        # Trees follow the tables, in origin order
+        self.tree_offsets = [TABLE_HEADER.size + table_size]
+        for _ in range(count):
+            size, offset = decode_varint(tables, offset)
+            self.tree_offsets.append(self.tree_offsets[-1] + size)
+
+
+    @property
+    def station_count(self):
+        return len(self.station_ids)
+
+
+    def find_station(self, station):
+        """ Return the index of a station given by id or name (None if unknown). """
+        if station in self.index_by_id:
+            return self.index_by_id[station]
+        return self.index_by_name.get(station)
+
+
+    def tree(self, origin):
+        """ Return the decoded tree of an origin (see export_route_table). """
+        with self._lock:
+            tree = self._cache.pop(origin, None)
+            if tree is not None:
+                self.stats["tree_hits"] += 1
+            else:
+                self.stats["tree_misses"] += 1
+                start, end = self.tree_offsets[origin], self.tree_offsets[origin + 1]
+                self._file.seek(start)
+                data = self._file.read(end - start)
+                if self.flags & FLAG_DEFLATE:
+                    data = zlib.decompress(data)
+                tree = decode_varints(data)
+                while self._cache and len(self._cache) >= self.cache_size:
+                    self._cache.pop(next(iter(self._cache)))
+            if self.cache_size > 0:
+                self._cache[origin] = tree  # most recently used last
+        return tree
+
+
+    def lookup(self, start, end):
+        """ Return the precomputed route between two stations.
+
+        Args:
+            start, end (str) : station ids or names
+
+        Returns:
+            TableRoute : the route. Returns None if a station is unknown or
+                there is no route between them.
+        """
+        start, end = self.find_station(start), self.find_station(end)
+        if start is None or end is None:
+            return None
+        self.stats["lookups"] += 1
+        tree = self.tree(start)
+
+        # Follow the tree back from the destination to the origin
+        indices, lines, seconds = [end], [], 0
+        current = end
+        while current != start:
+            choice = tree[current]
+            if choice == 0:
+                return None  # unreachable
+            head, line, arc_seconds = self.arcs[current][choice - 1]
+            lines.append(self.line_names[line])
+            seconds += arc_seconds
+            current = head
+            indices.append(current)
+
+        indices.reverse()
+        lines.reverse()
+        return TableRoute([self.station_names[index] for index in indices],
+                          [self.station_ids[index] for index in indices], lines, seconds / 60)
+
+
+    def travel_time(self, start, end):
+        """ Return the travel time between two stations (None if no route). """
+        route = self.lookup(start, end)
+        return None if route is None else route.total_time
+
+
+    def close(self):
+        self._file.close()
+
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def benchmark_route_table(filepath, queries=2000, seed=0):
+    """ Measure the size of a route table and how fast it is read.
+
+    Args:
+        filepath (str) : route table file
+        queries (int) : number of random lookups timed
+        seed (int) : seed of the random station pairs
+
+    Returns:
+        dict : {"bytes", "bytes_per_pair", "open_ms", "tree_decode_us"
+            (reading and decoding one tree), "lookup_us" (random pairs,
+            trees cached as they would be), "cold_lookup_us" (no cache)}
+    """
+    started = time.perf_counter()
+    reader = RouteTableReader(filepath)
+    open_ms = (time.perf_counter() - started) * 1000
+
+    with reader:
+        count = reader.station_count
+        rng = random.Random(seed)
+        pairs = [(rng.randrange(count), rng.randrange(count)) for _ in range(queries)]
+
+        started = time.perf_counter()
+        for origin in range(count):
+            reader._cache.clear()
+            reader.tree(origin)
+        tree_decode = (time.perf_counter() - started) / count
+
+        ids = reader.station_ids
+        started = time.perf_counter()
+        for start, end in pairs:
+            reader.lookup(ids[start], ids[end])
+        lookup = (time.perf_counter() - started) / queries
+
+        reader.cache_size = 0
+        started = time.perf_counter()
+        for start, end in pairs:
+            reader._cache.clear()
+            reader.lookup(ids[start], ids[end])
+        cold_lookup = (time.perf_counter() - started) / queries
+
+    size = os.path.getsize(filepath)
+    return {
+        "bytes": size,
+        "bytes_per_pair": size / (count * count) if count else 0.0,
+        "open_ms": open_ms,
+        "tree_decode_us": tree_decode * 1e6,
+        "lookup_us": lookup * 1e6,
+        "cold_lookup_us": cold_lookup * 1e6,
+    }
+
+
+if __name__ == "__main__":
+    from tube.map import TubeMap
+    from network.path import PathFinder
+
+    parser = argparse.ArgumentParser(description="Export every route of a network to a route table.")
+    parser.add_argument("network", help="network JSON file")
+    parser.add_argument("output", help="route table file to write")
+    parser.add_argument("--raw", action="store_true", help="do not deflate the trees")
+    parser.add_argument("--engine", default="python", help="routing engine")
+    arguments = parser.parse_args()
+
+    tubemap = TubeMap()
+    tubemap.import_from_json(arguments.network)
+    export = export_route_table(PathFinder(tubemap, engine=arguments.engine), arguments.output,
+                                compress=not arguments.raw)
+    print(f"{export['stations']} stations exported in {export['seconds']:.2f}s: {export['bytes']} bytes "
+          f"({export['table_bytes']} of tables, {export['tree_bytes']} of trees)")
+    report = benchmark_route_table(arguments.output)
+    print(f"{report['bytes_per_pair']:.3f} bytes per station pair, opened in {report['open_ms']:.2f} ms, "
+          f"{report['tree_decode_us']:.1f} us per tree, {report['lookup_us']:.1f} us per lookup "
+          f"({report['cold_lookup_us']:.1f} us uncached)")
@@ -0,0 +1,505 @@
+import heapq
+import struct
+import sys
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from network.route import Route
+
+# Header of serialised patterns: magic, format version, number of stations,
+# maximum number of transfers, number of pattern nodes, number of pattern
+# ends, checksum of the graph (CompactGraph.checksum: station ids, arc
+# ends, times and lines; little-endian)
+PATTERNS_HEADER = struct.Struct("<4sHIHIII")
+PATTERNS_MAGIC = b"TUBT"
+PATTERNS_FORMAT_VERSION = 2
+
+# Default cap on the number of changes of line in a journey
+MAX_TRANSFERS = 8
+
+
+def search_transfer_patterns(graph, origin, max_transfers=MAX_TRANSFERS):
+    """ Compute the transfer patterns of one origin.
+
+    A Dijkstra over (station, line, transfers) states finds, for every
+    station, the fastest journey with at most k changes of line, for every
+    k. Only the Pareto-optimal journeys (each extra change saves time) are
+    kept, as the sequence [origin, change stations..., destination].
+    Patterns share their prefixes: they are stored as a tree of nodes.
+
+    Args:
+        graph (CompactGraph) : the graph to search
+        origin (int) : station index of the origin
+        max_transfers (int) : maximum number of changes of line
+
+    Returns:
+        tuple(array, array, array, array) : node_station and node_parent
+            (the pattern tree, node 0 is the origin), then target_indptr and
+            target_nodes (the pattern ends of destination d are
+            target_nodes[target_indptr[d]:target_indptr[d + 1]]).
+    """
+    indptr, arc_head, arc_time, arc_line = graph.indptr, graph.arc_head, graph.arc_time, graph.arc_line
+
+    # key: (station, line, transfers), value: distance / previous state
+    distances = {(origin, -1, 0): 0}
+    previous = {(origin, -1, 0): None}
+    # key: (station, line), value: best distance with at most k transfers, per k
+    best = {}
+    queue = [(0, 0, origin, -1)]
+
+    while queue:
+        distance, transfers, station, line = heapq.heappop(queue)
+        state = (station, line, transfers)
+        if distance > distances[state]:
+            continue
+        for arc in range(indptr[station], indptr[station + 1]):
+            arc_line_index = arc_line[arc]
+            new_transfers = transfers if line in (-1, arc_line_index) else transfers + 1
+            if new_transfers > max_transfers:
+                continue
+            new_distance = distance + arc_time[arc]
+            key = (arc_head[arc], arc_line_index)
+            bests = best.setdefault(key, [float('inf')] * (max_transfers + 1))
+            # Dominated by a journey as fast with no more transfers
+            if bests[new_transfers] <= new_distance:
+                continue
+            for k in range(new_transfers, max_transfers + 1):
+                if new_distance < bests[k]:
+                    bests[k] = new_distance
+            new_state = (arc_head[arc], arc_line_index, new_transfers)
+            distances[new_state] = new_distance
+            previous[new_state] = state
+            heapq.heappush(queue, (new_distance, new_transfers, arc_head[arc], arc_line_index))
+
+    # Fastest state reaching every station with at most k transfers
+    reaching = {}  # key: station, value: list of (distance, transfers, state)
+    for (station, line, transfers), distance in distances.items():
+        if previous[(station, line, transfers)] is not None:
+            reaching.setdefault(station, []).append((distance, transfers, (station, line, transfers)))
+
+    node_station, node_parent = array('I', [origin]), array('i', [-1])
+    nodes = {}  # key: (parent node, station), value: node
+    target_indptr, target_nodes = array('I', [0]), array('I')
+
+    for destination in range(graph.station_count):
+        # By increasing time: a journey is only kept if it needs fewer
+        # changes than every faster one
+        fewest = max_transfers + 1
+        for distance, transfers, state in sorted(reaching.get(destination, ())):
+            if transfers >= fewest:
+                continue
+            fewest = transfers
+            target_nodes.append(pattern_node(state, previous, node_station, node_parent, nodes))
+        target_indptr.append(len(target_nodes))
+
+    return node_station, node_parent, target_indptr, target_nodes
+
+
+def pattern_node(state, previous, node_station, node_parent, nodes):
+    """ Add the pattern of a final search state to the pattern tree. """
+    # Walk back to the origin, noting the stations where the line changes
+    stations = [state[0]]
+    while True:
+        before = previous[state]
+        if previous[before] is None:
+            break
+        if before[1] != state[1]:
+            stations.append(before[0])
+        state = before
+    stations.reverse()
+
+    node = 0
+    for station in stations:
+        key = (node, station)
+        if key not in nodes:
+            nodes[key] = len(node_station)
+            node_station.append(station)
+            node_parent.append(node)
+        node = nodes[key]
+    return node
+
+
+# Graph of a pattern-building worker process
+_worker_graph = None
+_worker_max_transfers = MAX_TRANSFERS
+
+
+def _init_worker(graph, max_transfers):
+    global _worker_graph, _worker_max_transfers
+    _worker_graph, _worker_max_transfers = graph, max_transfers
+
+
+def _search_in_worker(origin):
+    return search_transfer_patterns(_worker_graph, origin, _worker_max_transfers)
+
+
+class TransferPatternIndex:
+    """ Transfer patterns: the optimal sequences of changes between stations.
+
+    Offline, every origin gets the set of Pareto-optimal (travel time,
+    number of changes) journeys to every destination, reduced to their
+    pattern: the stations where the line changes. Most journeys share a
+    handful of patterns, stored as one prefix tree per origin.
+
+    At query time, the patterns from the origin to the destination form a
+    small query graph whose edges are direct rides on one line. Their times
+    come from per-line tables precomputed over TubeMap lines, so a query
+    evaluates a few edges instead of searching the whole network. An edge
+    takes the fastest line between its two stations, so the result is
+    always a real journey, and the fastest pattern gives the shortest time.
+    """
+
+    def __init__(self, graph, max_transfers=MAX_TRANSFERS):
+        """
+        Args:
+            graph (CompactGraph) : the graph to index
+            max_transfers (int) : maximum number of changes of line
+        """
+        self.graph = graph
+        self.max_transfers = max_transfers
+
+        # Pattern trees, per origin (see search_transfer_patterns), None
+        # for the origins not computed yet
+        count = graph.station_count
+        self.node_stations = [None] * count
+        self.node_parents = [None] * count
+        self.target_indptrs = [None] * count
+        self.target_nodes = [None] * count
+
+        # Direct rides: per line, the stations it serves and the shortest
+        # times and last arcs between any two of them, riding that line only
+        self.line_stations = []  # per line: array of station indices
+        self.line_positions = []  # per line: dict station index -> position
+        self.line_times = []  # per line: n x n array of times
+        self.line_arcs = []  # per line: n x n array of last arcs (-1 if none)
+        self.station_lines = [[] for _ in range(graph.station_count)]
+        self.build_seconds = 0.0
+
+
+    def build(self, processes=None, origins=None):
+        """ Compute the line tables and the transfer patterns of the origins.
+
+        Origins left out are computed on their first query instead.
+
+        Args:
+            processes (int) : if greater than 1, the origins are split over
+                that many worker processes
+            origins (list[int]) : station indices of the origins (default:
+                every station)
+
+        Returns:
+            TransferPatternIndex : self, for chaining.
+        """
+        started = time.perf_counter()
+        if not self.line_times:
+            self.build_line_tables()
+
+        if origins is None:
+            origins = range(self.graph.station_count)
+        if processes and processes > 1:
+            with ProcessPoolExecutor(processes, initializer=_init_worker,
+                                     initargs=(self.graph, self.max_transfers)) as executor:
+                chunksize = max(1, len(origins) // (processes * 4))
+                results = list(executor.map(_search_in_worker, origins, chunksize=chunksize))
+        else:
+            results = [search_transfer_patterns(self.graph, origin, self.max_transfers) for origin in origins]
+
+        for origin, patterns in zip(origins, results):
+            self.set_patterns(origin, patterns)
+
+        self.build_seconds += time.perf_counter() - started
+        return self
+
+
+    def set_patterns(self, origin, patterns):
+        node_station, node_parent, target_indptr, target_nodes = patterns
+        self.node_stations[origin] = node_station
+        self.node_parents[origin] = node_parent
+        self.target_indptrs[origin] = target_indptr
+        self.target_nodes[origin] = target_nodes
+
+
+    def has_origin(self, origin):
+        """ Check whether the patterns of an origin were computed. """
+        return self.node_stations[origin] is not None
+
+
+    def ensure_origin(self, origin):
+        """ Compute the patterns of an origin if they are missing. """
+        if not self.line_times:
+            self.build_line_tables()
+        if self.node_stations[origin] is None:
+            self.set_patterns(origin, search_transfer_patterns(self.graph, origin, self.max_transfers))
+
+
+    def build_line_tables(self):
+        """ Precompute the direct ride times between the stations of every line. """
+        graph = self.graph
+        self.station_lines = [[] for _ in range(graph.station_count)]
+
+        for line in range(len(graph.lines)):
+            # Stations and arcs of that line only
+            adjacency = {}
+            for arc, arc_line in enumerate(graph.arc_line):
+                if arc_line == line:
+                    adjacency.setdefault(graph.arc_tail[arc], []).append(arc)
+                    adjacency.setdefault(graph.arc_head[arc], [])
+            stations = array('I', sorted(adjacency))
+            positions = {station: position for position, station in enumerate(stations)}
+            count = len(stations)
+            times = array('d', [float('inf')]) * (count * count)
+            arcs = array('i', [-1]) * (count * count)
+
+            for position, source in enumerate(stations):
+                row = position * count
+                times[row + position] = 0
+                queue = [(0, source)]
+                while queue:
+                    distance, station = heapq.heappop(queue)
+                    if distance > times[row + positions[station]]:
+                        continue
+                    for arc in adjacency[station]:
+                        head = row + positions[graph.arc_head[arc]]
+                        new_distance = distance + graph.arc_time[arc]
+                        if new_distance < times[head]:
+                            times[head] = new_distance
+                            arcs[head] = arc
+                            heapq.heappush(queue, (new_distance, graph.arc_head[arc]))
+
+            for station in stations:
+                self.station_lines[station].append(line)
+            self.line_stations.append(stations)
+            self.line_positions.append(positions)
+            self.line_times.append(times)
+            self.line_arcs.append(arcs)
+
+
+    def direct(self, start, end):
+        """ Fastest ride from start to end without changing line.
+
+        Returns:
+            tuple(float, int) : (travel time, line index). The time is inf
+                (and the line None) if no line serves both stations.
+        """
+        best, best_line = float('inf'), None
+        for line in self.station_lines[start]:
+            positions = self.line_positions[line]
+            end_position = positions.get(end)
+            if end_position is None:
+                continue
+            ride = self.line_times[line][positions[start] * len(positions) + end_position]
+            if ride < best:
+                best, best_line = ride, line
+        return best, best_line
+
+
+    def ride_arcs(self, start, end, line):
+        """ Arcs of the direct ride from start to end on a line. """
+        positions = self.line_positions[line]
+        row = positions[start] * len(positions)
+        arcs = []
+        station = end
+        while station != start:
+            arc = self.line_arcs[line][row + positions[station]]
+            arcs.append(arc)
+            station = self.graph.arc_tail[arc]
+        arcs.reverse()
+        return arcs
+
+
+    def patterns(self, start, end):
+        """ Transfer patterns from start to end (station indices).
+
+        Returns:
+            list[list[int]] : station indices of every pattern: the origin,
+                the stations where the line changes, and the destination.
+        """
+        self.ensure_origin(start)
+        node_stations, node_parents = self.node_stations[start], self.node_parents[start]
+        indptr = self.target_indptrs[start]
+        patterns = []
+        for node in self.target_nodes[start][indptr[end]:indptr[end + 1]]:
+            pattern = []
+            while node >= 0:
+                pattern.append(node_stations[node])
+                node = node_parents[node]
+            patterns.append(pattern[::-1])
+        return patterns
+
+
+    def query(self, start, end, max_transfers=None):
+        """ Fastest journey from start to end, from the transfer patterns.
+
+        Args:
+            start (int) : station index of the origin
+            end (int) : station index of the destination
+            max_transfers (int) : if given, only journeys with at most that
+                many changes of line are considered
+
+        Returns:
+            Route : the journey. Returns None if no journey satisfies the
+                restrictions.
+        """
+        if start == end:
+            return Route(self.graph.stations, self.graph.lines, array('I', [start]), 0, array('H'))
+        if max_transfers is None:
+            max_transfers = self.max_transfers
+
+        # Query graph: union of the patterns, one edge per direct ride
+        edges = {}
+        for pattern in self.patterns(start, end):
+            for tail, head in zip(pattern, pattern[1:]):
+                edges.setdefault(tail, set()).add(head)
+
+        # Dijkstra over (station, rides taken)
+        distances = {(start, 0): 0}
+        previous = {}
+        queue = [(0, 0, start)]
+        while queue:
+            distance, rides, station = heapq.heappop(queue)
+            if station == end:
+                return self.build_route(previous, (station, rides), distance)
+            if distance > distances[(station, rides)] or rides > max_transfers:
+                continue
+            for head in edges.get(station, ()):
+                ride, line = self.direct(station, head)
+                state = (head, rides + 1)
+                if distance + ride < distances.get(state, float('inf')):
+                    distances[state] = distance + ride
+                    previous[state] = ((station, rides), line)
+                    heapq.heappush(queue, (distance + ride, rides + 1, head))
+        return None
+
+
+    def build_route(self, previous, state, total_time):
+        """ Expand the rides of a query graph path into a Route. """
+        rides = []
+        while state in previous:
+            before, line = previous[state]
+            rides.append((before[0], state[0], line))
+            state = before
+        rides.reverse()
+
+        indices, line_indices = array('I', [rides[0][0]]), array('H')
+        for tail, head, line in rides:
+            for arc in self.ride_arcs(tail, head, line):
+                indices.append(self.graph.arc_head[arc])
+                line_indices.append(self.graph.arc_line[arc])
+        return Route(self.graph.stations, self.graph.lines, indices, total_time, line_indices)
+
+
+    def statistics(self):
+        """ Report the size of the patterns.
+
+        Returns:
+            dict : number of computed origins, pattern nodes and pattern
+                ends, average number of patterns per connected pair,
+                approximate memory used (in bytes) and build time (in
+                seconds).
+        """
+        computed = [origin for origin in range(self.graph.station_count) if self.node_stations[origin] is not None]
+        nodes = sum(len(self.node_stations[origin]) for origin in computed)
+        ends = sum(len(self.target_nodes[origin]) for origin in computed)
+        pairs = sum(1 for origin in computed for destination in range(self.graph.station_count)
+                    if self.target_indptrs[origin][destination + 1] > self.target_indptrs[origin][destination])
+        memory = nodes * (array('I').itemsize + array('i').itemsize) + ends * array('I').itemsize
+        memory += len(computed) * (self.graph.station_count + 1) * array('I').itemsize
+        memory += sum(len(times) * (array('d').itemsize + array('i').itemsize) for times in self.line_times)
+        return {
+            "origins": len(computed),
+            "pattern_nodes": nodes,
+            "pattern_ends": ends,
+            "patterns_per_pair": ends / pairs if pairs else 0,
+            "memory_bytes": memory,
+            "build_seconds": self.build_seconds,
+        }
+
+
+    def to_bytes(self):
+        """ Serialise the patterns (the line tables are rebuilt on load).
+
+        Returns:
+            bytes : header, per-origin node and end counts, then the flat
+                node station, node parent, end offset and end node arrays.
+                Missing origins are computed first.
+        """
+        for origin in range(self.graph.station_count):
+            self.ensure_origin(origin)
+        node_counts = array('I', [len(node_stations) for node_stations in self.node_stations])
+        end_counts = array('I', [len(target_nodes) for target_nodes in self.target_nodes])
+        node_stations, node_parents, target_indptrs, target_nodes = array('I'), array('i'), array('I'), array('I')
+        for origin in range(self.graph.station_count):
+            node_stations.extend(self.node_stations[origin])
+            node_parents.extend(self.node_parents[origin])
+            target_indptrs.extend(self.target_indptrs[origin])
+            target_nodes.extend(self.target_nodes[origin])
+
+        header = PATTERNS_HEADER.pack(PATTERNS_MAGIC, PATTERNS_FORMAT_VERSION, len(node_counts),
+                                      self.max_transfers, len(node_stations), len(target_nodes),
+                                      self.graph.checksum())
+        chunks = [header]
+        for values in (node_counts, end_counts, node_stations, node_parents, target_indptrs, target_nodes):
+            if sys.byteorder == "big":
+                values.byteswap()
+            chunks.append(values.tobytes())
+        return b"".join(chunks)
+
+
+    @classmethod
+    def from_bytes(cls, data, graph):
+        """ Load patterns written by `to_bytes()` for the same graph.
+
+        Returns:
+            TransferPatternIndex : the loaded index. Returns None if the data
+                is not valid or was built for a different graph (other
+                stations, connections, times or lines).
+        """
+        if len(data) < PATTERNS_HEADER.size:
+            return None
+        magic, version, count, max_transfers, nodes, ends, checksum = PATTERNS_HEADER.unpack_from(data)
+        index = cls(graph, max_transfers)
+        if (magic != PATTERNS_MAGIC or version != PATTERNS_FORMAT_VERSION
+                or count != graph.station_count or checksum != graph.checksum()):
+            return None
+
+        offset = PATTERNS_HEADER.size
+        arrays = []
+        for typecode, length in (('I', count), ('I', count), ('I', nodes), ('i', nodes),
+                                 ('I', count * (count + 1)), ('I', ends)):
+            values = array(typecode)
+            end = offset + length * values.itemsize
+            if end > len(data):
+                return None
+            values.frombytes(data[offset:end])
+            if sys.byteorder == "big":
+                values.byteswap()
+            arrays.append(values)
+            offset = end
+        node_counts, end_counts, node_stations, node_parents, target_indptrs, target_nodes = arrays
+
+        node_start, end_start = 0, 0
+        for origin in range(count):
+            node_end, end_end = node_start + node_counts[origin], end_start + end_counts[origin]
+            index.set_patterns(origin, (node_stations[node_start:node_end], node_parents[node_start:node_end],
+                                        target_indptrs[origin * (count + 1):(origin + 1) * (count + 1)],
+                                        target_nodes[end_start:end_end]))
+            node_start, end_start = node_end, end_end
+
+        index.build_line_tables()
+        return index
+
+
+    def save(self, filepath):
+        """ Write the serialised patterns to `filepath`. """
+        with open(filepath, 'wb') as f:
+            f.write(self.to_bytes())
+
+
+    @classmethod
+    def load(cls, filepath, graph):
+        """ Read patterns saved with `save()`. Returns None if invalid. """
+        try:
+            with open(filepath, 'rb') as f:
+                return cls.from_bytes(f.read(), graph)
+        except OSError:
+            return None
@@ -0,0 +1,404 @@
+import argparse
+import datetime
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from tube.map import TubeMap
+from tube.profiles import format_minutes, parse_minutes
+from network.path import PathFinder
+
+# First line of a workload log
+LOG_HEADER = "# tube-workload v1"
+# Line starting every recording session appended to a log
+SESSION_HEADER = "# session"
+
+class RecordedQuery:
+    """ One get_shortest_path call of a workload.
+
+    Attributes:
+        offset (float) : seconds since the recording of the log started
+        start, end (str) : station names, as they were asked
+        options (dict) : non-default keyword arguments of the call
+    """
+
+    def __init__(self, offset, start, end, options=None):
+        self.offset = offset
+        self.start = start
+        self.end = end
+        self.options = options or {}
+
+    def __repr__(self):
+        return f"RecordedQuery({self.offset:.3f}s, {self.start} -> {self.end})"
+
+
+class QueryRecorder:
+    """ Append the queries of a PathFinder to a workload log.
+
+    Recording is opt-in: attach a recorder to a PathFinder with
+    `path_finder.recorder = QueryRecorder("queries.log")`. Every query is
+    then written as one tab-separated line
+        <seconds since start>\t<start name>\t<end name>\t<options as JSON>
+    where the options column is empty for plain queries. Every recorder
+    starts a new session (a "# session" line), whose offsets
+    load_workload() moves after the end of the previous sessions. Writes
+    are buffered and serialised with a lock, so recording is safe from
+    several threads and adds about a microsecond per query.
+    """
+
+    def __init__(self, filepath):
+        """
+        Args:
+            filepath (str) : path of the log (appended to if it exists)
+        """
+        self.filepath = filepath
+        self.count = 0
+        self._lock = threading.Lock()
+        self._file = open(filepath, 'a', encoding='utf-8')
+        if self._file.tell() == 0:
+            self._file.write(LOG_HEADER + "\n")
+        self._file.write(f"{SESSION_HEADER} {datetime.datetime.now().isoformat(timespec='seconds')}\n")
+        self._started = time.perf_counter()
+
+
+    def record(self, start, end, **options):
+        """ Append one query to the log. """
+        offset = time.perf_counter() - self._started
+        options = {name: encode_option(value) for name, value in options.items() if value is not None}
+        line = "\t".join((f"{offset:.6f}", clean_name(start), clean_name(end),
+                          json.dumps(options, separators=(",", ":")) if options else ""))
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(line + "\n")
+            self.count += 1
+
+
+    def flush(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def clean_name(name):
+    """ Station names must not break the tab-separated format. """
+    return " ".join(str(name).split())
+
+
+def encode_option(value):
+    """ Make an option of get_shortest_path JSON-serialisable. """
+    if isinstance(value, (datetime.time, datetime.datetime)):
+        return format_minutes(parse_minutes(value))
+    if isinstance(value, (set, frozenset, tuple)):
+        return sorted(value, key=str)
+    return value
+
+
+def load_workload(filepath):
+    """ Read a workload log written by QueryRecorder.
+
+    Malformed lines are skipped. Offsets restart at 0 with every session
+    appended to the log: they are shifted to follow the previous sessions,
+    so that a replay keeps their order and the pace inside each session.
+    If filepath is invalid, return an empty list.
+
+    Returns:
+        list[RecordedQuery] : queries in log order.
+    """
+    queries = []
+    session_start = 0.0  # offset of the current session in the whole log
+    log_end = 0.0  # largest offset so far
+    try:
+        with open(filepath, encoding='utf-8') as f:
+            for line in f:
+                if line.startswith(SESSION_HEADER):
+                    session_start = log_end
+                    continue
+                if line.startswith("#"):
+                    continue
+                fields = line.rstrip("\n").split("\t")
+                if len(fields) != 4:
+                    continue
+                try:
+                    offset = float(fields[0])
+                    options = json.loads(fields[3]) if fields[3] else {}
+                except ValueError:
+                    continue
+                offset += session_start
+                log_end = max(log_end, offset)
+                queries.append(RecordedQuery(offset, fields[1], fields[2], options))
+    except OSError:
+        return []
+    return queries
+
+
+def percentiles(values, points=(50, 90, 99)):
+    """ Nearest-rank percentiles of a list of values.
+
+    Returns:
+        dict : key: "p<point>", "mean" and "max", value: float (0.0 if
+            there are no values).
+    """
+    if not values:
+        return {**{f"p{point:g}": 0.0 for point in points}, "mean": 0.0, "max": 0.0}
+    ordered = sorted(values)
+    result = {f"p{point:g}": ordered[min(len(ordered) - 1, max(0, int(round(point / 100 * len(ordered))) - 1))]
+              for point in points}
+    result["mean"] = sum(ordered) / len(ordered)
+    result["max"] = ordered[-1]
+    return result
+
+
+def stats_of(target):
+    """ The stats dict of a PathFinder, or of the snapshot of a ReloadManager. """
+    stats = getattr(target, "stats", None)
+    if stats is None and getattr(target, "snapshot", None) is not None:
+        stats = target.snapshot.path_finder.stats
+    return stats or {}
+
+
+def cache_hit_rates(before, after):
+    """ Hit rate of every "<name>_hits" / "<name>_misses" pair of stats counters.
+
+    Returns:
+        dict : key: cache name, value: (hits, misses, hit rate) over the
+            queries run between the two stats snapshots.
+    """
+    rates = {}
+    for key, value in after.items():
+        if not key.endswith("_hits") or not isinstance(value, (int, float)):
+            continue
+        name = key[:-len("_hits")]
+        hits = value - before.get(key, 0)
+        misses = after.get(f"{name}_misses", 0) - before.get(f"{name}_misses", 0)
+        total = hits + misses
+        rates[name] = (hits, misses, hits / total if total else 0.0)
+    return rates
+
+
+def run_query(target, query):
+    """ Run one query on a PathFinder (or ReloadManager).
+
+    Returns:
+        tuple(float, bool, str) : service time (seconds), whether a route
+            was found, and the error message (None if none).
+    """
+    started = time.perf_counter()
+    try:
+        if query.options:
+            route = target.get_shortest_path(query.start, query.end, **query.options)
+        else:
+            route = target.get_shortest_path(query.start, query.end)
+    except Exception as e:  # a replay reports errors instead of stopping
+        return time.perf_counter() - started, False, f"{type(e).__name__}: {e}"
+    return time.perf_counter() - started, route is not None, None
+
+
+# PathFinder of a replay worker process
+_worker_path_finder = None
+
+
+def _init_worker(filepath, engine):
+    global _worker_path_finder
+    tubemap = TubeMap()
+    tubemap.import_from_json(filepath)
+    _worker_path_finder = PathFinder(tubemap, engine=engine)
+
+
+def _run_in_worker(query):
+    service, found, error = run_query(_worker_path_finder, query)
+    return service, found, error, os.getpid(), dict(_worker_path_finder.stats)
+
+
+class WorkloadReplayer:
+    """ Replay a recorded workload and measure how the network code copes.
+
+    Queries are submitted by one scheduling thread, either at their
+    recorded pace (optionally sped up by `rate`), or as fast as possible
+    (rate "max"), to a pool of threads sharing one PathFinder, or to a pool
+    of processes that each import the network and build their own
+    PathFinder. Latencies are measured from the time a query was due, so
+    they include the time spent waiting for a free worker.
+    """
+
+    def __init__(self, target=None, filepath=None, engine="python", workers=4, processes=False):
+        """
+        Args:
+            target : object answering get_shortest_path (PathFinder or
+                ReloadManager), used by the thread pool
+            filepath (str) : network JSON file, needed by the process pool
+            engine (str) : routing engine of the worker processes
+            workers (int) : size of the pool
+            processes (bool) : use a process pool instead of threads
+
+        Raises:
+            ValueError : if the pool cannot be set up from the arguments.
+        """
+        if processes and filepath is None:
+            raise ValueError("A process pool needs the network filepath.")
+        if not processes and target is None:
+            raise ValueError("A thread pool needs a target PathFinder.")
+        self.target = target
+        self.filepath = filepath
+        self.engine = engine
+        self.workers = workers
+        self.processes = processes
+
+
+    def replay(self, queries, rate="original"):
+        """ Replay queries and report the performance.
+
+        Args:
+            queries (list[RecordedQuery]) : e.g. from load_workload()
+            rate (str or float) : "original" for the recorded pace, "max" to
+                submit every query at once, or a speed-up factor (2.0 replays
+                twice as fast as recorded)
+
+        Returns:
+            dict : {"queries", "found", "errors", "elapsed" (seconds),
+                "throughput" (queries per second), "latency" and "service"
+                (percentiles in milliseconds, see percentiles()), "cache"
+                (see cache_hit_rates())}
+
+        Raises:
+            ValueError : if rate is invalid.
+        """
+        speed = self.parse_rate(rate)
+        if self.processes:
+            executor = ProcessPoolExecutor(self.workers, initializer=_init_worker,
+                                           initargs=(self.filepath, self.engine))
+            before = {}
+        else:
+            executor = ThreadPoolExecutor(self.workers)
+            before = dict(stats_of(self.target))
+
+        latencies, services, errors = [], [], []
+        found = 0
+        worker_stats = {}  # key: worker process id, value: last stats seen
+        lock = threading.Lock()
+
+        def completed(future, due):
+            nonlocal found
+            finished = time.perf_counter()
+            if self.processes:
+                service, route_found, error, worker, stats = future.result()
+                with lock:
+                    # Counters of a worker only grow: keep its last snapshot
+                    worker_stats[worker] = stats
+            else:
+                service, route_found, error = future.result()
+            with lock:
+                latencies.append(finished - due)
+                services.append(service)
+                found += route_found
+                if error is not None:
+                    errors.append(error)
+
+        with executor:
+            if self.processes:
+                # Warm the workers up, so that importing the network is not timed
+                list(executor.map(_run_in_worker, [RecordedQuery(0, "", "")] * self.workers))
+                worker_stats.clear()
+
+            first_offset = queries[0].offset if queries else 0
+            started = time.perf_counter()
+            for query in queries:
+                due = started
+                if speed is not None:
+                    due += (query.offset - first_offset) / speed
+                    delay = due - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                if self.processes:
+                    future = executor.submit(_run_in_worker, query)
+                else:
+                    future = executor.submit(run_query, self.target, query)
+                future.add_done_callback(lambda future, due=due: completed(future, due))
+        elapsed = time.perf_counter() - started
+
+        if self.processes:
+            after = merge_stats(worker_stats.values())
+        else:
+            after = dict(stats_of(self.target))
+
+        return {
+            "queries": len(queries),
+            "found": found,
+            "errors": len(errors),
+            "elapsed": elapsed,
+            "throughput": len(queries) / elapsed if elapsed > 0 else 0.0,
+            "latency": {name: value * 1000 for name, value in percentiles(latencies).items()},
+            "service": {name: value * 1000 for name, value in percentiles(services).items()},
+            "cache": cache_hit_rates(before, after),
+        }
+
+
+    @staticmethod
+    def parse_rate(rate):
+        """ Return the speed-up factor of a rate (None for "max"). """
+        if rate == "max":
+            return None
+        if rate == "original":
+            return 1.0
+        try:
+            speed = float(rate)
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid replay rate {rate!r}, expected 'original', 'max' or a factor.")
+        if speed <= 0:
+            raise ValueError(f"Invalid replay rate {rate!r}, the factor must be positive.")
+        return speed
+
+
+def merge_stats(all_stats):
+    """ Sum the numeric counters of several stats dicts. """
+    merged = {}
+    for stats in all_stats:
+        for key, value in stats.items():
+            if isinstance(value, (int, float)):
+                merged[key] = merged.get(key, 0) + value
+    return merged
+
+
+def print_report(report):
+    print(f"{report['queries']} queries in {report['elapsed']:.2f}s "
+          f"({report['throughput']:.0f} queries/s), {report['found']} routes found, {report['errors']} errors")
+    for name in ("latency", "service"):
+        values = report[name]
+        print(f"{name}: " + ", ".join(f"{key} {value:.3f} ms" for key, value in values.items()))
+    for name, (hits, misses, rate) in report["cache"].items():
+        print(f"{name} cache: {hits} hits, {misses} misses ({rate:.1%})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay a recorded query workload.")
+    parser.add_argument("log", help="workload log written by QueryRecorder")
+    parser.add_argument("network", help="network JSON file")
+    parser.add_argument("--rate", default="original", help="'original', 'max' or a speed-up factor")
+    parser.add_argument("--workers", type=int, default=4, help="size of the pool")
+    parser.add_argument("--processes", action="store_true", help="use a process pool")
+    parser.add_argument("--engine", default="python", help="routing engine")
+    arguments = parser.parse_args()
+
+    target = None
+    if not arguments.processes:
+        tubemap = TubeMap()
+        tubemap.import_from_json(arguments.network)
+        target = PathFinder(tubemap, engine=arguments.engine)
+    replayer = WorkloadReplayer(target, arguments.network, arguments.engine,
+                                arguments.workers, arguments.processes)
+    print_report(replayer.replay(load_workload(arguments.log), rate=arguments.rate))
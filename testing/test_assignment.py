@@ -0,0 +1,113 @@
+import unittest
+import os
+import time
+import random
+from tube.map import TubeMap
+from tube.synthetic import make_grid_tubemap
+from network.path import PathFinder
+from network.assignment import FlowAssignment
+
+
+class TestAssignment(unittest.TestCase):
+
+    # Set up the test case
+    def setUp(self):
+
+        self.tubemap = TubeMap()
+
+        # Define path to the real JSON file
+        self.data_directory = os.path.abspath(os.path.join(os.path.dirname(__file__), 'data'))
+        self.original_json_filepath = os.path.join(self.data_directory, 'london.json')
+        self.tubemap.import_from_json(self.original_json_filepath)
+
+        self.path_finder = PathFinder(self.tubemap)
+        self.assignment = FlowAssignment(self.path_finder)
+
+
+    # Test a single trip against its route
+    def test_single_trip(self):
+        result = self.assignment.assign({("60", "107"): 10})  # Covent Garden -> Green Park
+        route = self.path_finder.get_shortest_path("Covent Garden", "Green Park")
+
+        self.assertEqual(result.assigned_trips, 10)
+        self.assertEqual(result.total_travel_time, 10 * route.total_time)
+        self.assertEqual(sum(result.arc_flows), 10 * (len(route) - 1))
+        self.assertEqual(result.station_boardings("60"), 10)
+        self.assertEqual(result.station_alightings("107"), 10)
+        # Piccadilly Line all the way: nobody changes at Leicester Square
+        self.assertEqual(result.station_boardings(route[1].id), 0)
+
+
+    # Test a changing journey
+    def test_line_change(self):
+        # Stockwell (Northern) -> Sloane Square needs a change
+        result = self.assignment.assign({("245", "229"): 4})
+        route = self.path_finder.get_shortest_path("Stockwell", "Sloane Square")
+        changes = sum(1 for line, next_line in zip(route.lines, route.lines[1:]) if line is not next_line)
+        self.assertGreater(changes, 0)
+        self.assertEqual(sum(result.boardings), 4 * (changes + 1))
+        self.assertEqual(sum(result.alightings), 4 * (changes + 1))
+
+
+    # Trips cross zero-time interchanges all the way to their origin
+    def test_zero_time_interchanges(self):
+        self.tubemap.add_interchange("60", "107", 0)  # Covent Garden - Green Park
+        self.tubemap.add_interchange("107", "192", 0)  # Green Park - Oxford Circus
+        assignment = FlowAssignment(PathFinder(self.tubemap))
+        result = assignment.assign({("60", "192"): 3, ("192", "60"): 5})
+
+        self.assertEqual(result.assigned_trips, 8)
+        self.assertEqual(result.total_travel_time, 0)
+        self.assertEqual(sum(result.arc_flows), 2 * 8)
+        self.assertEqual(result.station_boardings("60"), 3)
+        self.assertEqual(result.station_boardings("192"), 5)
+        self.assertEqual(result.station_boardings("107"), 0)
+
+
+    # Test a full dense matrix
+    def test_dense_matrix(self):
+        count = len(self.tubemap.stations)
+        rng = random.Random(1)
+        matrix = [[rng.randint(0, 3) for _ in range(count)] for _ in range(count)]
+
+        start_time = time.perf_counter()
+        result = self.assignment.assign(matrix)
+        self.assertLess(time.perf_counter() - start_time, 5)
+
+        trips = sum(sum(row) for row in matrix) - sum(matrix[i][i] for i in range(count))
+        self.assertEqual(result.assigned_trips, trips)
+        self.assertEqual(result.unassigned_trips, 0)
+        self.assertAlmostEqual(sum(result.boardings), sum(result.alightings))
+        self.assertAlmostEqual(sum(result.connection_flows), sum(result.arc_flows))
+
+        # Total travel time equals the sum of the flows times the arc times
+        graph = self.path_finder.compact_graph
+        self.assertAlmostEqual(result.total_travel_time,
+                               sum(flow * time for flow, time in zip(result.arc_flows, graph.arc_time)))
+
+
+    # Test the congestion-aware variants
+    def test_congested_methods(self):
+        demand = {("245", "236"): 500, ("60", "107"): 200, ("11", "192"): 300}
+        assignment = FlowAssignment(self.path_finder, capacity=100)
+        for method in ("incremental", "msa"):
+            result = assignment.assign(demand, method=method, iterations=4)
+            self.assertAlmostEqual(result.assigned_trips, 1000)
+            self.assertAlmostEqual(sum(result.boardings), sum(result.alightings))
+
+        with self.assertRaises(ValueError):
+            assignment.assign(demand, method="stochastic")
+
+
+    # Test a larger synthetic network
+    def test_synthetic_network(self):
+        tubemap = make_grid_tubemap(20, 20)
+        assignment = FlowAssignment(PathFinder(tubemap, engine="csr"))
+        demand = {(str(origin), str(destination)): 1 for origin in range(1, 401, 7) for destination in range(1, 401, 3)}
+        result = assignment.assign(demand)
+        self.assertEqual(result.unassigned_trips, 0)
+        self.assertAlmostEqual(sum(result.boardings), sum(result.alightings))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import unittest
+import os
+from tube.map import TubeMap
+from network.path import PathFinder
+
+
+class TestBudget(unittest.TestCase):
+
+    # Set up the test case
+    def setUp(self):
+
+        self.tubemap = TubeMap()
+
+        # Define path to the real JSON file
+        self.data_directory = os.path.abspath(os.path.join(os.path.dirname(__file__), 'data'))
+        self.original_json_filepath = os.path.join(self.data_directory, 'london.json')
+        self.tubemap.import_from_json(self.original_json_filepath)
+
+        self.path_finder = PathFinder(self.tubemap)
+        self.exact = self.path_finder.get_shortest_path("Stockwell", "Hammersmith").total_time
+
+
+    def assertWithinBound(self, route, exact):
+        self.assertGreaterEqual(route.total_time, exact - 1e-9)
+        self.assertLessEqual(route.total_time - route.error_bound, exact + 1e-9)
+
+
+    # Without tables, the best route reached so far is returned
+    def test_best_so_far(self):
+        self.assertIsNone(self.path_finder.get_shortest_path("Stockwell", "Hammersmith", max_settled=5))
+        self.assertEqual(self.path_finder.stats["budget_exceeded"], 1)
+
+        approximate = 0
+        for max_settled in range(5, 400, 5):
+            route = self.path_finder.get_shortest_path("Stockwell", "Hammersmith", max_settled=max_settled)
+            if route is None:
+                continue
+            self.assertEqual(route.names[0], "Stockwell")
+            self.assertEqual(route.names[-1], "Hammersmith")
+            self.assertWithinBound(route, self.exact)
+            if route.approximate:
+                approximate += 1
+            else:
+                self.assertEqual(route.total_time, self.exact)
+                self.assertEqual(route.error_bound, 0)
+        self.assertGreater(approximate, 0)
+        self.assertEqual(self.path_finder.stats["approximate"], approximate)
+
+        # Short journeys finish within the budget
+        route = self.path_finder.get_shortest_path("Green Park", "Oxford Circus", max_settled=5, deadline=0.0)
+        self.assertFalse(route.approximate)
+
+
+    # Deadlines are checked as the search goes
+    def test_deadline(self):
+        before = self.path_finder.stats["budget_exceeded"]
+        route = self.path_finder.get_shortest_path("Stockwell", "Hammersmith", deadline=0.0)
+        self.assertEqual(self.path_finder.stats["budget_exceeded"], before + 1)
+        self.assertTrue(route is None or route.approximate)
+
+        route = self.path_finder.get_shortest_path("Stockwell", "Hammersmith", deadline=10.0)
+        self.assertEqual(route.total_time, self.exact)
+        self.assertEqual(self.path_finder.stats["budget_exceeded"], before + 1)
+
+
+    # Precomputed tables answer when the search falls short
+    def test_table_fallback(self):
+        self.path_finder.build_hub_labels()
+        route = self.path_finder.get_shortest_path("Stockwell", "Hammersmith", max_settled=1)
+        self.assertEqual(route.total_time, self.exact)
+        self.assertFalse(route.approximate)
+        self.assertEqual(self.path_finder.stats["table_fallbacks"], 1)
+
+        # A table route breaking the restrictions is not used
+        excluded = {line.name for line in route.lines}
+        exact = self.path_finder.get_shortest_path("Stockwell", "Hammersmith", excluded_lines=excluded).total_time
+        for max_settled in (1, 100, 200):
+            route = self.path_finder.get_shortest_path("Stockwell", "Hammersmith", excluded_lines=excluded,
+                                                       max_settled=max_settled)
+            if route is not None:
+                self.assertFalse(excluded & {line.name for line in route.lines})
+                self.assertWithinBound(route, exact)
+        self.assertEqual(self.path_finder.stats["table_fallbacks"], 1)
+
+
+    # Transfer patterns serve as tables too, and landmark searches have budgets
+    def test_patterns_and_landmarks(self):
+        start = self.path_finder.compact_graph.station_index["245"]  # Stockwell
+        self.path_finder.build_transfer_patterns()
+        self.assertTrue(self.path_finder.transfer_patterns.has_origin(start))
+        route = self.path_finder.get_shortest_path("Stockwell", "Hammersmith", max_settled=1)
+        self.assertEqual(route.total_time, self.exact)
+
+        self.path_finder.transfer_patterns = None
+        self.path_finder.build_landmarks()
+        for max_settled in range(1, 60, 3):
+            route = self.path_finder.get_shortest_path("Stockwell", "Hammersmith", max_settled=max_settled)
+            if route is not None:
+                self.assertWithinBound(route, self.exact)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,143 @@
+import unittest
+import os
+import random
+from tube.map import TubeMap
+from tube.synthetic import make_grid_tubemap
+from network.graph import NeighbourGraphBuilder, ChainGraph
+from network.engines import ChainEngine, CSREngine, PythonEngine
+from network.path import PathFinder
+
+
+class TestChains(unittest.TestCase):
+
+    # Set up the test case
+    def setUp(self):
+
+        self.tubemap = TubeMap()
+
+        # Define path to the real JSON file
+        self.data_directory = os.path.abspath(os.path.join(os.path.dirname(__file__), 'data'))
+        self.original_json_filepath = os.path.join(self.data_directory, 'london.json')
+        self.tubemap.import_from_json(self.original_json_filepath)
+
+        self.graph_builder = NeighbourGraphBuilder()
+        self.graph = self.graph_builder.build_compact(self.tubemap)
+
+
+    def assertValidPath(self, graph, result, sources, target):
+        """ Follow the previous arcs back from `target` to a source. """
+        total, current = 0, target
+        while result.previous[current] >= 0:
+            arc = result.previous[current]
+            self.assertEqual(graph.arc_head[arc], current)
+            total += graph.arc_time[arc]
+            current = graph.arc_tail[arc]
+        self.assertIn(current, sources)
+        self.assertAlmostEqual(total + sources[current], result.distances[target])
+
+
+    # Chains between junctions become super-edges
+    def test_build(self):
+        chains = self.graph_builder.build_chains(self.graph)
+        self.assertLess(chains.junction_count, self.graph.station_count)
+        self.assertLess(chains.edge_count, len(self.graph.arc_head))
+
+        # Every arc is on exactly one super-edge
+        self.assertEqual(sorted(chains.chain_arcs), list(range(len(self.graph.arc_head))))
+        for edge in range(chains.edge_count):
+            arcs = chains.chain_arcs[chains.edge_start[edge]:chains.edge_start[edge + 1]]
+            self.assertAlmostEqual(sum(self.graph.arc_time[arc] for arc in arcs), chains.edge_time[edge])
+            self.assertEqual(chains.edge_twin[chains.edge_twin[edge]], edge)
+
+        # A chain station sits on one super-edge per direction
+        for station in range(self.graph.station_count):
+            if not chains.junction[station]:
+                for edge, position in chains.chain_positions(station):
+                    arc = chains.chain_arcs[chains.edge_start[edge] + position]
+                    self.assertEqual(self.graph.arc_head[arc], station)
+
+
+    # Same distances as the other engines, with fewer stations settled
+    def test_distances(self):
+        for graph in (self.graph, self.graph_builder.build_compact(make_grid_tubemap(6, 8, seed=3))):
+            engine, reference = ChainEngine(graph), PythonEngine(graph)
+            for source in range(0, graph.station_count, 7):
+                expected = reference.search({source: 0}).distances
+                result = engine.search({source: 0})
+                for station in range(graph.station_count):
+                    self.assertAlmostEqual(result.distances[station], expected[station])
+                for station in range(0, graph.station_count, 5):
+                    if station != source:
+                        self.assertValidPath(graph, result, {source: 0}, station)
+
+        generator = random.Random(5)
+        reference, engine = CSREngine(self.graph), ChainEngine(self.graph)
+        settled, chain_settled = 0, 0
+        for _ in range(300):
+            sources = {generator.randrange(self.graph.station_count): generator.choice((0, 2)) for _ in range(2)}
+            targets = {generator.randrange(self.graph.station_count): generator.choice((0, 1)) for _ in range(2)}
+            expected, result = reference.search(sources, targets), engine.search(sources, targets)
+            self.assertAlmostEqual(result.distances[result.best_target] + targets[result.best_target],
+                                   expected.distances[expected.best_target] + targets[expected.best_target])
+            self.assertValidPath(self.graph, result, sources, result.best_target)
+            settled += expected.settled
+            chain_settled += result.settled
+        self.assertLess(chain_settled, settled)
+
+
+    # Origins and destinations inside a chain, on the same chain or not
+    def test_path_finder(self):
+        reference = PathFinder(self.tubemap)
+        path_finder = PathFinder(self.tubemap, engine="chains")
+        chains = path_finder.engine.chains
+        names = [station.name for station in self.graph.stations]
+        interior = [station.name for index, station in enumerate(self.graph.stations)
+                    if not chains.junction[index]]
+
+        generator = random.Random(9)
+        pairs = [(generator.choice(interior), generator.choice(names)) for _ in range(100)]
+        pairs += [(generator.choice(names), generator.choice(interior)) for _ in range(100)]
+        # Both ends inside one chain
+        for edge in range(0, chains.edge_count, 9):
+            arcs = chains.chain_arcs[chains.edge_start[edge]:chains.edge_start[edge + 1] - 1]
+            if len(arcs) >= 2:
+                first, last = self.graph.arc_head[arcs[0]], self.graph.arc_head[arcs[-1]]
+                pairs.append((names[first], names[last]))
+                pairs.append((names[last], names[first]))
+
+        for start, end in pairs:
+            expected, route = reference.get_shortest_path(start, end), path_finder.get_shortest_path(start, end)
+            self.assertAlmostEqual(route.total_time, expected.total_time)
+            self.assertEqual(route.names[0], start)
+            self.assertEqual(route.names[-1], end)
+            self.assertEqual(len(route.lines), len(route.names) - 1)
+
+
+    # A loop with no junction gets one, and filters fall back to full arcs
+    def test_loop_and_filters(self):
+        data = {
+            "stations": [{"id": str(index), "name": f"Stop {index}", "zone": "1"} for index in range(5)],
+            "lines": [{"line": "1", "name": "Circle Line"}],
+            "connections": [{"station1": str(index), "station2": str((index + 1) % 5), "line": "1", "time": 1}
+                            for index in range(5)],
+        }
+        loop = TubeMap()
+        loop.import_from_data(data)
+        graph = self.graph_builder.build_compact(loop)
+        chains = ChainGraph(graph)
+        self.assertEqual(chains.junction_count, 1)
+        self.assertEqual(chains.edge_count, 2)
+        engine = ChainEngine(graph)
+        for source in range(5):
+            self.assertEqual(engine.search({source: 0}).distances, PythonEngine(graph).search({source: 0}).distances)
+
+        path_finder = PathFinder(self.tubemap, engine="chains")
+        route = path_finder.get_shortest_path("Green Park", "Oxford Circus", excluded_lines=["Victoria Line"])
+        expected = PathFinder(self.tubemap).get_shortest_path("Green Park", "Oxford Circus",
+                                                              excluded_lines=["Victoria Line"])
+        self.assertEqual(route.names, expected.names)
+        self.assertNotIn("Victoria Line", [line.name for line in route.lines])
+
+
+if __name__ == "__main__":
+    unittest.main()
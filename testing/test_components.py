@@ -0,0 +1,142 @@
+import unittest
+import os
+import random
+from tube.map import TubeMap
+from network.graph import NeighbourGraphBuilder
+from network.path import PathFinder
+
+
+def reference_components(graph, disabled_stations, disabled_connections):
+    """ Reference: plain search from every station, as a set of frozensets. """
+    components, seen = set(), set()
+    for source in range(graph.station_count):
+        if source in seen or source in disabled_stations:
+            continue
+        component, stack = {source}, [source]
+        while stack:
+            station = stack.pop()
+            for arc in range(graph.indptr[station], graph.indptr[station + 1]):
+                head = graph.arc_head[arc]
+                if (head not in component and head not in disabled_stations
+                        and graph.arc_connection[arc] not in disabled_connections):
+                    component.add(head)
+                    stack.append(head)
+        seen |= component
+        components.add(frozenset(component))
+    return components
+
+
+class TestComponents(unittest.TestCase):
+
+    # Set up the test case
+    def setUp(self):
+
+        self.tubemap = TubeMap()
+
+        # Define path to the real JSON file
+        self.data_directory = os.path.abspath(os.path.join(os.path.dirname(__file__), 'data'))
+        self.original_json_filepath = os.path.join(self.data_directory, 'london.json')
+        self.tubemap.import_from_json(self.original_json_filepath)
+
+        self.graph_builder = NeighbourGraphBuilder()
+        self.graph = self.graph_builder.build_compact(self.tubemap)
+        self.path_finder = PathFinder(self.tubemap)
+
+
+    def assertMatchesReference(self, index):
+        expected = reference_components(self.graph, index.disabled_stations, index.disabled_connections)
+        self.assertEqual({frozenset(members) for members in index.members.values()}, expected)
+        for members in index.members.values():
+            for station in members:
+                self.assertIs(index.reachable(station), members)
+        for station in index.disabled_stations:
+            self.assertEqual(index.labels[station], -1)
+            self.assertEqual(len(index.reachable(station)), 0)
+
+
+    # The whole network is one component
+    def test_build(self):
+        index = self.graph_builder.build_components(self.graph)
+        self.assertEqual(index.component_count, 1)
+        self.assertTrue(index.intact)
+        self.assertEqual(len(index.reachable(0)), self.graph.station_count)
+        self.assertTrue(index.connected(0, self.graph.station_count - 1))
+
+
+    # Random closures and reopenings against a full recomputation
+    def test_disable_and_enable(self):
+        index = self.graph_builder.build_components(self.graph)
+        generator = random.Random(7)
+        connections = sorted(index.connection_arcs)
+
+        closed_stations, closed_connections = [], []
+        for _ in range(40):
+            if generator.random() < 0.5:
+                station = generator.randrange(self.graph.station_count)
+                index.disable_station(station)
+                closed_stations.append(station)
+            else:
+                connection = generator.choice(connections)
+                index.disable_connection(connection)
+                closed_connections.append(connection)
+        self.assertGreater(index.component_count, 1)
+        self.assertFalse(index.intact)
+        self.assertMatchesReference(index)
+
+        # Reopen in a different order, checking after every step
+        generator.shuffle(closed_stations)
+        generator.shuffle(closed_connections)
+        for station, connection in zip(closed_stations, closed_connections):
+            index.enable_station(station)
+            self.assertMatchesReference(index)
+            index.enable_connection(connection)
+            self.assertMatchesReference(index)
+        for station in closed_stations:
+            index.enable_station(station)
+        for connection in closed_connections:
+            index.enable_connection(connection)
+        self.assertTrue(index.intact)
+        self.assertEqual(index.component_count, 1)
+
+
+    # Closures are honoured by the searches of a PathFinder
+    def test_path_finder(self):
+        graph = self.path_finder.compact_graph
+
+        # A terminus is cut off when its only neighbour closes
+        terminus = next(index for index in range(graph.station_count)
+                        if len({head for head, _ in graph.neighbours(index)}) == 1)
+        neighbour = graph.neighbours(terminus)[0][0]
+        terminus_name, neighbour_name = graph.stations[terminus].name, graph.stations[neighbour].name
+
+        self.assertTrue(self.path_finder.disable_station(neighbour_name))
+        self.assertIsNone(self.path_finder.get_shortest_path(terminus_name, "Covent Garden"))
+        self.assertIsNone(self.path_finder.get_shortest_path(neighbour_name, "Covent Garden"))
+        self.assertEqual(self.path_finder.stats["unreachable"], 2)
+        self.assertEqual(self.path_finder.get_reachable_stations(terminus_name), [graph.stations[terminus]])
+        self.assertEqual(self.path_finder.get_reachable_stations(neighbour_name), [])
+
+        self.assertTrue(self.path_finder.enable_station(neighbour_name))
+        self.assertIsNotNone(self.path_finder.get_shortest_path(terminus_name, "Covent Garden"))
+        self.assertEqual(len(self.path_finder.get_reachable_stations(terminus_name)), graph.station_count)
+
+        # Closed connections are avoided
+        direct = self.path_finder.get_shortest_path("Green Park", "Oxford Circus")
+        self.assertEqual(direct.names, ["Green Park", "Oxford Circus"])
+        self.assertTrue(self.path_finder.disable_connection("Green Park", "Oxford Circus", "Victoria Line"))
+        detour = self.path_finder.get_shortest_path("Green Park", "Oxford Circus")
+        self.assertGreater(len(detour.names), 2)
+        self.assertGreater(detour.total_time, direct.total_time)
+
+        self.assertTrue(self.path_finder.enable_connection("Green Park", "Oxford Circus"))
+        self.assertEqual(self.path_finder.get_shortest_path("Green Park", "Oxford Circus").names,
+                         ["Green Park", "Oxford Circus"])
+
+        # Unknown names
+        self.assertFalse(self.path_finder.disable_station("Nowhere"))
+        self.assertFalse(self.path_finder.disable_connection("Green Park", "Stockwell"))
+        self.assertEqual(self.path_finder.get_reachable_stations("Nowhere"), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
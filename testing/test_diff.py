@@ -0,0 +1,213 @@
+import unittest
+import os
+import copy
+import json
+from tube.map import TubeMap
+from network.diff import NetworkDiff, NetworkComparison
+
+
+class TestNetworkDiff(unittest.TestCase):
+
+    def create_json_file(self, filepath, data):
+        with open(filepath, 'w') as f:
+            json.dump(data, f)
+
+
+    # Set up the test case
+    def setUp(self):
+
+        # Define path to the real JSON file
+        self.data_directory = os.path.abspath(os.path.join(os.path.dirname(__file__), 'data'))
+        self.original_json_filepath = os.path.join(self.data_directory, 'london.json')
+        with open(self.original_json_filepath) as f:
+            self.data = json.load(f)
+
+        self.old_tubemap = TubeMap()
+        self.old_tubemap.import_from_data(self.data)
+
+        # New version: a closure, a slower and a faster connection, and a new
+        # station linking Covent Garden to Stockwell
+        data = copy.deepcopy(self.data)
+        connections = data["connections"]
+        self.removed = self.find_connection(connections, "107", "192")  # Green Park - Oxford Circus
+        connections.remove(self.removed)
+        self.slowed = self.find_connection(connections, "236", "229")  # South Kensington - Sloane Square
+        self.slowed["time"] = str(int(self.slowed["time"]) + 3)
+        self.sped_up = self.find_connection(connections, "110", "209")  # Hammersmith
+        self.sped_up["time"] = "1"
+        data["stations"].append({"id": "999", "name": "New Station", "latitude": "51.5",
+                                 "longitude": "-0.12", "zone": "1"})
+        connections.append({"station1": "60", "station2": "999", "line": "1", "time": "1"})
+        connections.append({"station1": "999", "station2": "245", "line": "1", "time": "1"})
+        self.new_data = data
+
+        self.new_tubemap = TubeMap()
+        self.new_tubemap.import_from_data(self.new_data)
+
+        self.created_files = []
+
+
+    # Remove created files after each test
+    def tearDown(self):
+        for filepath in self.created_files:
+            if os.path.exists(filepath):
+                os.remove(filepath)
+
+
+    @staticmethod
+    def find_connection(connections, first_id, second_id=None):
+        for connection in connections:
+            ids = {connection["station1"], connection["station2"]}
+            if first_id in ids and (second_id is None or second_id in ids):
+                return connection
+        raise AssertionError(f"No connection between {first_id} and {second_id}")
+
+
+    # Structural diff of stations, lines and connections
+    def test_structural_diff(self):
+        diff = NetworkDiff(self.old_tubemap, self.new_tubemap)
+
+        self.assertEqual(diff.added_stations, ["999"])
+        self.assertEqual(diff.removed_stations, [])
+        self.assertEqual(len(diff.added_connections), 2)
+        self.assertEqual(list(diff.removed_connections),
+                         [(tuple(sorted(("107", "192"))), self.removed["line"])])
+        self.assertEqual(len(diff.changed_connections), 2)
+        self.assertFalse(diff.is_empty())
+
+        self.assertTrue(NetworkDiff(self.old_tubemap, self.old_tubemap).is_empty())
+
+
+    # Renamed stations and removed lines
+    def test_renamed_and_removed(self):
+        data = copy.deepcopy(self.data)
+        data["stations"][0]["name"] = "Renamed"
+        line_id = data["lines"][-1]["line"]
+        data["lines"] = data["lines"][:-1]
+        tubemap = TubeMap()
+        tubemap.import_from_data(data)
+
+        diff = NetworkDiff(self.old_tubemap, tubemap)
+        self.assertEqual(list(diff.renamed_stations.values()), [(self.data["stations"][0]["name"], "Renamed")])
+        self.assertEqual(diff.removed_lines, [line_id])
+        # The connections of the removed line are gone too
+        self.assertTrue(diff.removed_connections)
+        self.assertTrue(all(key[1] == line_id for key in diff.removed_connections))
+
+
+    # Every changed travel time is found, as in a full all-pairs comparison
+    def test_against_all_pairs(self):
+        comparison = NetworkComparison(self.old_tubemap, self.new_tubemap)
+        changes = comparison.changed_journeys()
+        found = {(change.start_id, change.end_id): change for change in changes}
+
+        old_finder, new_finder = comparison.old_path_finder, comparison.new_path_finder
+        old_index = old_finder.compact_graph.station_index
+        new_index = new_finder.compact_graph.station_index
+        common = [station_id for station_id in old_index if station_id in new_index]
+
+        expected = {}
+        for origin in common:
+            old_distances = old_finder.engine.search({old_index[origin]: 0}).distances
+            new_distances = new_finder.engine.search({new_index[origin]: 0}).distances
+            for destination in common:
+                old_time = old_distances[old_index[destination]]
+                new_time = new_distances[new_index[destination]]
+                if old_time != new_time:
+                    expected[(origin, destination)] = (old_time, new_time)
+
+        self.assertTrue(expected)
+        time_changes = {pair: (change.old_time, change.new_time) for pair, change in found.items()
+                        if change.old_time != change.new_time}
+        self.assertEqual(time_changes, expected)
+        self.assertEqual(comparison.stats["changed_journeys"], len(changes))
+
+
+    # A local change only searches again from a few origins
+    def test_local_change(self):
+        data = copy.deepcopy(self.data)
+        connection = self.find_connection(data["connections"], "10", "95")
+        connection["time"] = str(int(connection["time"]) + 1)
+        tubemap = TubeMap()
+        tubemap.import_from_data(data)
+
+        comparison = NetworkComparison(self.old_tubemap, tubemap)
+        changes = comparison.changed_journeys()
+        self.assertTrue(changes)
+        self.assertTrue(all(change.delta > 0 for change in changes if change.old_time != change.new_time))
+        # Far fewer searches than two all-pairs runs
+        self.assertLess(comparison.stats["searches"], len(self.old_tubemap.stations) / 2)
+
+
+    # A slower connection costs one search per affected origin, wherever it is
+    def test_search_count(self):
+        count = len(self.old_tubemap.stations)
+        for index in range(0, len(self.data["connections"]), 40):
+            data = copy.deepcopy(self.data)
+            connection = data["connections"][index]
+            connection["time"] = str(int(connection["time"]) + 1)
+            tubemap = TubeMap()
+            tubemap.import_from_data(data)
+
+            comparison = NetworkComparison(self.old_tubemap, tubemap)
+            comparison.changed_journeys()
+            affected = comparison.stats["affected_origins"]
+            # Two searches per end of the connection, then the old tree of
+            # every affected origin, whose new tree is repaired
+            self.assertEqual(comparison.stats["searches"], 4 + affected)
+            self.assertEqual(comparison.stats["repairs"], affected)
+            self.assertLessEqual(comparison.stats["searches"], count + 4)
+
+
+    # Old and new paths are reported
+    def test_paths(self):
+        changes = NetworkComparison(self.old_tubemap, self.new_tubemap).changed_journeys()
+        change = next(change for change in changes if (change.start_id, change.end_id) == ("60", "245"))
+
+        self.assertEqual(change.new_time, 2)
+        self.assertLess(change.delta, 0)
+        self.assertEqual(change.new_route.station_ids, ["60", "999", "245"])
+        self.assertEqual(change.old_route.station_ids[0], "60")
+        self.assertEqual(change.old_route.total_time, change.old_time)
+
+        # Largest change first
+        deltas = [abs(change.delta) for change in changes]
+        self.assertEqual(deltas, sorted(deltas, reverse=True))
+
+
+    # A closure that disconnects stations
+    def test_unreachable(self):
+        data = copy.deepcopy(self.data)
+        station_id = "110"
+        data["connections"] = [connection for connection in data["connections"]
+                               if station_id not in (connection["station1"], connection["station2"])]
+        tubemap = TubeMap()
+        tubemap.import_from_data(data)
+
+        changes = NetworkComparison(self.old_tubemap, tubemap).changed_journeys()
+        unreachable = [change for change in changes if change.start_id == station_id]
+        self.assertEqual(len(unreachable), len(self.old_tubemap.stations) - 1)
+        self.assertTrue(all(change.new_route is None and change.new_time == float('inf')
+                            for change in unreachable))
+
+
+    # Identical versions need no search at all
+    def test_no_change(self):
+        comparison = NetworkComparison(self.old_tubemap, self.old_tubemap)
+        self.assertEqual(comparison.changed_journeys(), [])
+        self.assertEqual(comparison.stats["searches"], 0)
+
+
+    # Both versions can be loaded from files
+    def test_from_files(self):
+        new_filepath = os.path.join(self.data_directory, 'london_new.json')
+        self.create_json_file(new_filepath, self.new_data)
+        self.created_files.append(new_filepath)
+
+        comparison = NetworkComparison.from_files(self.original_json_filepath, new_filepath)
+        self.assertEqual(comparison.diff.added_stations, ["999"])
+        self.assertTrue(comparison.changed_journeys())
+
+
+if __name__ == "__main__":
+    unittest.main()
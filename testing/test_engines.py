@@ -0,0 +1,122 @@
+import unittest
+import os
+import random
+import threading
+from unittest import mock
+from tube.map import TubeMap
+from network.graph import NeighbourGraphBuilder
+from network import engines
+from network.engines import get_engine, CSREngine, PythonEngine, SearchWorkspace
+from network.path import PathFinder
+
+
+class TestEngines(unittest.TestCase):
+
+    # Set up the test case
+    def setUp(self):
+
+        self.tubemap = TubeMap()
+
+        # Define path to the real JSON file
+        self.data_directory = os.path.abspath(os.path.join(os.path.dirname(__file__), 'data'))
+        self.original_json_filepath = os.path.join(self.data_directory, 'london.json')
+        self.tubemap.import_from_json(self.original_json_filepath)
+
+        self.graph = NeighbourGraphBuilder().build_compact(self.tubemap)
+
+
+    # Test the compact graph layout
+    def test_compact_graph(self):
+        self.assertEqual(self.graph.station_count, 302)
+        self.assertEqual(self.graph.arc_count, 2 * 406)
+        self.assertEqual(self.graph.indptr[-1], self.graph.arc_count)
+
+        index = self.graph.station_index['110']  # Hammersmith
+        neighbours = {self.graph.stations[head].id for head, _ in self.graph.neighbours(index)}
+        self.assertEqual(neighbours, {'17', '209', '101', '265'})
+
+
+    # Test that every engine computes the same distances
+    def test_engines_agree(self):
+        sources = [0, 10, 100, 200]
+        expected = PythonEngine(self.graph).one_to_all(sources)
+        for name in engines.ENGINES:
+            engine = get_engine(name, self.graph)
+            rows = engine.one_to_all(sources)
+            self.assertEqual(len(rows), len(sources))
+            for row, expected_row in zip(rows, expected):
+                self.assertEqual(list(row), expected_row, f"Engine {name} disagrees.")
+
+
+    # Test multi-source search with offsets
+    def test_search_with_offsets(self):
+        expected = PythonEngine(self.graph).search({0: 5, 1: 0}, {2: 1, 3: 0})
+        self.assertIn(expected.best_target, (2, 3))
+        self.assertLessEqual(expected.distances[0], 5)
+        for name in engines.ENGINES:
+            result = get_engine(name, self.graph).search({0: 5, 1: 0}, {2: 1, 3: 0})
+            self.assertEqual(result.best_target, expected.best_target)
+            self.assertEqual(result.distances[result.best_target], expected.distances[expected.best_target])
+
+
+    # Test the fallback when SciPy is missing
+    def test_missing_scipy_falls_back(self):
+        with mock.patch.object(engines, "csgraph_dijkstra", None):
+            with self.assertWarns(UserWarning):
+                engine = get_engine("scipy", self.graph)
+        self.assertIsInstance(engine, CSREngine)
+
+
+    # Test an unknown engine name
+    def test_unknown_engine(self):
+        with self.assertRaises(ValueError):
+            get_engine("quantum", self.graph)
+
+
+    # Test that reused workspaces give the results of fresh searches
+    def test_workspace_reuse(self):
+        generator = random.Random(3)
+        workspace = SearchWorkspace(self.graph.station_count)
+        for name in engines.ENGINES:
+            engine = get_engine(name, self.graph)
+            for _ in range(30):
+                start, end = generator.randrange(302), generator.randrange(302)
+                expected = engine.search({start: 0}, {end: 0})
+                result = engine.search({start: 0}, {end: 0}, workspace=workspace)
+                self.assertEqual(result.best_target, expected.best_target)
+                self.assertEqual(result.distances[end], expected.distances[end])
+                self.assertEqual(result.previous[end], expected.previous[end])
+
+        # Only the stations touched by a short search are reset next time
+        engine = CSREngine(self.graph)
+        start = self.graph.station_index['110']  # Hammersmith
+        end = self.graph.station_index['209']  # Ravenscourt Park
+        result = engine.search({start: 0}, {end: 0}, workspace=workspace)
+        self.assertLess(len(set(workspace.touched)), 20)
+        self.assertEqual(sum(distance != float('inf') for distance in result.distances),
+                         len(set(workspace.touched)))
+
+
+    # Test that threads share one PathFinder, each with its own workspace
+    def test_concurrent_queries(self):
+        path_finder = PathFinder(self.tubemap)
+        names = [station.name for station in self.graph.stations]
+        generator = random.Random(5)
+        pairs = [(generator.choice(names), generator.choice(names)) for _ in range(40)]
+        expected = [path_finder.get_shortest_path(start, end).total_time for start, end in pairs]
+
+        results = {}
+        def run(thread):
+            results[thread] = [path_finder.get_shortest_path(start, end).total_time for start, end in pairs]
+        threads = [threading.Thread(target=run, args=(thread,)) for thread in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(list(results.values()), [expected] * 4)
+        self.assertEqual(path_finder.workspaces.created, 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
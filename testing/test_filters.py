@@ -0,0 +1,74 @@
+import unittest
+import os
+from tube.map import TubeMap
+from network.path import PathFinder
+
+
+class TestFilters(unittest.TestCase):
+
+    engine = "python"
+
+    # Set up the test case
+    def setUp(self):
+
+        self.tubemap = TubeMap()
+
+        # Define path to the real JSON file
+        self.data_directory = os.path.abspath(os.path.join(os.path.dirname(__file__), 'data'))
+        self.original_json_filepath = os.path.join(self.data_directory, 'london.json')
+        self.tubemap.import_from_json(self.original_json_filepath)
+
+        self.path_finder = PathFinder(self.tubemap, engine=self.engine)
+
+
+    # Test that excluded lines are avoided
+    def test_excluded_lines(self):
+        route = self.path_finder.get_shortest_path("Green Park", "Oxford Circus")
+        self.assertEqual([line.name for line in route.lines], ["Victoria Line"])
+
+        route = self.path_finder.get_shortest_path("Green Park", "Oxford Circus", excluded_lines=["Victoria Line"])
+        self.assertNotIn("Victoria Line", [line.name for line in route.lines])
+        self.assertEqual(route.names[0], "Green Park")
+        self.assertEqual(route.names[-1], "Oxford Circus")
+
+        # Lines can also be given by id
+        self.assertEqual(route, self.path_finder.get_shortest_path("Green Park", "Oxford Circus", excluded_lines=["11"]))
+
+        # Covent Garden is only served by the Piccadilly Line
+        self.assertIsNone(self.path_finder.get_shortest_path("Covent Garden", "Green Park", excluded_lines=["Piccadilly Line"]))
+
+
+    # Test that excluded stations are avoided
+    def test_excluded_stations(self):
+        route = self.path_finder.get_shortest_path("Covent Garden", "Green Park", excluded_stations=["Leicester Square"])
+        self.assertNotIn("Leicester Square", route.names)
+        self.assertGreater(route.total_time, 4)
+
+        self.assertIsNone(self.path_finder.get_shortest_path("Covent Garden", "Green Park", excluded_stations=["Green Park"]))
+
+
+    # Test that routes stay within the allowed zones
+    def test_allowed_zones(self):
+        route = self.path_finder.get_shortest_path("Morden", "Wembley Central", allowed_zones=[1, 2, 3, 4])
+        for station in route:
+            self.assertTrue(station.zones & {1, 2, 3, 4})
+
+        self.assertIsNone(self.path_finder.get_shortest_path("Morden", "Wembley Central", allowed_zones=[1]))
+        self.assertEqual(self.path_finder.get_shortest_path("Morden", "Morden", allowed_zones=[4]).names, ["Morden"])
+
+
+    # Test that filters leave unfiltered queries untouched
+    def test_no_filter(self):
+        expected = self.path_finder.get_shortest_path("Morden", "Wembley Central")
+        self.assertEqual(self.path_finder.get_shortest_path("Morden", "Wembley Central",
+                                                            excluded_lines=[], excluded_stations=[]), expected)
+        self.assertEqual(self.path_finder.get_shortest_path("Morden", "Wembley Central",
+                                                            allowed_zones=range(1, 10)), expected)
+
+
+class TestFiltersSciPyEngine(TestFilters):
+    engine = "scipy"
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+import unittest
+import os
+import random
+from tube.map import TubeMap
+from network.path import PathFinder
+from network.engines import PythonEngine
+from network.hublabels import HubLabelIndex
+
+
+class TestHubLabels(unittest.TestCase):
+
+    # Set up the test case
+    def setUp(self):
+
+        self.tubemap = TubeMap()
+
+        # Define path to the real JSON file
+        self.data_directory = os.path.abspath(os.path.join(os.path.dirname(__file__), 'data'))
+        self.original_json_filepath = os.path.join(self.data_directory, 'london.json')
+        self.labels_filepath = os.path.join(self.data_directory, 'london_test.labels')
+        self.tubemap.import_from_json(self.original_json_filepath)
+
+        self.path_finder = PathFinder(self.tubemap)
+        self.graph = self.path_finder.compact_graph
+        self.labels = HubLabelIndex(self.graph).build()
+
+
+    # Test travel times against full Dijkstra searches
+    def test_travel_times_match_dijkstra(self):
+        engine = PythonEngine(self.graph)
+        station_ids = [station.id for station in self.graph.stations]
+        rng = random.Random(7)
+        for source in rng.sample(range(self.graph.station_count), 20):
+            distances = engine.search({source: 0}).distances
+            for target in range(self.graph.station_count):
+                self.assertEqual(self.labels.travel_time(station_ids[source], station_ids[target]),
+                                 distances[target])
+
+
+    # Test path recovery from the labels
+    def test_shortest_path(self):
+        route = self.labels.shortest_path('245', '236')  # Stockwell -> South Kensington
+        self.assertEqual(route.names[0], 'Stockwell')
+        self.assertEqual(route.names[-1], 'South Kensington')
+        self.assertEqual(route.total_time, self.path_finder.get_shortest_path('Stockwell', 'South Kensington').total_time)
+
+        # Every leg must be a real connection, and the times must add up
+        total = 0
+        for station1, station2, line in route.legs:
+            connections = self.path_finder.graph[station1.id][station2.id]
+            total += min(conn.time for conn in connections if conn.line is line)
+        self.assertEqual(total, route.total_time)
+
+        self.assertEqual(self.labels.shortest_path('245', '245').names, ['Stockwell'])
+        self.assertIsNone(self.labels.shortest_path('245', 'unknown'))
+
+
+    # Test the PathFinder entry point
+    def test_get_travel_time(self):
+        expected = self.path_finder.get_travel_time("Covent Garden", "Green Park")
+        self.path_finder.build_hub_labels()
+        self.assertEqual(self.path_finder.get_travel_time("Covent Garden", "Green Park"), expected)
+        self.assertIsNone(self.path_finder.get_travel_time("Covent Garden", "Atlantis"))
+
+
+    # Test label statistics
+    def test_statistics(self):
+        statistics = self.labels.statistics()
+        self.assertEqual(statistics["stations"], 302)
+        self.assertGreater(statistics["average_label_size"], 0)
+        self.assertLess(statistics["average_label_size"], statistics["stations"])
+        self.assertGreaterEqual(statistics["max_label_size"], statistics["average_label_size"])
+
+
+    # Test saving and loading the labels
+    def test_serialisation(self):
+        self.path_finder.build_hub_labels(self.labels_filepath)
+        loaded = HubLabelIndex.load(self.labels_filepath, self.graph)
+        self.assertIsNotNone(loaded)
+        self.assertEqual(loaded.travel_time('245', '236'), self.labels.travel_time('245', '236'))
+        self.assertEqual(loaded.shortest_path('245', '236'), self.labels.shortest_path('245', '236'))
+
+        self.assertIsNone(HubLabelIndex.from_bytes(b"garbage", self.graph))
+        self.assertIsNone(HubLabelIndex.from_bytes(self.labels.to_bytes(), PathFinder(TubeMap()).compact_graph))
+
+
+    # Labels saved for another timetable are rebuilt, not reloaded
+    def test_stale_file_rebuilt(self):
+        self.path_finder.build_hub_labels(self.labels_filepath)
+
+        # Stockwell - Vauxhall is on the shortest path to South Kensington
+        changed = TubeMap()
+        changed.import_from_json(self.original_json_filepath)
+        connection = next(connection for connection in changed.connections
+                          if {station.id for station in connection.stations} == {'245', '272'})
+        connection.time += 10
+        path_finder = PathFinder(changed)
+        self.assertNotEqual(path_finder.compact_graph.checksum(), self.graph.checksum())
+        self.assertIsNone(HubLabelIndex.load(self.labels_filepath, path_finder.compact_graph))
+
+        labels = path_finder.build_hub_labels(self.labels_filepath)
+        expected = PythonEngine(path_finder.compact_graph).search({path_finder.compact_graph.station_index['245']: 0})
+        self.assertEqual(labels.travel_time('245', '236'),
+                         expected.distances[path_finder.compact_graph.station_index['236']])
+        self.assertGreater(labels.travel_time('245', '236'), self.labels.travel_time('245', '236'))
+
+
+    # Clean up
+    def tearDown(self):
+        """Clean up by removing test label files."""
+        if os.path.exists(self.labels_filepath):
+            os.remove(self.labels_filepath)
+
+
+if __name__ == '__main__':
+    unittest.main()
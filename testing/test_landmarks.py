@@ -0,0 +1,64 @@
+import unittest
+import os
+import random
+from tube.map import TubeMap
+from network.path import PathFinder
+from network.engines import PythonEngine
+from network.landmarks import LandmarkIndex
+
+
+class TestLandmarks(unittest.TestCase):
+
+    # Set up the test case
+    def setUp(self):
+
+        self.tubemap = TubeMap()
+
+        # Define path to the real JSON file
+        self.data_directory = os.path.abspath(os.path.join(os.path.dirname(__file__), 'data'))
+        self.original_json_filepath = os.path.join(self.data_directory, 'london.json')
+        self.tubemap.import_from_json(self.original_json_filepath)
+
+        self.path_finder = PathFinder(self.tubemap)
+        self.graph = self.path_finder.compact_graph
+
+
+    # Test that ALT finds optimal times with both strategies
+    def test_alt_is_exact(self):
+        engine = PythonEngine(self.graph)
+        rng = random.Random(3)
+        pairs = [(rng.randrange(302), rng.randrange(302)) for _ in range(100)]
+        for strategy in ("farthest", "avoid"):
+            landmarks = LandmarkIndex(self.graph, count=6, strategy=strategy).build()
+            self.assertEqual(len(landmarks.landmarks), 6)
+            self.assertEqual(len(set(landmarks.landmarks)), 6)
+            for source, target in pairs:
+                expected = engine.search({source: 0}, {target: 0})
+                result = landmarks.search(source, target)
+                self.assertEqual(result.distances[target], expected.distances[target])
+
+
+    # Test that the landmark bounds reduce the search space
+    def test_alt_settles_fewer_stations(self):
+        self.path_finder.get_shortest_path("Morden", "Wembley Central")
+        plain = self.path_finder.stats["settled"]
+
+        self.path_finder.build_landmarks(count=8)
+        route = self.path_finder.get_shortest_path("Morden", "Wembley Central")
+        alt = self.path_finder.stats["settled"] - plain
+
+        self.assertEqual(route.names[0], "Morden")
+        self.assertEqual(route.names[-1], "Wembley Central")
+        self.assertLess(alt, plain)
+        self.assertEqual(self.path_finder.stats["landmarks"]["landmarks"], 8)
+        self.assertEqual(self.path_finder.stats["landmarks"]["memory_bytes"], 8 * 302 * 8)
+
+
+    # Test an unknown strategy
+    def test_unknown_strategy(self):
+        with self.assertRaises(ValueError):
+            LandmarkIndex(self.graph, strategy="random")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,168 @@
+import unittest
+import os
+from tube.map import TubeMap
+from tube.synthetic import make_grid_tubemap
+from tube.mapview import MapView, KINDS
+from network.path import PathFinder
+
+
+class RecordingCanvas:
+    """ Stand-in for a tkinter.Canvas, keeping the items it is asked for. """
+
+    def __init__(self, width=600, height=400):
+        self.width = width
+        self.height = height
+        self.items = {}  # key: item id, value: [kind, coordinates, tags, options]
+        self.next_id = 1
+
+    def winfo_width(self):
+        return self.width
+
+    def winfo_height(self):
+        return self.height
+
+    def cget(self, option):
+        return getattr(self, option)
+
+    def create(self, kind, coordinates, options):
+        tags = options.pop("tags", ())
+        self.items[self.next_id] = [kind, list(coordinates), set(tags), options]
+        self.next_id += 1
+
+    def create_line(self, *coordinates, **options):
+        self.create("line", coordinates, options)
+
+    def create_oval(self, *coordinates, **options):
+        self.create("oval", coordinates, options)
+
+    def create_text(self, *coordinates, **options):
+        self.create("text", coordinates, options)
+
+    def find(self, tag):
+        return [item for item in self.items.values() if tag == "all" or tag in item[2]]
+
+    def delete(self, tag):
+        self.items = {key: item for key, item in self.items.items()
+                      if not (tag == "all" or tag in item[2])}
+
+    def itemconfigure(self, tag, **options):
+        for item in self.find(tag):
+            item[3].update(options)
+
+    def move(self, tag, dx, dy):
+        for item in self.find(tag):
+            item[1] = [value + (dx if index % 2 == 0 else dy) for index, value in enumerate(item[1])]
+
+    def scale(self, tag, x, y, x_factor, y_factor):
+        for item in self.find(tag):
+            item[1] = [(x + (value - x) * x_factor) if index % 2 == 0 else (y + (value - y) * y_factor)
+                       for index, value in enumerate(item[1])]
+
+    def tag_raise(self, tag):
+        pass
+
+    def tag_lower(self, tag):
+        pass
+
+    def shown(self, tag):
+        return [item for item in self.find(tag) if item[3].get("state") != "hidden"]
+
+
+class TestMapView(unittest.TestCase):
+
+    # Set up the test case
+    def setUp(self):
+
+        self.tubemap = TubeMap()
+
+        # Define path to the real JSON file
+        self.data_directory = os.path.abspath(os.path.join(os.path.dirname(__file__), 'data'))
+        self.original_json_filepath = os.path.join(self.data_directory, 'london.json')
+        self.tubemap.import_from_json(self.original_json_filepath)
+
+        self.canvas = RecordingCanvas()
+        self.view = MapView(self.canvas, self.tubemap)
+
+
+    def assertOnScreen(self, view, station_id, x, y):
+        expected = view.to_screen(*view.layers.points[station_id])
+        self.assertAlmostEqual(x, expected[0], places=6)
+        self.assertAlmostEqual(y, expected[1], places=6)
+
+
+    # Line colours are read from the JSON file
+    def test_line_colours(self):
+        self.assertEqual(self.tubemap.line_colours["1"], "#AE6017")  # Bakerloo Line
+        self.assertEqual(len(self.tubemap.line_colours), len(self.tubemap.lines))
+        segments = [item for tile in self.view.layers.tiles.values() for item in tile.get("segment", [])]
+        self.assertEqual(len(segments), len(self.tubemap.connections))
+        self.assertIn("#AE6017", {segment[4] for segment in segments})
+
+
+    # The whole map fits the canvas, and zooming in shows the stations
+    def test_fit_and_levels_of_detail(self):
+        self.view.fit()
+        self.assertEqual(len(self.canvas.find("segment")), len(self.tubemap.connections))
+        for _, coordinates, _, _ in self.canvas.find("segment"):
+            for index, value in enumerate(coordinates):
+                self.assertGreaterEqual(value, 0)
+                self.assertLessEqual(value, self.canvas.width if index % 2 == 0 else self.canvas.height)
+        self.assertEqual(self.canvas.find("label"), [])
+
+        # Zoom on Covent Garden until every kind is drawn
+        x, y = self.view.to_screen(*self.view.layers.points["60"])
+        while len(self.view.visible_kinds()) < len(KINDS):
+            self.view.zoom(2, x, y)
+        self.assertOnScreen(self.view, "60", x, y)
+        labels = self.canvas.shown("label")
+        self.assertIn("Covent Garden", [item[3]["text"] for item in labels])
+        self.assertLess(len(labels), len(self.tubemap.stations))
+
+        # Scaled segments stay on their stations
+        for _, coordinates, _, options in self.canvas.shown("segment")[:20]:
+            x1, y1 = self.view.to_world(*coordinates[:2])
+            x2, y2 = self.view.to_world(*coordinates[2:])
+            self.assertTrue(any(abs(x1 - px) < 1e-3 and abs(y1 - py) < 1e-3
+                                for px, py in self.view.layers.points.values()))
+
+        # Far tiles are hidden, not redrawn
+        drawn = self.view.stats["items_drawn"]
+        self.view.pan(-5000, 0)
+        self.view.pan(5000, 0)
+        self.assertEqual(self.view.stats["items_drawn"], drawn)
+        self.assertOnScreen(self.view, "60", x, y)
+
+
+    # A route only replaces the overlay
+    def test_route_overlay(self):
+        path_finder = PathFinder(self.tubemap)
+        self.view.fit()
+        items = len(self.canvas.items)
+
+        route = path_finder.get_shortest_path("Stockwell", "Hammersmith")
+        count = self.view.show_route(route)
+        self.assertEqual(count, 2 * len(set(line.id for line in route.lines)) + 2)
+        self.assertEqual(len(self.canvas.items), items + count)
+        polyline = self.canvas.find("route")[0]
+        self.assertOnScreen(self.view, "245", *polyline[1][:2])  # Stockwell
+
+        self.view.show_route(path_finder.get_shortest_path("Green Park", "Oxford Circus"))
+        self.assertEqual(len(self.canvas.items), items + 4)
+        self.view.pan(10, 10)
+        self.view.zoom(1.5, 300, 200)
+        self.assertEqual(len(self.canvas.find("route")), 4)
+        self.view.clear_route()
+        self.assertEqual(self.canvas.find("route"), [])
+
+
+    # On a large network, a zoomed-in view only draws what it shows
+    def test_culling(self):
+        view = MapView(RecordingCanvas(), make_grid_tubemap(60, 60), tiles=16)
+        view.fit()
+        self.assertEqual(view.visible_kinds(), ["segment"])
+        view.zoom(8, 300, 200)
+        view.zoom(8, 300, 200)
+        self.assertEqual(view.visible_kinds(), list(KINDS))
+        stations = view.stats["items_drawn"] - 2 * 60 * 59
+        self.assertGreater(stations, 0)
+        self.assertLess(stations, 60 * 60 / 4)
@@ -0,0 +1,82 @@
+import unittest
+import os
+from unittest import mock
+from tube.map import TubeMap
+from network.path import PathFinder
+from network import meeting
+
+
+class TestMeeting(unittest.TestCase):
+
+    engine = "python"
+
+    # Set up the test case
+    def setUp(self):
+
+        self.tubemap = TubeMap()
+
+        # Define path to the real JSON file
+        self.data_directory = os.path.abspath(os.path.join(os.path.dirname(__file__), 'data'))
+        self.original_json_filepath = os.path.join(self.data_directory, 'london.json')
+        self.tubemap.import_from_json(self.original_json_filepath)
+
+        self.path_finder = PathFinder(self.tubemap, engine=self.engine)
+        self.origins = ["Morden", "Wembley Central", "Stratford", "Acton Town"]
+
+
+    # Test that the early-stopping search agrees with the full batch
+    def test_early_stop_matches_batch(self):
+        for objective in ("max", "sum"):
+            batch = self.path_finder.get_meeting_points(self.origins, k=5, objective=objective, early_stop=False)
+            early = self.path_finder.get_meeting_points(self.origins, k=5, objective=objective)
+            self.assertEqual(len(batch), 5)
+            self.assertEqual([score for _, score, _ in early], [score for _, score, _ in batch])
+
+            # The score is made of the real travel times
+            station, score, times = early[0]
+            expected = [self.path_finder.get_shortest_path(origin, station.name).total_time
+                        for origin in self.origins]
+            self.assertEqual(times, expected)
+            self.assertEqual(score, max(expected) if objective == "max" else sum(expected))
+
+
+    # Test the pure-Python merge used without NumPy
+    def test_batch_without_numpy(self):
+        expected = self.path_finder.get_meeting_points(self.origins, k=3, objective="sum", early_stop=False)
+        with mock.patch.object(meeting, "np", None):
+            result = self.path_finder.get_meeting_points(self.origins, k=3, objective="sum", early_stop=False)
+        self.assertEqual([score for _, score, _ in result], [score for _, score, _ in expected])
+
+
+    # Test the edge cases
+    def test_invalid_input(self):
+        self.assertIsNone(self.path_finder.get_meeting_points(["Morden", "Atlantis"]))
+        self.assertEqual(self.path_finder.get_meeting_points([]), [])
+        with self.assertRaises(ValueError):
+            self.path_finder.get_meeting_points(self.origins, objective="median")
+
+        station, score, times = self.path_finder.get_meeting_points(["Morden"], k=1)[0]
+        self.assertEqual((station.name, score, times), ("Morden", 0, [0]))
+
+
+    # Disabled stations are neither meeting points nor crossed
+    def test_closures(self):
+        self.path_finder.disable_station("Green Park")
+        self.path_finder.disable_connection("Oxford Circus", "Warren Street")
+        for objective in ("max", "sum"):
+            expected = self.path_finder.get_meeting_points(self.origins, k=5, objective=objective, early_stop=False)
+            best = self.path_finder.get_meeting_points(self.origins, k=5, objective=objective)
+            self.assertEqual([score for _, score, _ in best], [score for _, score, _ in expected])
+            for station, score, times in best:
+                self.assertNotEqual(station.name, "Green Park")
+                for origin, time in zip(self.origins, times):
+                    self.assertEqual(time, self.path_finder.get_shortest_path(origin, station.name).total_time)
+        self.assertIsNone(self.path_finder.get_meeting_points(["Green Park", "Stockwell"]))
+
+
+class TestMeetingSciPyEngine(TestMeeting):
+    engine = "scipy"
+
+
+if __name__ == '__main__':
+    unittest.main()
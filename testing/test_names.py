@@ -0,0 +1,117 @@
+import unittest
+import os
+import time
+from tube.map import TubeMap
+from tube.names import NameIndex, normalise_name, edit_distance
+
+
+class TestNameIndex(unittest.TestCase):
+
+    # Set up the test case
+    def setUp(self):
+
+        self.tubemap = TubeMap()
+
+        # Define path to the real JSON file
+        self.data_directory = os.path.abspath(os.path.join(os.path.dirname(__file__), 'data'))
+        self.original_json_filepath = os.path.join(self.data_directory, 'london.json')
+        self.tubemap.import_from_json(self.original_json_filepath)
+
+        self.name_index = self.tubemap.name_index
+
+
+    # Test the normalisation of the names
+    def test_normalise_name(self):
+        self.assertEqual(normalise_name("St. John's Wood"), "st johns wood")
+        self.assertEqual(normalise_name("  st johns   WOOD "), "st johns wood")
+        self.assertEqual(normalise_name("Elephant & Castle"), "elephant and castle")
+        self.assertEqual(edit_distance("picadilly", "piccadilly"), 1)
+        self.assertEqual(edit_distance("", "abc"), 3)
+
+
+    # The index is built at import
+    def test_built_at_import(self):
+        names = {station.name for station in self.tubemap.stations.values()}
+        self.assertEqual(len(self.name_index), len({normalise_name(name) for name in names}))
+
+
+    # Test completion of partial and misspelt names
+    def test_suggest(self):
+        self.assertEqual(self.name_index.suggest("Kings Cros")[0], "King's Cross St. Pancras")
+        self.assertEqual(self.name_index.suggest("Picadilly Circus")[0], "Piccadilly Circus")
+        self.assertEqual(self.name_index.suggest("picadilly cir")[0], "Piccadilly Circus")
+        self.assertEqual(self.name_index.suggest("st johns wood"), ["St. John's Wood"])
+        self.assertEqual(self.name_index.suggest("Nowhere"), [])
+        self.assertEqual(self.name_index.suggest(""), [])
+
+        # Exact completions before typos, names starting with the query first
+        suggestions = self.name_index.suggest("Wimbeldon")
+        self.assertEqual(suggestions[0], "Wimbledon")
+        self.assertLess(suggestions.index("Wimbledon Park"), suggestions.index("South Wimbledon"))
+
+        # Later words complete too
+        self.assertIn("Charing Cross", self.name_index.suggest("cross", limit=10))
+        self.assertEqual(len(self.name_index.suggest("b", limit=3)), 3)
+
+
+    # Test resolution of complete names
+    def test_resolve(self):
+        self.assertEqual(self.name_index.resolve("Green Park"), "Green Park")
+        self.assertEqual(self.name_index.resolve("green park"), "Green Park")
+        self.assertEqual(self.name_index.resolve("Picadilly Circus"), "Piccadilly Circus")
+        self.assertEqual(self.name_index.resolve("Elephant and Castle"), "Elephant & Castle")
+        self.assertIsNone(self.name_index.resolve("Nowhere"))
+        # Partial names are completed when one completion is clearly best
+        self.assertEqual(self.name_index.resolve("Kings Cros"), "King's Cross St. Pancras")
+        self.assertEqual(self.name_index.resolve("Totenham Court"), "Tottenham Court Road")
+        self.assertEqual(self.name_index.resolve("Piccadily"), "Piccadilly Circus")
+        self.assertEqual(self.name_index.resolve("walthamstow"), "Walthamstow Central")
+        self.assertEqual(self.name_index.resolve("Hammer"), "Hammersmith")
+        self.assertIsNone(self.name_index.resolve("b"))
+        self.assertIsNone(self.name_index.resolve("Kings"))  # Kingsbury or King's Cross
+        self.assertIsNone(self.name_index.resolve("cross"))
+
+        self.assertEqual(self.name_index.lookup("Wimbeldon"), [(2, "wimbledon")])
+
+
+    # Trigram filtering never loses a match
+    def test_lookup_against_brute_force(self):
+        queries = ["Picadilly Circus", "Oxfrd Circus", "Wimbeldon", "Bakr Street", "Stockwel", "Bank"]
+        for query in queries:
+            expected = sorted((edit_distance(normalise_name(query), key), key) for key in self.name_index.names
+                              if edit_distance(normalise_name(query), key) <= 2)
+            self.assertEqual(sorted(self.name_index.lookup(query, max_distance=2)), expected)
+
+
+    # Duplicate and rebuilt names
+    def test_build(self):
+        name_index = NameIndex()
+        name_index.build(["Bank", "Bank", "BANK", "Baker Street"])
+        self.assertEqual(len(name_index), 2)
+        self.assertEqual(name_index.suggest("bank")[:2], ["Bank", "BANK"])
+        # Ambiguous names are not resolved
+        self.assertEqual(name_index.resolve("BANK"), "BANK")
+        self.assertIsNone(name_index.resolve("bank"))
+        name_index.build(["Bank", "Bark", "Baker Street"])
+        self.assertIsNone(name_index.resolve("Bak"))
+        self.assertEqual(name_index.resolve("Bankk"), "Bank")
+
+        name_index.build(["Oval"])
+        self.assertEqual(name_index.suggest("ba"), [])
+        self.assertEqual(name_index.resolve("ovl"), "Oval")
+
+
+    # Suggestions are fast enough to run on every key stroke
+    def test_performance(self):
+        queries = ["K", "Kings Cros", "Picadilly Circus", "st johns wood", "Wimbeldon", "ba"]
+        start = time.perf_counter()
+        for _ in range(20):
+            for query in queries:
+                self.name_index.suggest(query)
+                self.name_index.resolve(query)
+        elapsed = (time.perf_counter() - start) / (20 * len(queries))
+        self.assertLess(elapsed, 0.005)
+
+
+if __name__ == "__main__":
+    unittest.main()
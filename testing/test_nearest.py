@@ -0,0 +1,76 @@
+import unittest
+import os
+from tube.map import TubeMap
+from network.path import PathFinder
+
+
+class TestNearest(unittest.TestCase):
+
+    engine = "python"
+
+    # Set up the test case
+    def setUp(self):
+
+        self.tubemap = TubeMap()
+
+        # Define path to the real JSON file
+        self.data_directory = os.path.abspath(os.path.join(os.path.dirname(__file__), 'data'))
+        self.original_json_filepath = os.path.join(self.data_directory, 'london.json')
+        self.tubemap.import_from_json(self.original_json_filepath)
+
+        self.path_finder = PathFinder(self.tubemap, engine=self.engine)
+        self.targets = ["Morden", "Wembley Central", "Green Park", "Stratford"]
+
+
+    # Test the nearest targets against one search per pair
+    def test_nearest_targets_match_pairwise(self):
+        nearest = self.path_finder.get_nearest_targets(self.targets + ["Atlantis"])
+        self.assertEqual(len(nearest), 302)
+
+        for station_id in ("236", "245", "110", "11"):
+            station = self.tubemap.stations[station_id]
+            times = [self.path_finder.get_shortest_path(station.name, target).total_time
+                     for target in self.targets]
+            target, time = nearest[station_id]
+            self.assertEqual(time, min(times))
+            self.assertEqual(time, self.path_finder.get_shortest_path(station.name, target.name).total_time)
+
+        # Targets are their own nearest target
+        green_park = self.path_finder.find_station_by_name("Green Park")
+        self.assertEqual(nearest[green_park.id], (green_park, 0))
+
+
+    # Test the path to the nearest target
+    def test_path_to_nearest(self):
+        route = self.path_finder.get_shortest_path_to_nearest("Covent Garden", self.targets)
+        self.assertEqual(route.names[-1], "Green Park")
+        self.assertEqual(route.total_time, self.path_finder.get_shortest_path("Covent Garden", "Green Park").total_time)
+
+        self.assertIsNone(self.path_finder.get_shortest_path_to_nearest("Covent Garden", ["Atlantis"]))
+        self.assertEqual(self.path_finder.get_nearest_targets([]), {})
+
+
+    # Disabled stations are neither targets nor crossed
+    def test_closures(self):
+        self.path_finder.disable_station("Green Park")
+        nearest = self.path_finder.get_nearest_targets(self.targets)
+        green_park = self.path_finder.find_station_by_name("Green Park")
+        self.assertNotIn(green_park.id, nearest)
+        self.assertNotIn("Green Park", [target.name for target, _ in nearest.values()])
+
+        route = self.path_finder.get_shortest_path_to_nearest("Covent Garden", self.targets)
+        self.assertNotIn("Green Park", route.names)
+        self.assertEqual(route.total_time,
+                         self.path_finder.get_shortest_path("Covent Garden", route.names[-1]).total_time)
+        self.assertEqual(nearest[route.station_ids[0]], (self.path_finder.find_station_by_name(route.names[-1]),
+                                                        route.total_time))
+        self.assertIsNone(self.path_finder.get_shortest_path_to_nearest("Green Park", self.targets))
+        self.assertIsNone(self.path_finder.get_shortest_path_to_nearest("Covent Garden", ["Green Park"]))
+
+
+class TestNearestSciPyEngine(TestNearest):
+    engine = "scipy"
+
+
+if __name__ == '__main__':
+    unittest.main()
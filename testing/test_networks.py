@@ -0,0 +1,145 @@
+import unittest
+import os
+import json
+from tube.map import TubeMap, INTERCHANGE_LINE_ID
+from network.path import PathFinder
+
+
+class TestNetworks(unittest.TestCase):
+
+    def create_json_file(self, filepath, data):
+        with open(filepath, 'w') as f:
+            json.dump(data, f)
+
+
+    # Set up the test case
+    def setUp(self):
+
+        self.tubemap = TubeMap()
+
+        # Two networks using the same ids and a shared station name
+        self.data_directory = os.path.abspath(os.path.join(os.path.dirname(__file__), 'data'))
+        self.network_a_filepath = os.path.join(self.data_directory, 'network_a.json')
+        self.network_b_filepath = os.path.join(self.data_directory, 'network_b.json')
+        self.interchanges_filepath = os.path.join(self.data_directory, 'interchanges.json')
+
+        self.create_json_file(self.network_a_filepath, {
+            "stations": [
+                {"id": "1", "name": "Bank", "zone": "1"},
+                {"id": "2", "name": "Station A2", "zone": "1"}
+            ],
+            "lines": [
+                {"line": "1", "name": "Line A"}
+            ],
+            "connections": [
+                {"station1": "1", "station2": "2", "line": "1", "time": "3"}
+            ]
+        })
+        self.create_json_file(self.network_b_filepath, {
+            "stations": [
+                {"id": "1", "name": "Bank", "zone": "1"},
+                {"id": "2", "name": "Station B2", "zone": "2"}
+            ],
+            "lines": [
+                {"line": "1", "name": "Line B"}
+            ],
+            "connections": [
+                {"station1": "1", "station2": "2", "line": "1", "time": "4"}
+            ]
+        })
+        self.create_json_file(self.interchanges_filepath, {
+            "interchanges": [
+                {"station1": "a:1", "station2": "b:1", "time": "2"},
+                {"station1": "a:1", "station2": "c:9", "time": "2"}
+            ]
+        })
+
+
+    # Test that colliding ids are namespaced
+    def test_namespaced_import(self):
+        self.tubemap.import_networks({"a": self.network_a_filepath, "b": self.network_b_filepath})
+
+        self.assertEqual(sorted(self.tubemap.stations), ["a:1", "a:2", "b:1", "b:2"])
+        self.assertEqual(sorted(self.tubemap.lines), ["a:1", "b:1"])
+        self.assertEqual(len(self.tubemap.connections), 2)
+        self.assertEqual(self.tubemap.networks, {"a": self.network_a_filepath, "b": self.network_b_filepath})
+
+        # Shared names are stored once
+        self.assertIs(self.tubemap.stations["a:1"].name, self.tubemap.stations["b:1"].name)
+
+
+    # Test routing across networks through an interchange
+    def test_route_across_networks(self):
+        self.tubemap.import_networks({"a": self.network_a_filepath, "b": self.network_b_filepath},
+                                     self.interchanges_filepath)
+
+        # The link to an unknown station is ignored
+        self.assertEqual(len(self.tubemap.connections), 3)
+        self.assertIn(INTERCHANGE_LINE_ID, self.tubemap.lines)
+        # The topology knows about the interchange
+        self.assertEqual(sorted(self.tubemap.topology.lines_at("a:1")), ["a:1", INTERCHANGE_LINE_ID])
+        self.assertEqual(self.tubemap.topology.get("Interchange").termini, ["a:1", "b:1"])
+
+        path_finder = PathFinder(self.tubemap)
+        route = path_finder.get_shortest_path("Station A2", "Station B2")
+        self.assertEqual(route.station_ids, ["a:2", "a:1", "b:1", "b:2"])
+        self.assertEqual(route.total_time, 9)
+        self.assertEqual([line.name for line in route.lines], ["Line A", "Interchange", "Line B"])
+
+
+    # Test that networks stay disconnected without interchanges
+    def test_no_interchange(self):
+        self.tubemap.import_networks({"a": self.network_a_filepath, "b": self.network_b_filepath})
+        path_finder = PathFinder(self.tubemap)
+        self.assertIsNone(path_finder.get_shortest_path("Station A2", "Station B2"))
+        self.assertIsNone(self.tubemap.add_interchange("a:1", "z:1", 1))
+        self.assertEqual(self.tubemap.topology.lines_at("a:2"), ["a:1"])
+        self.tubemap.add_interchange("a:2", "b:2", 1)
+        self.assertEqual(self.tubemap.topology.lines_at("a:2"), ["a:1", INTERCHANGE_LINE_ID])
+        route = PathFinder(self.tubemap).get_shortest_path("Station A2", "Station B2")
+        self.assertEqual(route.station_ids, ["a:2", "b:2"])
+
+
+    # Test that bad interchange entries are skipped
+    def test_invalid_interchanges(self):
+        self.tubemap.import_networks({"a": self.network_a_filepath, "b": self.network_b_filepath})
+        self.create_json_file(self.interchanges_filepath, {
+            "interchanges": [
+                {"station1": "a:1", "station2": "b:1", "time": "soon"},
+                {"station1": "a:1", "station2": "b:1", "time": None},
+                {"station1": "a:1", "station2": "b:1", "time": -2},
+                "a:1 - b:1",
+                {"station1": "a:2", "station2": "b:2", "time": "5"}
+            ]
+        })
+        self.tubemap.import_interchanges_from_json(self.interchanges_filepath)
+        self.assertEqual(len(self.tubemap.connections), 3)
+        self.assertEqual(self.tubemap.connections[-1].time, 5)
+
+
+    # Test that a name shared by two networks needs a namespace
+    def test_shared_names(self):
+        self.tubemap.import_networks({"a": self.network_a_filepath, "b": self.network_b_filepath},
+                                     self.interchanges_filepath)
+        self.assertEqual([station.id for station in self.tubemap.find_stations_by_name("Bank")], ["a:1", "b:1"])
+        self.assertEqual([station.id for station in self.tubemap.find_stations_by_name("b:Bank")], ["b:1"])
+        self.assertEqual(self.tubemap.find_stations_by_name("c:Bank"), [])
+
+        path_finder = PathFinder(self.tubemap)
+        self.assertIsNone(path_finder.find_station_by_name("Bank"))
+        self.assertIsNone(path_finder.get_shortest_path("Bank", "Station B2"))
+        route = path_finder.get_shortest_path("a:Bank", "Station B2")
+        self.assertEqual(route.station_ids, ["a:1", "b:1", "b:2"])
+        self.assertEqual(path_finder.get_shortest_path("b:Bank", "Station B2").station_ids, ["b:1", "b:2"])
+
+
+    # Clean up
+    def tearDown(self):
+        """Clean up by removing test JSON files."""
+        for filepath in (self.network_a_filepath, self.network_b_filepath, self.interchanges_filepath):
+            if os.path.exists(filepath):
+                os.remove(filepath)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -7,6 +7,9 @@ from network.path import PathFinder
 
 class TestPath(unittest.TestCase):
 
+    # Routing engine under test (see network.engines)
+    engine = "python"
+
     def create_json_file(self, filepath, data):
         with open(filepath, 'w') as f:
             json.dump(data, f)
@@ -88,7 +91,7 @@ class TestPath(unittest.TestCase):
     # Test valid JSON file
     def test_valid_shortest_path(self):
         self.tubemap.import_from_json(self.valid_json_filepath)
-        path_finder = PathFinder(self.tubemap)
+        path_finder = PathFinder(self.tubemap, engine=self.engine)
         stations = path_finder.get_shortest_path("Covent Garden", "Green Park")
         station_names = [station.name for station in stations]
         self.assertEqual(station_names, ['Covent Garden', 'Leicester Square', 'Piccadilly Circus', 'Green Park'])
@@ -115,49 +118,49 @@ class TestPath(unittest.TestCase):
     # Test invalid JSON file
     def test_invalid_json(self):
         self.tubemap.import_from_json(self.invalid_json_filepath)
-        path_finder = PathFinder(self.tubemap)
+        path_finder = PathFinder(self.tubemap, engine=self.engine)
         stations = path_finder.get_shortest_path("Covent Garden", "Green Park")
         self.assertIsNone(stations)
 
     # Test empty JSON file
     def test_empty_json(self):
         self.tubemap.import_from_json(self.empty_json_filepath)
-        path_finder = PathFinder(self.tubemap)
+        path_finder = PathFinder(self.tubemap, engine=self.engine)
         stations = path_finder.get_shortest_path("Covent Garden", "Green Park")
         self.assertIsNone(stations)
 
     # Test incorrect JSON file
     def test_incorrect_json(self):
         self.tubemap.import_from_json(self.incorrect_json_filepath)
-        path_finder = PathFinder(self.tubemap)
+        path_finder = PathFinder(self.tubemap, engine=self.engine)
         stations = path_finder.get_shortest_path("Covent Garden", "Green Park")
         self.assertIsNone(stations)
 
     # Test missing lines JSON file
     def test_missing_lines_json(self):
         self.tubemap.import_from_json(self.missing_lines_filepath)
-        path_finder = PathFinder(self.tubemap)
+        path_finder = PathFinder(self.tubemap, engine=self.engine)
         stations = path_finder.get_shortest_path("Station A", "Station B")
         self.assertIsNone(stations)
 
     # Test missing stations JSON file
     def test_missing_stations_json(self):
         self.tubemap.import_from_json(self.missing_stations_filepath)
-        path_finder = PathFinder(self.tubemap)
+        path_finder = PathFinder(self.tubemap, engine=self.engine)
         stations = path_finder.get_shortest_path("Station A", "Station B")
         self.assertIsNone(stations)
 
     # Test missing connections JSON file
     def test_missing_connections_json(self):
         self.tubemap.import_from_json(self.missing_connections_filepath)
-        path_finder = PathFinder(self.tubemap)
+        path_finder = PathFinder(self.tubemap, engine=self.engine)
         stations = path_finder.get_shortest_path("Station A", "Station B")
         self.assertIsNone(stations)
 
     # Test missing two JSON file
     def test_missing_two_json(self):
         self.tubemap.import_from_json(self.missing_two_filepath)
-        path_finder = PathFinder(self.tubemap)
+        path_finder = PathFinder(self.tubemap, engine=self.engine)
         stations = path_finder.get_shortest_path("Station A", "Station B")
         self.assertIsNone(stations)
 
@@ -194,5 +197,18 @@ class TestPath(unittest.TestCase):
             os.remove(self.missing_two_filepath)
 
 
+# Every routing engine must pass the same correctness suite
+class TestPathCSREngine(TestPath):
+    engine = "csr"
+
+
+class TestPathSciPyEngine(TestPath):
+    engine = "scipy"
+
+
+class TestPathChainsEngine(TestPath):
+    engine = "chains"
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,115 @@
+import unittest
+import os
+import random
+from tube.map import TubeMap
+from network.path import PathFinder
+from network.popularity import PopularityStore, TreeCache
+from network.workload import cache_hit_rates
+
+
+class TestPopularity(unittest.TestCase):
+
+    # Set up the test case
+    def setUp(self):
+
+        self.tubemap = TubeMap()
+
+        # Define path to the real JSON file
+        self.data_directory = os.path.abspath(os.path.join(os.path.dirname(__file__), 'data'))
+        self.original_json_filepath = os.path.join(self.data_directory, 'london.json')
+        self.tubemap.import_from_json(self.original_json_filepath)
+
+        self.popularity_filepath = os.path.join(self.data_directory, 'popularity.db')
+
+
+    # Remove created files after each test
+    def tearDown(self):
+        if os.path.exists(self.popularity_filepath):
+            os.remove(self.popularity_filepath)
+
+
+    # Counts are persisted and ranked
+    def test_store(self):
+        with PopularityStore(self.popularity_filepath, flush_every=3) as store:
+            for origin, destination in [("245", "110"), ("245", "236"), ("107", "192"),
+                                        ("245", "110"), ("60", "107")]:
+                store.record(origin, destination)
+
+        with PopularityStore(self.popularity_filepath) as store:
+            store.record("107", "245")
+            self.assertEqual(store.top_origins(2), [("245", 3), ("107", 2)])
+            self.assertEqual(store.top_pairs(1), [("245", "110", 2)])
+            self.assertEqual(len(store.top_origins(10)), 3)
+        # Closed stores ignore further queries
+        store.record("245", "110")
+        self.assertEqual(store.top_origins(1), [])
+
+
+    # The least recently used tree is evicted
+    def test_tree_cache(self):
+        cache = TreeCache(size=2)
+        cache.put(1, "one")
+        cache.put(2, "two")
+        self.assertEqual(cache.get(1), "one")
+        cache.put(3, "three")
+        self.assertNotIn(2, cache)
+        self.assertIn(1, cache)
+        self.assertEqual(len(cache), 2)
+        cache.clear()
+        self.assertIsNone(cache.get(1))
+
+
+    # A restarted PathFinder warms up from the popularity of the previous one
+    def test_warm_up(self):
+        reference = PathFinder(self.tubemap)
+        path_finder = PathFinder(self.tubemap)
+        self.assertIsNone(path_finder.warm_up(self.popularity_filepath, background=False, min_queries=15))
+        self.assertEqual(path_finder.stats["warmup_origins"], 0)
+
+        names = [station.name for station in path_finder.station_list]
+        generator = random.Random(3)
+        queries = [("Stockwell", generator.choice(names)) for _ in range(20)]
+        queries += [("Green Park", generator.choice(names)) for _ in range(10)]
+        queries += [(generator.choice(names), "Covent Garden") for _ in range(5)]
+        for start, end in queries:
+            route = path_finder.get_shortest_path(start, end)
+            self.assertEqual(route.names, reference.get_shortest_path(start, end).names)
+        # Only Stockwell was queried often enough to get its tree
+        graph = path_finder.compact_graph
+        self.assertEqual(len(path_finder.tree_cache), 1)
+        self.assertIn(graph.station_index["245"], path_finder.tree_cache)
+        self.assertEqual(path_finder.stats["queries"], len(queries))
+        self.assertEqual(path_finder.stats["tree_cache_hits"], 5)
+        self.assertEqual(path_finder.stats["tree_cache_misses"], len(queries) - 5)
+        path_finder.popularity.close()
+
+        restarted = PathFinder(self.tubemap)
+        thread = restarted.warm_up(self.popularity_filepath, top=2)
+        thread.join()
+        self.assertEqual(restarted.stats["warmup_origins"], 2)
+        self.assertEqual(restarted.stats["warmup_done"], 2)
+        self.assertGreater(restarted.stats["warmup_seconds"], 0)
+
+        before = dict(restarted.stats)
+        for start, end in queries[:30]:
+            route = restarted.get_shortest_path(start, end)
+            self.assertEqual(route.names, reference.get_shortest_path(start, end).names)
+            self.assertEqual(route.total_time, reference.get_shortest_path(start, end).total_time)
+        self.assertEqual(cache_hit_rates(before, restarted.stats)["tree_cache"], (30, 0, 1.0))
+        self.assertEqual(restarted.stats["queries"] - before["queries"], 30)
+
+        # Other origins are searched as usual, without building a tree
+        restarted.get_shortest_path("Hammersmith", "Ravenscourt Park")
+        self.assertEqual(len(restarted.tree_cache), 2)
+        self.assertEqual(restarted.stats["tree_cache_misses"], 1)
+
+        # Restricted queries do not use the trees
+        route = restarted.get_shortest_path("Green Park", "Oxford Circus", excluded_lines=["Victoria Line"])
+        self.assertNotIn("Victoria Line", [line.name for line in route.lines])
+        restarted.disable_station("Victoria")
+        self.assertNotIn("Victoria", restarted.get_shortest_path("Stockwell", "South Kensington").names)
+        restarted.popularity.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+import unittest
+import os
+import json
+import datetime
+from tube.map import TubeMap
+from tube.profiles import parse_minutes
+from network.path import PathFinder
+
+
+class TestProfiles(unittest.TestCase):
+
+    def create_json_file(self, filepath, data):
+        with open(filepath, 'w') as f:
+            json.dump(data, f)
+
+
+    # Set up the test case
+    def setUp(self):
+
+        self.tubemap = TubeMap()
+
+        # Define paths to the real JSON file and to the profiles
+        self.data_directory = os.path.abspath(os.path.join(os.path.dirname(__file__), 'data'))
+        self.original_json_filepath = os.path.join(self.data_directory, 'london.json')
+        self.profiles_filepath = os.path.join(self.data_directory, 'profiles.json')
+
+        self.create_json_file(self.profiles_filepath, {
+            "buckets": [
+                {"name": "am_peak", "start": "07:00", "end": "10:00"},
+                {"name": "night", "start": "22:00", "end": "05:00"},
+                {"name": "broken", "start": "later"}
+            ],
+            "lines": {
+                "11": {"am_peak": 10}
+            },
+            "connections": [
+                # Green Park <-> Oxford Circus, Victoria Line
+                {"station1": "107", "station2": "192", "line": "11", "bucket": "night", "time": "0.5"}
+            ]
+        })
+
+        self.tubemap.import_from_json(self.original_json_filepath)
+        self.tubemap.import_profiles_from_json(self.profiles_filepath)
+        self.path_finder = PathFinder(self.tubemap)
+
+
+    # Test the bucket lookup
+    def test_find_bucket(self):
+        profiles = self.tubemap.profiles
+        self.assertEqual(profiles.bucket_names, ["am_peak", "night"])
+        self.assertEqual(profiles.find_bucket("08:30"), "am_peak")
+        self.assertEqual(profiles.find_bucket(datetime.time(23, 15)), "night")
+        self.assertEqual(profiles.find_bucket(datetime.datetime(2024, 1, 1, 4, 59)), "night")
+        self.assertIsNone(profiles.find_bucket(12 * 60))
+        with self.assertRaises(ValueError):
+            parse_minutes("noon")
+
+
+    # Test routing with the weights of every bucket
+    def test_departure_time(self):
+        static = self.path_finder.get_shortest_path("Green Park", "Oxford Circus")
+        self.assertEqual(static.names, ["Green Park", "Oxford Circus"])
+
+        # Outside of any bucket, the scheduled times are used
+        self.assertEqual(self.path_finder.get_shortest_path("Green Park", "Oxford Circus", departure_time="12:00"), static)
+
+        # The Victoria Line is ten times slower during the morning peak
+        peak = self.path_finder.get_shortest_path("Green Park", "Oxford Circus", departure_time="08:00")
+        self.assertNotIn("Victoria Line", [line.name for line in peak.lines])
+        self.assertGreater(peak.total_time, static.total_time)
+
+        # The overridden connection is faster at night
+        night = self.path_finder.get_shortest_path("Green Park", "Oxford Circus", departure_time="23:00")
+        self.assertEqual(night.names, static.names)
+        self.assertEqual(night.total_time, 0.5)
+
+
+    # Test the precomputed weight arrays
+    def test_weight_profiles(self):
+        self.assertEqual(sorted(self.path_finder.weight_profiles), ["am_peak", "night"])
+        graph = self.path_finder.compact_graph
+        weights = self.path_finder.weight_profiles["am_peak"]
+        self.assertEqual(len(weights), graph.arc_count)
+        for arc in range(graph.arc_count):
+            factor = 10 if graph.lines[graph.arc_line[arc]].id == "11" else 1
+            self.assertEqual(weights[arc], graph.arc_time[arc] * factor)
+
+
+    # Clean up
+    def tearDown(self):
+        """Clean up by removing test JSON files."""
+        if os.path.exists(self.profiles_filepath):
+            os.remove(self.profiles_filepath)
+
+
+if __name__ == '__main__':
+    unittest.main()
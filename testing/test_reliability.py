@@ -0,0 +1,106 @@
+import unittest
+import os
+import time
+from tube.map import TubeMap
+from tube.synthetic import make_grid_tubemap
+from network.path import PathFinder
+from network import reliability
+from network.reliability import DelayModel, ReliabilitySimulator
+
+
+@unittest.skipIf(reliability.np is None, "numpy is not installed")
+class TestReliability(unittest.TestCase):
+
+    # Set up the test case
+    def setUp(self):
+
+        self.tubemap = TubeMap()
+
+        # Define path to the real JSON file
+        self.data_directory = os.path.abspath(os.path.join(os.path.dirname(__file__), 'data'))
+        self.original_json_filepath = os.path.join(self.data_directory, 'london.json')
+        self.tubemap.import_from_json(self.original_json_filepath)
+
+        self.path_finder = PathFinder(self.tubemap)
+        self.pairs = [("Covent Garden", "Green Park"), ("Stockwell", "Hammersmith")]
+
+
+    # Without delays, every sample is the scheduled time
+    def test_no_delay(self):
+        simulator = ReliabilitySimulator(self.path_finder, DelayModel(probability=0), seed=1)
+        report = simulator.simulate(self.pairs, samples=50)
+
+        for pair in self.pairs:
+            scheduled = report[pair]["scheduled"]
+            self.assertEqual(scheduled, self.path_finder.get_shortest_path(*pair).total_time)
+            for value in report[pair]["fixed"].values():
+                self.assertAlmostEqual(value, scheduled)
+
+
+    # Delays only ever make journeys longer
+    def test_percentiles(self):
+        simulator = ReliabilitySimulator(self.path_finder, DelayModel(probability=0.3, mean_delay=3), seed=1)
+        report = simulator.simulate(self.pairs, samples=500, percentiles=(50, 90, 99))
+
+        for pair in self.pairs:
+            statistics = report[pair]["fixed"]
+            self.assertEqual(set(statistics), {"mean", "p50", "p90", "p99"})
+            self.assertGreaterEqual(statistics["p50"], report[pair]["scheduled"])
+            self.assertLessEqual(statistics["p50"], statistics["p90"])
+            self.assertLessEqual(statistics["p90"], statistics["p99"])
+            self.assertGreater(statistics["mean"], report[pair]["scheduled"])
+
+
+    # Per-line parameters only delay that line
+    def test_line_parameters(self):
+        # Covent Garden -> Green Park is Piccadilly Line only
+        model = DelayModel(probability=0, line_parameters={"10": (1.0, 2.0)})
+        report = ReliabilitySimulator(self.path_finder, model, seed=1).simulate(self.pairs[:1], samples=200)
+        self.assertGreater(report[self.pairs[0]]["fixed"]["mean"], report[self.pairs[0]]["scheduled"])
+
+        model = DelayModel(probability=0, line_parameters={"11": (1.0, 2.0)})
+        report = ReliabilitySimulator(self.path_finder, model, seed=1).simulate(self.pairs[:1], samples=200)
+        self.assertAlmostEqual(report[self.pairs[0]]["fixed"]["mean"], report[self.pairs[0]]["scheduled"])
+
+
+    # Re-planning in every scenario can only help
+    @unittest.skipIf(reliability.csgraph_dijkstra is None, "scipy is not installed")
+    def test_reoptimised(self):
+        simulator = ReliabilitySimulator(self.path_finder, DelayModel(probability=0.3, mean_delay=5), seed=2)
+        arc_times = simulator.sample_arc_times(100)
+
+        for start_name, end_name in self.pairs:
+            route = self.path_finder.get_shortest_path(start_name, end_name)
+            fixed = arc_times[:, simulator.route_arcs(route)].sum(axis=1)
+            reoptimised = simulator.reoptimised_times(arc_times, route.indices[0], route.indices[-1])
+            self.assertTrue((reoptimised <= fixed + 1e-9).all())
+
+            # Check a few scenarios against a plain search on the sampled weights
+            for sample in (0, 50, 99):
+                result = self.path_finder.engine.search({route.indices[0]: 0}, {route.indices[-1]: 0},
+                                                        weights=list(arc_times[sample]))
+                self.assertAlmostEqual(reoptimised[sample], result.distances[route.indices[-1]])
+
+
+    # Unknown stations are left out of the report
+    def test_unknown_station(self):
+        simulator = ReliabilitySimulator(self.path_finder, seed=1)
+        self.assertEqual(simulator.simulate([("Covent Garden", "Nowhere")], samples=10), {})
+
+
+    # Thousands of scenarios on a larger network stay fast
+    def test_large_network_performance(self):
+        path_finder = PathFinder(make_grid_tubemap(20, 20))
+        simulator = ReliabilitySimulator(path_finder, seed=3)
+        pairs = [("Grid 0-0", "Grid 19-19"), ("Grid 0-19", "Grid 19-0")]
+
+        start = time.perf_counter()
+        report = simulator.simulate(pairs, samples=2000, reoptimise=reliability.csgraph_dijkstra is not None)
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual(len(report), 2)
+        self.assertLess(elapsed, 10)
+
+
+if __name__ == "__main__":
+    unittest.main()
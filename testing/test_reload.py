@@ -0,0 +1,150 @@
+import unittest
+import os
+import json
+import time
+from network.reload import ReloadManager
+
+
+class TestReload(unittest.TestCase):
+
+    def create_json_file(self, filepath, data):
+        with open(filepath, 'w') as f:
+            json.dump(data, f)
+
+
+    def network_data(self, time_ab):
+        return {
+            "stations": [
+                {"id": "1", "name": "Station A", "zone": "1"},
+                {"id": "2", "name": "Station B", "zone": "1"},
+                {"id": "3", "name": "Station C", "zone": "2"}
+            ],
+            "lines": [
+                {"line": "1", "name": "Line A"}
+            ],
+            "connections": [
+                {"station1": "1", "station2": "2", "line": "1", "time": str(time_ab)},
+                {"station1": "2", "station2": "3", "line": "1", "time": "2"},
+                {"station1": "1", "station2": "3", "line": "1", "time": "5"}
+            ]
+        }
+
+
+    # Set up the test case
+    def setUp(self):
+        self.data_directory = os.path.abspath(os.path.join(os.path.dirname(__file__), 'data'))
+        self.reload_json_filepath = os.path.join(self.data_directory, 'reload.json')
+        self.create_json_file(self.reload_json_filepath, self.network_data(1))
+        self.manager = ReloadManager(self.reload_json_filepath, poll_interval=0.01)
+
+
+    def rewrite(self, data):
+        # Force a distinct modification time, whatever the filesystem resolution
+        previous_mtime = os.stat(self.reload_json_filepath).st_mtime_ns
+        self.create_json_file(self.reload_json_filepath, data)
+        os.utime(self.reload_json_filepath, ns=(previous_mtime + 10**9, previous_mtime + 10**9))
+
+
+    # Test the initial load
+    def test_initial_snapshot(self):
+        snapshot = self.manager.snapshot
+        self.assertEqual(snapshot.version, 1)
+        self.assertFalse(self.manager.has_changed())
+        self.assertFalse(self.manager.reload())
+        stations = self.manager.get_shortest_path("Station A", "Station C")
+        self.assertEqual([station.name for station in stations], ["Station A", "Station B", "Station C"])
+
+
+    # Test that misspelt names are resolved
+    def test_misspelt_names(self):
+        stations = self.manager.get_shortest_path("station a", "Staton C")
+        self.assertEqual([station.name for station in stations], ["Station A", "Station B", "Station C"])
+        self.assertIsNone(self.manager.get_shortest_path("Station A", "Nowhere"))
+
+        # Options are passed on to the PathFinder
+        stations = self.manager.get_shortest_path("station a", "Staton C", excluded_stations=["Station B"])
+        self.assertEqual([station.name for station in stations], ["Station A", "Station C"])
+
+
+    # Test that a reload swaps the snapshot without touching the old one
+    def test_reload_swaps_snapshot(self):
+        old_snapshot = self.manager.snapshot
+
+        self.rewrite(self.network_data(9))
+        self.assertTrue(self.manager.has_changed())
+        self.assertTrue(self.manager.reload())
+
+        new_snapshot = self.manager.snapshot
+        self.assertEqual(new_snapshot.version, 2)
+        self.assertIsNot(new_snapshot, old_snapshot)
+
+        stations = self.manager.get_shortest_path("Station A", "Station C")
+        self.assertEqual([station.name for station in stations], ["Station A", "Station C"])
+
+        # Queries holding the old snapshot still see the old network
+        stations = old_snapshot.path_finder.get_shortest_path("Station A", "Station C")
+        self.assertEqual([station.name for station in stations], ["Station A", "Station B", "Station C"])
+
+
+    # Test that invalid data keeps the previous snapshot
+    def test_invalid_reload_keeps_snapshot(self):
+        with open(self.reload_json_filepath, 'w') as f:
+            f.write("{ not json")
+        os.utime(self.reload_json_filepath, ns=(1, 1))
+        self.assertFalse(self.manager.reload())
+        self.assertEqual(self.manager.snapshot.version, 1)
+
+
+    # Test the background polling thread
+    def test_background_reload(self):
+        self.manager.start()
+        try:
+            self.rewrite(self.network_data(9))
+            deadline = time.time() + 5
+            while self.manager.snapshot.version == 1 and time.time() < deadline:
+                time.sleep(0.01)
+        finally:
+            self.manager.stop()
+        self.assertEqual(self.manager.snapshot.version, 2)
+
+
+    # Test that the poller survives a file it cannot import
+    def test_malformed_file(self):
+        imports = []
+        build_snapshot = self.manager.build_snapshot
+        self.manager.build_snapshot = lambda signature: imports.append(signature) or build_snapshot(signature)
+
+        data = self.network_data(9)
+        del data["connections"][0]["station1"]
+        self.manager.start()
+        try:
+            with self.assertLogs("network.reload", level="ERROR"):
+                self.rewrite(data)
+                deadline = time.time() + 5
+                while self.manager.failed_signature is None and time.time() < deadline:
+                    time.sleep(0.01)
+            # Not imported again until the file changes
+            time.sleep(0.1)
+            self.assertEqual(len(imports), 1)
+            self.assertIsInstance(self.manager.last_error, KeyError)
+            self.assertEqual(self.manager.snapshot.version, 1)
+
+            self.rewrite(self.network_data(9))
+            while self.manager.snapshot.version == 1 and time.time() < deadline:
+                time.sleep(0.01)
+        finally:
+            self.manager.stop()
+        self.assertEqual(self.manager.snapshot.version, 2)
+        self.assertIsNone(self.manager.failed_signature)
+
+
+    # Clean up
+    def tearDown(self):
+        """Clean up by removing test JSON files."""
+        self.manager.stop()
+        if os.path.exists(self.reload_json_filepath):
+            os.remove(self.reload_json_filepath)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import unittest
+import os
+from tube.map import TubeMap
+from network.path import PathFinder
+from network.route import Route
+
+
+class TestRoute(unittest.TestCase):
+
+    # Set up the test case
+    def setUp(self):
+
+        self.tubemap = TubeMap()
+
+        # Define path to the real JSON file
+        self.data_directory = os.path.abspath(os.path.join(os.path.dirname(__file__), 'data'))
+        self.original_json_filepath = os.path.join(self.data_directory, 'london.json')
+        self.tubemap.import_from_json(self.original_json_filepath)
+
+        self.path_finder = PathFinder(self.tubemap)
+
+
+    # Test that a route behaves like the list of stations
+    def test_route_is_list_like(self):
+        route = self.path_finder.get_shortest_path("Covent Garden", "Green Park")
+        self.assertIsInstance(route, Route)
+
+        expected = ['Covent Garden', 'Leicester Square', 'Piccadilly Circus', 'Green Park']
+        self.assertEqual(len(route), 4)
+        self.assertEqual(route.names, expected)
+        self.assertEqual([station.name for station in route], expected)
+        self.assertEqual(route[0].name, 'Covent Garden')
+        self.assertEqual(route[-1].name, 'Green Park')
+        self.assertEqual([station.name for station in route[1:3]], expected[1:3])
+        self.assertEqual(route, [self.tubemap.stations[station_id] for station_id in route.station_ids])
+
+
+    # Test total time and legs
+    def test_route_time_and_legs(self):
+        route = self.path_finder.get_shortest_path("Covent Garden", "Green Park")
+        self.assertEqual(route.total_time, 4)
+        self.assertEqual(len(route.legs), 3)
+        self.assertEqual([line.name for line in route.lines], ['Piccadilly Line'] * 3)
+
+        route = self.path_finder.get_shortest_path("Green Park", "Green Park")
+        self.assertEqual(route.total_time, 0)
+        self.assertEqual(route.legs, [])
+
+
+    # Test the bytes round trip
+    def test_route_serialisation(self):
+        route = self.path_finder.get_shortest_path("Morden", "Wembley Central")
+        data = route.to_bytes()
+
+        decoded = Route.from_bytes(data, self.path_finder.station_list, self.path_finder.line_list)
+        self.assertEqual(decoded, route)
+        self.assertEqual(decoded.total_time, route.total_time)
+        self.assertEqual(decoded.lines, route.lines)
+
+        self.assertIsNone(Route.from_bytes(b"", self.path_finder.station_list, self.path_finder.line_list))
+        self.assertIsNone(Route.from_bytes(data[:-1], self.path_finder.station_list, self.path_finder.line_list))
+
+
+if __name__ == '__main__':
+    unittest.main()
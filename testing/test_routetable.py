@@ -0,0 +1,138 @@
+import unittest
+import os
+import random
+from tube.map import TubeMap
+from network.path import PathFinder
+from network.routetable import (RouteTableReader, export_route_table, benchmark_route_table,
+                                encode_varint, decode_varints, zigzag, unzigzag)
+
+
+class TestRouteTable(unittest.TestCase):
+
+    # Set up the test case
+    def setUp(self):
+
+        self.tubemap = TubeMap()
+
+        # Define path to the real JSON file
+        self.data_directory = os.path.abspath(os.path.join(os.path.dirname(__file__), 'data'))
+        self.original_json_filepath = os.path.join(self.data_directory, 'london.json')
+        self.tubemap.import_from_json(self.original_json_filepath)
+
+        self.path_finder = PathFinder(self.tubemap)
+        self.table_filepath = os.path.join(self.data_directory, 'routes.bin')
+        self.raw_filepath = os.path.join(self.data_directory, 'routes_raw.bin')
+        self.invalid_filepath = os.path.join(self.data_directory, 'routes_invalid.bin')
+
+
+    # Remove created files after each test
+    def tearDown(self):
+        for filepath in (self.table_filepath, self.raw_filepath, self.invalid_filepath):
+            if os.path.exists(filepath):
+                os.remove(filepath)
+
+
+    # Lookups give the routes of get_shortest_path
+    def test_matches_path_finder(self):
+        export = self.path_finder.export_route_table(self.table_filepath)
+        self.assertEqual(export["bytes"], os.path.getsize(self.table_filepath))
+
+        names = [station.name for station in self.path_finder.station_list]
+        generator = random.Random(11)
+        with RouteTableReader(self.table_filepath) as reader:
+            for _ in range(300):
+                start, end = generator.choice(names), generator.choice(names)
+                expected = self.path_finder.get_shortest_path(start, end)
+                route = reader.lookup(start, end)
+                self.assertEqual(route.names, expected.names)
+                self.assertEqual(route.lines, [line.name for line in expected.lines])
+                self.assertAlmostEqual(route.total_time, expected.total_time)
+
+            # Stations can be given by id too
+            route = reader.lookup("245", "236")  # Stockwell, South Kensington
+            self.assertEqual(route.names, ["Stockwell", "Vauxhall", "Pimlico", "Victoria",
+                                           "Sloane Square", "South Kensington"])
+            self.assertEqual(reader.lookup("Stockwell", "Stockwell").names, ["Stockwell"])
+            self.assertIsNone(reader.lookup("Stockwell", "Nowhere"))
+            self.assertEqual(reader.station_count, self.path_finder.compact_graph.station_count)
+
+
+    # Deflated and raw trees answer the same, deflated ones are smaller
+    def test_compression(self):
+        compressed = export_route_table(self.path_finder, self.table_filepath)
+        raw = export_route_table(self.path_finder, self.raw_filepath, compress=False)
+        self.assertLess(compressed["bytes"], raw["bytes"])
+        # One byte per station pair before compression
+        self.assertEqual(raw["tree_bytes"], 302 * 302)
+
+        with RouteTableReader(self.table_filepath, cache_size=2) as first, \
+                RouteTableReader(self.raw_filepath) as second:
+            for start in ("Covent Garden", "Hammersmith", "Stockwell", "Covent Garden"):
+                for end in ("Green Park", "Oxford Circus"):
+                    self.assertEqual(first.lookup(start, end).names, second.lookup(start, end).names)
+            # Covent Garden was evicted by Stockwell: 4 trees read
+            self.assertEqual(first.stats["tree_misses"], 4)
+            self.assertEqual(first.stats["tree_hits"], 4)
+
+
+    # Closed stations are left out of the exported routes
+    def test_closures(self):
+        self.path_finder.disable_station("Victoria")
+        self.path_finder.export_route_table(self.table_filepath)
+        with RouteTableReader(self.table_filepath) as reader:
+            route = reader.lookup("Stockwell", "South Kensington")
+            self.assertNotIn("Victoria", route.names)
+            self.assertEqual(route.total_time,
+                             self.path_finder.get_shortest_path("Stockwell", "South Kensington").total_time)
+            self.assertIsNone(reader.lookup("Victoria", "Stockwell"))
+            self.assertIsNone(reader.lookup("Stockwell", "Victoria"))
+
+
+    # Invalid files are rejected
+    def test_invalid_file(self):
+        with open(self.invalid_filepath, 'wb') as f:
+            f.write(b"TUBX not a route table")
+        with self.assertRaises(ValueError):
+            RouteTableReader(self.invalid_filepath)
+
+
+    # Tables exported for another timetable are rejected
+    def test_stale_table(self):
+        self.path_finder.export_route_table(self.table_filepath)
+        with RouteTableReader(self.table_filepath, graph=self.path_finder.compact_graph) as reader:
+            self.assertEqual(reader.checksum, self.path_finder.compact_graph.checksum())
+
+        # Stockwell - Vauxhall is on the shortest path to South Kensington
+        changed = TubeMap()
+        changed.import_from_json(self.original_json_filepath)
+        connection = next(connection for connection in changed.connections
+                          if {station.id for station in connection.stations} == {'245', '272'})
+        connection.time += 10
+        path_finder = PathFinder(changed)
+        with self.assertRaises(ValueError):
+            RouteTableReader(self.table_filepath, graph=path_finder.compact_graph)
+
+
+    # Size and decode speed are reported
+    def test_benchmark(self):
+        self.path_finder.export_route_table(self.table_filepath)
+        report = benchmark_route_table(self.table_filepath, queries=200)
+        self.assertEqual(report["bytes"], os.path.getsize(self.table_filepath))
+        self.assertLess(report["bytes_per_pair"], 1)
+        for key in ("open_ms", "tree_decode_us", "lookup_us", "cold_lookup_us"):
+            self.assertGreater(report[key], 0)
+
+
+    # Varint and zigzag encodings
+    def test_encodings(self):
+        out = bytearray()
+        values = [0, 1, 127, 128, 300, 2 ** 32]
+        for value in values:
+            encode_varint(value, out)
+        self.assertEqual(decode_varints(bytes(out)), values)
+        self.assertEqual([zigzag(value) for value in (0, -1, 1, -2)], [0, 1, 2, 3])
+        self.assertEqual([unzigzag(zigzag(value)) for value in range(-5, 6)], list(range(-5, 6)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,128 @@
+import unittest
+import os
+import math
+import random
+from tube.map import TubeMap
+from tube.spatial import SpatialIndex
+from network.path import PathFinder
+
+
+class TestSpatialIndex(unittest.TestCase):
+
+    # Set up the test case
+    def setUp(self):
+
+        self.tubemap = TubeMap()
+
+        # Define path to the real JSON file
+        self.data_directory = os.path.abspath(os.path.join(os.path.dirname(__file__), 'data'))
+        self.original_json_filepath = os.path.join(self.data_directory, 'london.json')
+        self.tubemap.import_from_json(self.original_json_filepath)
+
+        self.index = self.tubemap.spatial_index
+
+
+    def brute_force(self, latitude, longitude):
+        x, y = self.index.project(latitude, longitude)
+        distances = [(math.hypot(px - x, py - y), station_id)
+                     for station_id, (px, py) in self.index.points.items()]
+        return sorted(distances)
+
+
+    # Test that every station with coordinates is indexed
+    def test_index_built_on_import(self):
+        self.assertEqual(len(self.tubemap.coordinates), 302)
+        self.assertEqual(len(self.index), 302)
+
+
+    # Test the nearest station of a station is itself
+    def test_nearest_station_is_itself(self):
+        latitude, longitude = self.tubemap.coordinates['236']
+        nearest = self.index.nearest(latitude, longitude, k=1)
+        self.assertEqual(nearest[0][0], '236')
+        self.assertAlmostEqual(nearest[0][1], 0.0)
+
+
+    # Test k-nearest and radius queries against a brute force scan
+    def test_queries_match_brute_force(self):
+        rng = random.Random(42)
+        for _ in range(50):
+            latitude = rng.uniform(51.40, 51.70)
+            longitude = rng.uniform(-0.60, 0.25)
+            expected = self.brute_force(latitude, longitude)
+
+            nearest = self.index.nearest(latitude, longitude, k=5)
+            self.assertEqual([distance for _, distance in nearest],
+                             [distance for distance, _ in expected[:5]])
+
+            within = self.index.within_radius(latitude, longitude, 2000)
+            self.assertEqual(len(within), len([d for d, _ in expected if d <= 2000]))
+
+
+    # Test points far outside the network (45 km, 156 km, Paris, Sydney)
+    def test_far_away_points(self):
+        min_column, min_row, max_column, max_row = self.index.bounds
+        span = max(max_column - min_column, max_row - min_row)
+        for latitude, longitude in ((51.9, -0.12), (52.9, -0.12), (48.8566, 2.3522), (-33.87, 151.21)):
+            expected = self.brute_force(latitude, longitude)
+            visited = []
+            get_ring = self.index.get_ring
+            self.index.get_ring = lambda *args: visited.append(args) or get_ring(*args)
+            try:
+                nearest = self.index.nearest(latitude, longitude, k=3)
+            finally:
+                del self.index.get_ring
+            self.assertEqual([distance for _, distance in nearest],
+                             [distance for distance, _ in expected[:3]])
+            # Empty rings between the point and the network are skipped
+            self.assertLessEqual(len(visited), span + 1)
+
+
+    # Test queries on an empty index
+    def test_empty_index(self):
+        index = SpatialIndex()
+        index.build({})
+        self.assertEqual(index.nearest(51.5, -0.1, k=3), [])
+        self.assertEqual(index.within_radius(51.5, -0.1, 1000), [])
+
+
+    # Test routing between two coordinates
+    def test_path_between_coordinates(self):
+        path_finder = PathFinder(self.tubemap)
+
+        # Right on top of Covent Garden and Green Park
+        start = self.tubemap.coordinates['60']
+        end = self.tubemap.coordinates['107']
+        stations = path_finder.get_shortest_path_between_coordinates(start, end)
+        station_names = [station.name for station in stations]
+        self.assertEqual(station_names[0], 'Covent Garden')
+        self.assertEqual(station_names[-1], 'Green Park')
+
+        nearest = path_finder.find_nearest_stations(*start, k=2)
+        self.assertEqual(nearest[0][0].name, 'Covent Garden')
+        self.assertEqual(len(nearest), 2)
+
+
+    # Test that closed stations are neither entered, left nor crossed
+    def test_path_between_coordinates_with_closures(self):
+        path_finder = PathFinder(self.tubemap)
+        path_finder.disable_station('Green Park')
+        start = self.tubemap.coordinates['107']  # Green Park
+        end = self.tubemap.coordinates['192']  # Oxford Circus
+        route = path_finder.get_shortest_path_between_coordinates(start, end)
+        self.assertNotIn('Green Park', route.names)
+        self.assertEqual(route.names[-1], 'Oxford Circus')
+
+        path_finder.disable_station('Oxford Circus')
+        route = path_finder.get_shortest_path_between_coordinates(start, end, candidates=1)
+        self.assertFalse({'Green Park', 'Oxford Circus'} & set(route.names))
+
+
+    # Test routing on a map without coordinates
+    def test_path_between_coordinates_without_index(self):
+        path_finder = PathFinder(TubeMap())
+        self.assertIsNone(path_finder.get_shortest_path_between_coordinates((51.5, -0.1), (51.5, -0.2)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import unittest
+import os
+from tube.map import TubeMap
+
+
+class TestTopology(unittest.TestCase):
+
+    # Set up the test case
+    def setUp(self):
+
+        self.tubemap = TubeMap()
+
+        # Define path to the real JSON file
+        self.data_directory = os.path.abspath(os.path.join(os.path.dirname(__file__), 'data'))
+        self.original_json_filepath = os.path.join(self.data_directory, 'london.json')
+        self.tubemap.import_from_json(self.original_json_filepath)
+
+        self.topology = self.tubemap.topology
+        self.ids = {station.name: station.id for station in self.tubemap.stations.values()}
+
+
+    def names(self, station_ids):
+        return [self.tubemap.stations[station_id].name for station_id in station_ids]
+
+
+    # Every connection is on one branch, every station on a sequence
+    def test_coverage(self):
+        self.assertEqual(set(self.topology.lines), set(self.tubemap.lines))
+        for line_id, topology in self.topology.lines.items():
+            links = {frozenset(station.id for station in connection.stations)
+                     for connection in self.tubemap.connections if connection.line.id == line_id}
+            branch_links = []
+            for branch in topology.branches:
+                stations = branch.stations + branch.stations[:1] if branch.cyclic else branch.stations
+                branch_links.extend(frozenset(leg) for leg in zip(stations, stations[1:]))
+            self.assertEqual(sorted(map(sorted, branch_links)), sorted(map(sorted, links)))
+            for station_id in topology.stations:
+                self.assertIn(station_id, topology)
+                self.assertIn(line_id, self.topology.lines_at(station_id))
+
+
+    # Simple, branching and circular lines
+    def test_sequences(self):
+        victoria = self.topology.get("Victoria Line")
+        self.assertEqual(len(victoria.sequences), 1)
+        self.assertEqual(self.names([victoria.sequences[0].stations[0], victoria.sequences[0].stations[-1]]),
+                         ["Walthamstow Central", "Brixton"])
+
+        circle = self.topology.get("3")
+        self.assertEqual(circle.termini, [])
+        self.assertTrue(circle.sequences[0].cyclic)
+
+        northern = self.topology.get("Northern Line")
+        self.assertEqual(sorted(self.names(northern.termini)),
+                         ["Edgware", "High Barnet", "Mill Hill East", "Morden"])
+        self.assertEqual(len(northern.junctions), 4)
+        self.assertIsNone(self.topology.get("Nowhere Line"))
+
+
+    # Position arithmetic along the sequences
+    def test_stops(self):
+        northern = self.topology.get("Northern Line")
+        self.assertEqual(self.names(northern.next_stops(self.ids["Kennington"], self.ids["Morden"])),
+                         ["Oval", "Stockwell", "Clapham North"])
+        self.assertEqual(self.names(northern.next_stops(self.ids["Clapham North"], self.ids["Morden"], 50))[-1],
+                         "Morden")
+        self.assertEqual(northern.next_stops(self.ids["Morden"], self.ids["Morden"]), [])
+        self.assertEqual(self.names(northern.stops_between(self.ids["Euston"], self.ids["Kennington"])),
+                         ["Euston", "Warren Street", "Goodge Street", "Tottenham Court Road",
+                          "Leicester Square", "Charing Cross", "Embankment", "Waterloo", "Kennington"])
+        self.assertEqual(northern.hops(self.ids["Stockwell"], self.ids["Oval"]), 1)
+        self.assertIsNone(northern.hops(self.ids["Stockwell"], self.ids["Brixton"]))
+        self.assertEqual(northern.stops_between(self.ids["Stockwell"], self.ids["Brixton"]), [])
+
+        # The short way round a loop
+        circle = self.topology.get("Circle Line")
+        self.assertEqual(self.names(circle.stops_between(self.ids["Baker Street"], self.ids["Farringdon"])),
+                         ["Baker Street", "Great Portland Street", "Euston Square",
+                          "King's Cross St. Pancras", "Farringdon"])
+        self.assertEqual(self.names(circle.next_stops(self.ids["Farringdon"], self.ids["Baker Street"], 2)),
+                         ["King's Cross St. Pancras", "Euston Square"])
+
+        # A terminal loop
+        piccadilly = self.topology.get("Piccadilly Line")
+        self.assertEqual(self.names(piccadilly.stops_between(self.ids["Hatton Cross"],
+                                                             self.ids["Heathrow Terminals 1, 2 & 3"])),
+                         ["Hatton Cross", "Heathrow Terminals 1, 2 & 3"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,178 @@
+import unittest
+import os
+import heapq
+from tube.map import TubeMap
+from tube.synthetic import make_grid_tubemap
+from network.path import PathFinder
+from network.transfers import TransferPatternIndex
+
+
+def fewest_transfers_search(graph, start, max_transfers):
+    """ Reference: plain Dijkstra over (station, line, transfers) states. """
+    best = [float('inf')] * graph.station_count
+    distances = {(start, -1, 0): 0}
+    queue = [(0, start, -1, 0)]
+    while queue:
+        distance, station, line, transfers = heapq.heappop(queue)
+        if distance > distances[(station, line, transfers)]:
+            continue
+        best[station] = min(best[station], distance)
+        for arc in range(graph.indptr[station], graph.indptr[station + 1]):
+            arc_line = graph.arc_line[arc]
+            new_transfers = transfers if line in (-1, arc_line) else transfers + 1
+            state = (graph.arc_head[arc], arc_line, new_transfers)
+            new_distance = distance + graph.arc_time[arc]
+            if new_transfers <= max_transfers and new_distance < distances.get(state, float('inf')):
+                distances[state] = new_distance
+                heapq.heappush(queue, (new_distance,) + state)
+    return best
+
+
+class TestTransferPatterns(unittest.TestCase):
+
+    # Set up the test case
+    def setUp(self):
+
+        self.tubemap = TubeMap()
+
+        # Define path to the real JSON file
+        self.data_directory = os.path.abspath(os.path.join(os.path.dirname(__file__), 'data'))
+        self.original_json_filepath = os.path.join(self.data_directory, 'london.json')
+        self.tubemap.import_from_json(self.original_json_filepath)
+
+        self.path_finder = PathFinder(self.tubemap)
+        self.graph = self.path_finder.compact_graph
+        self.origins = list(range(0, self.graph.station_count, 23))
+        self.patterns_filepath = os.path.join(self.data_directory, 'patterns.bin')
+
+
+    # Remove created files after each test
+    def tearDown(self):
+        if os.path.exists(self.patterns_filepath):
+            os.remove(self.patterns_filepath)
+
+
+    def assertRouteValid(self, route):
+        # Every leg follows a connection of the line it claims
+        graph = self.graph
+        total = 0
+        for (tail, head), line in zip(zip(route.indices, route.indices[1:]), route.line_indices):
+            times = [graph.arc_time[arc] for arc in range(graph.indptr[tail], graph.indptr[tail + 1])
+                     if graph.arc_head[arc] == head and graph.arc_line[arc] == line]
+            self.assertTrue(times)
+            total += min(times)
+        self.assertAlmostEqual(total, route.total_time)
+
+
+    # Validate the fastest journeys against a full search
+    def test_against_full_search(self):
+        index = TransferPatternIndex(self.graph).build(origins=self.origins)
+
+        for origin in self.origins:
+            distances = self.path_finder.engine.search({origin: 0}).distances
+            for destination in range(self.graph.station_count):
+                route = index.query(origin, destination)
+                if distances[destination] == float('inf'):
+                    self.assertIsNone(route)
+                    continue
+                self.assertAlmostEqual(route.total_time, distances[destination])
+                self.assertEqual((route.indices[0], route.indices[-1]), (origin, destination))
+        self.assertRouteValid(index.query(self.origins[1], self.origins[-1]))
+
+
+    # Validate journeys with few changes against a state search
+    def test_max_transfers(self):
+        index = TransferPatternIndex(self.graph).build(origins=self.origins[:4])
+
+        for origin in self.origins[:4]:
+            for max_transfers in (0, 1, 2):
+                expected = fewest_transfers_search(self.graph, origin, max_transfers)
+                for destination in range(self.graph.station_count):
+                    route = index.query(origin, destination, max_transfers)
+                    if expected[destination] == float('inf'):
+                        self.assertIsNone(route)
+                    else:
+                        self.assertAlmostEqual(route.total_time, expected[destination])
+                        changes = sum(1 for before, after in zip(route.line_indices, route.line_indices[1:])
+                                      if before != after)
+                        self.assertLessEqual(changes, max_transfers)
+
+
+    # Patterns are the origin, the change stations and the destination
+    def test_patterns(self):
+        start, end = self.graph.station_index["245"], self.graph.station_index["110"]  # Stockwell, Hammersmith
+        index = TransferPatternIndex(self.graph)
+        patterns = index.patterns(start, end)
+
+        self.assertTrue(patterns)
+        self.assertTrue(all(pattern[0] == start and pattern[-1] == end for pattern in patterns))
+        # Pareto-optimal: fewer changes are only kept if slower
+        self.assertEqual(len({len(pattern) for pattern in patterns}), len(patterns))
+        self.assertEqual(index.statistics()["origins"], 1)
+
+        # Green Park -> Oxford Circus is one ride on the Victoria line
+        start, end = self.graph.station_index["107"], self.graph.station_index["192"]
+        self.assertEqual(index.patterns(start, end), [[start, end]])
+
+
+    # PathFinder queries, with patterns computed on demand
+    def test_path_finder(self):
+        route = self.path_finder.get_shortest_path_with_transfers("Stockwell", "Hammersmith")
+        self.assertEqual(route.total_time, self.path_finder.get_shortest_path("Stockwell", "Hammersmith").total_time)
+        self.assertIsNone(self.path_finder.get_shortest_path_with_transfers("Stockwell", "Hammersmith", 0))
+        self.assertIsNone(self.path_finder.get_shortest_path_with_transfers("Stockwell", "Nowhere"))
+        self.assertEqual(self.path_finder.get_shortest_path_with_transfers("Stockwell", "Stockwell").names,
+                         ["Stockwell"])
+
+
+    # Journeys through a closure are searched again on the open network
+    def test_path_finder_with_closures(self):
+        self.assertIn("Green Park", self.path_finder.get_shortest_path_with_transfers("Victoria", "Bond Street").names)
+        self.path_finder.disable_station("Green Park")
+        route = self.path_finder.get_shortest_path_with_transfers("Victoria", "Bond Street")
+        self.assertNotIn("Green Park", route.names)
+        self.assertEqual(route.total_time, self.path_finder.get_shortest_path("Victoria", "Bond Street").total_time)
+        self.assertIsNone(self.path_finder.get_shortest_path_with_transfers("Victoria", "Bond Street", 0))
+        self.assertIsNone(self.path_finder.get_shortest_path_with_transfers("Green Park", "Bond Street"))
+
+        # Closed connections too
+        self.path_finder.enable_station("Green Park")
+        self.path_finder.disable_connection("Green Park", "Bond Street")
+        route = self.path_finder.get_shortest_path_with_transfers("Victoria", "Bond Street")
+        self.assertNotEqual(route.names[-2:], ["Green Park", "Bond Street"])
+
+
+    # Parallel build, save and load
+    def test_parallel_build_and_storage(self):
+        path_finder = PathFinder(make_grid_tubemap(8, 8))
+        graph = path_finder.compact_graph
+        serial = TransferPatternIndex(graph).build()
+        parallel = path_finder.build_transfer_patterns(processes=2, filepath=self.patterns_filepath)
+
+        self.assertEqual(serial.to_bytes(), parallel.to_bytes())
+        loaded = TransferPatternIndex.load(self.patterns_filepath, graph)
+        self.assertIsNotNone(loaded)
+        for origin in range(0, graph.station_count, 5):
+            distances = path_finder.engine.search({origin: 0}).distances
+            for destination in range(graph.station_count):
+                self.assertAlmostEqual(loaded.query(origin, destination).total_time, distances[destination])
+
+        # Patterns built for another map are rejected
+        self.assertIsNone(TransferPatternIndex.load(self.patterns_filepath, self.graph))
+        self.assertIsNone(TransferPatternIndex.from_bytes(b"TUBT", graph))
+
+        # Same stations with other connection times: the patterns are rebuilt
+        retimed = PathFinder(make_grid_tubemap(8, 8, seed=1))
+        self.assertIsNone(TransferPatternIndex.load(self.patterns_filepath, retimed.compact_graph))
+        rebuilt = retimed.build_transfer_patterns(filepath=self.patterns_filepath)
+        distances = retimed.engine.search({0: 0}).distances
+        for destination in range(graph.station_count):
+            self.assertAlmostEqual(rebuilt.query(0, destination).total_time, distances[destination])
+
+        statistics = serial.statistics()
+        self.assertEqual(statistics["origins"], graph.station_count)
+        self.assertGreater(statistics["memory_bytes"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,167 @@
+import unittest
+import os
+import datetime
+from tube.map import TubeMap
+from network.path import PathFinder
+from network.reload import ReloadManager
+from network.workload import (QueryRecorder, RecordedQuery, WorkloadReplayer, load_workload,
+                              percentiles, cache_hit_rates)
+
+
+class CachingTarget:
+    """ Answers every query, with a fake cache hit every other query. """
+
+    def __init__(self):
+        self.stats = {"route_hits": 0, "route_misses": 0}
+
+    def get_shortest_path(self, start, end):
+        if start == "Broken":
+            raise KeyError(start)
+        key = "route_hits" if self.stats["route_hits"] < self.stats["route_misses"] else "route_misses"
+        self.stats[key] += 1
+        return [start, end]
+
+
+class TestWorkload(unittest.TestCase):
+
+    # Set up the test case
+    def setUp(self):
+
+        self.tubemap = TubeMap()
+
+        # Define path to the real JSON file
+        self.data_directory = os.path.abspath(os.path.join(os.path.dirname(__file__), 'data'))
+        self.original_json_filepath = os.path.join(self.data_directory, 'london.json')
+        self.tubemap.import_from_json(self.original_json_filepath)
+
+        self.path_finder = PathFinder(self.tubemap)
+        self.log_filepath = os.path.join(self.data_directory, 'workload.log')
+
+        self.queries = [RecordedQuery(index * 0.02, start, end) for index, (start, end) in enumerate([
+            ("Covent Garden", "Green Park"), ("Stockwell", "South Kensington"),
+            ("Oxford Circus", "Hammersmith"), ("Covent Garden", "Nowhere"),
+        ] * 5)]
+
+
+    # Remove created files after each test
+    def tearDown(self):
+        if os.path.exists(self.log_filepath):
+            os.remove(self.log_filepath)
+
+
+    # Queries are recorded only once a recorder is attached
+    def test_record_and_load(self):
+        self.path_finder.get_shortest_path("Covent Garden", "Green Park")
+
+        with QueryRecorder(self.log_filepath) as recorder:
+            self.path_finder.recorder = recorder
+            self.path_finder.get_shortest_path("Covent Garden", "Green Park")
+            self.path_finder.get_shortest_path("Stockwell", "Hammersmith", excluded_lines={"Victoria Line"},
+                                               departure_time=datetime.time(8, 30))
+            self.path_finder.get_shortest_path("Covent Garden", "Nowhere", allowed_zones=[1])
+            self.assertEqual(recorder.count, 3)
+        self.path_finder.recorder = None
+
+        queries = load_workload(self.log_filepath)
+        self.assertEqual([(query.start, query.end) for query in queries],
+                         [("Covent Garden", "Green Park"), ("Stockwell", "Hammersmith"),
+                          ("Covent Garden", "Nowhere")])
+        self.assertEqual(queries[0].options, {})
+        self.assertEqual(queries[1].options, {"excluded_lines": ["Victoria Line"], "departure_time": "08:30"})
+        self.assertEqual(queries[2].options, {"allowed_zones": [1]})
+        self.assertEqual([query.offset for query in queries], sorted(query.offset for query in queries))
+
+        # Recording appends to an existing log, after the previous session
+        with QueryRecorder(self.log_filepath) as recorder:
+            recorder.record("Bank", "Oval")
+        appended = load_workload(self.log_filepath)
+        self.assertEqual(len(appended), 4)
+        self.assertEqual([query.offset for query in appended[:3]], [query.offset for query in queries])
+        self.assertGreaterEqual(appended[3].offset, queries[2].offset)
+
+        with open(self.log_filepath, 'a') as f:
+            f.write("# session 2026-01-01T08:00:00\n0.5\tBank\tOval\t\n1.5\tOval\tBank\t\n")
+        offsets = [query.offset for query in load_workload(self.log_filepath)]
+        self.assertAlmostEqual(offsets[4] - offsets[3], 0.5)
+        self.assertAlmostEqual(offsets[5] - offsets[4], 1.0)
+
+
+    # Malformed lines and missing files
+    def test_load_invalid(self):
+        self.assertEqual(load_workload(os.path.join(self.data_directory, 'missing.log')), [])
+        with open(self.log_filepath, 'w') as f:
+            f.write("# tube-workload v1\nnot a query\nabc\tBank\tOval\t\n0.5\tBank\tOval\t\n")
+        queries = load_workload(self.log_filepath)
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(queries[0].offset, 0.5)
+
+
+    # Replay as fast as possible on a thread pool
+    def test_replay_max_rate(self):
+        report = WorkloadReplayer(self.path_finder, workers=4).replay(self.queries, rate="max")
+
+        self.assertEqual(report["queries"], 20)
+        self.assertEqual(report["found"], 15)
+        self.assertEqual(report["errors"], 0)
+        self.assertGreater(report["throughput"], 0)
+        self.assertEqual(set(report["latency"]), {"p50", "p90", "p99", "mean", "max"})
+        self.assertLessEqual(report["latency"]["p50"], report["latency"]["max"])
+        self.assertEqual(self.path_finder.stats["queries"], 15)
+
+
+    # Replay at the recorded pace, or faster
+    def test_replay_rates(self):
+        replayer = WorkloadReplayer(self.path_finder, workers=2)
+
+        report = replayer.replay(self.queries, rate="original")
+        self.assertGreaterEqual(report["elapsed"], 0.38)
+
+        report = replayer.replay(self.queries, rate=4)
+        self.assertGreaterEqual(report["elapsed"], 0.095)
+        self.assertLess(report["elapsed"], 0.38)
+
+        with self.assertRaises(ValueError):
+            replayer.replay(self.queries, rate="fast")
+        with self.assertRaises(ValueError):
+            replayer.replay(self.queries, rate=0)
+
+
+    # Cache hit rates and errors are reported
+    def test_cache_and_errors(self):
+        queries = self.queries[:10] + [RecordedQuery(0, "Broken", "Oval")]
+        report = WorkloadReplayer(CachingTarget(), workers=1).replay(queries, rate="max")
+
+        self.assertEqual(report["errors"], 1)
+        self.assertEqual(report["cache"], {"route": (5, 5, 0.5)})
+        self.assertEqual(cache_hit_rates({}, {"queries": 3}), {})
+
+
+    # The service can be replayed too
+    def test_replay_service(self):
+        manager = ReloadManager(self.original_json_filepath)
+        report = WorkloadReplayer(manager).replay(self.queries, rate="max")
+        self.assertEqual(report["found"], 15)
+
+
+    # Replay on a process pool
+    def test_replay_processes(self):
+        with self.assertRaises(ValueError):
+            WorkloadReplayer(processes=True)
+
+        replayer = WorkloadReplayer(filepath=self.original_json_filepath, workers=2, processes=True)
+        report = replayer.replay(self.queries, rate="max")
+        self.assertEqual(report["found"], 15)
+        self.assertEqual(report["errors"], 0)
+
+
+    # Nearest-rank percentiles
+    def test_percentiles(self):
+        values = list(range(1, 101))
+        result = percentiles(values)
+        self.assertEqual((result["p50"], result["p90"], result["p99"], result["max"]), (50, 90, 99, 100))
+        self.assertEqual(result["mean"], 50.5)
+        self.assertEqual(percentiles([])["p50"], 0.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,16 @@
 import json
 import math
+import string
+import sys
 from .components import Station, Line, Connection
+from .spatial import SpatialIndex
+from .profiles import TimeProfiles
+from .names import NameIndex
+from .topology import TopologyIndex
+
+# Line used by the connections declared between two networks
+INTERCHANGE_LINE_ID = "interchange"
+INTERCHANGE_LINE_NAME = "Interchange"
 
 class TubeMap:
     """
@@ -22,9 +32,170 @@ class TubeMap:
         self.stations = {}  # key: id (str), value: Station instance
         self.lines = {}  # key: id (str), value: Line instance
         self.connections = []  # list of Connection instances
+        self.coordinates = {}  # key: station id (str), value: (latitude, longitude)
+        self.line_colours = {}  # key: line id (str), value: colour, e.g. "#AE6017"
+        self.spatial_index = SpatialIndex()  # nearest-station lookups on coordinates
+        self.name_index = NameIndex()  # typo-tolerant station name completion
+        self.topology = TopologyIndex()  # ordered stop sequences of every line
+        self.networks = {}  # key: namespace (str), value: path of the imported JSON file
+        self.profiles = TimeProfiles()  # time-of-day multipliers and overrides
+
+
+    def make_id(self, raw_id, namespace=None):
+        """ Return the (interned) id of a station or line of a network.
+
+        Without a namespace, ids are kept as they are in the JSON file. With a
+        namespace, ids are prefixed (e.g. "dlr:11"), so that networks using
+        the same ids can share one TubeMap.
+        """
+        if namespace is None:
+            return sys.intern(str(raw_id))
+        return sys.intern(f"{namespace}:{raw_id}")
+
+
+    def find_stations_by_name(self, station_name):
+        """ Return every station called `station_name`.
+
+        Networks imported in different namespaces may share a station name
+        (e.g. "Bank"): a name can be qualified with the namespace of its
+        network ("dlr:Bank") to pick one of them.
+
+        Returns:
+            list[Station] : matching stations, by id (empty if none).
+        """
+        stations = [station for station in self.stations.values() if station.name == station_name]
+        if not stations and ':' in str(station_name):
+            namespace, name = str(station_name).split(':', 1)
+            if namespace in self.networks:
+                stations = [station for station in self.stations.values()
+                            if station.name == name and station.id.startswith(f"{namespace}:")]
+        return sorted(stations, key=lambda station: station.id)
+
+
+    def import_networks(self, networks, interchanges_filepath=None):
+        """ Import several networks into this map, each in its own namespace.
+
+        Args:
+            networks (dict) : key: namespace (str), value: path to the JSON
+                file of that network
+            interchanges_filepath (str) : optional JSON file declaring the
+                connections between networks (see import_interchanges_from_json)
+
+        Returns:
+            None
+        """
+        for namespace, filepath in networks.items():
+            self.import_from_json(filepath, namespace=namespace)
+        if interchanges_filepath is not None:
+            self.import_interchanges_from_json(interchanges_filepath)
+
+
+    def import_interchanges_from_json(self, filepath):
+        """ Import interchange links between already imported networks.
+
+        The JSON file has the form:
+        {"interchanges": [
+            {"station1": "tube:11", "station2": "dlr:4", "time": "3"},
+            ...
+        ]}
+        where station ids are namespaced ids. Links to unknown stations, and
+        entries that are not objects or whose time is not a whole, non
+        negative number of minutes, are ignored. If filepath is invalid,
+        nothing is updated.
+
+        Args:
+            filepath (str) : path to the JSON file
+
+        Returns:
+            None
+        """
+        try:
+            with open(filepath, 'r') as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+
+        if not isinstance(data, dict):
+            return
+        interchanges = data.get('interchanges', [])
+        if not isinstance(interchanges, list):
+            return
+        for interchange_info in interchanges:
+            if not isinstance(interchange_info, dict):
+                continue
+            try:
+                time = int(interchange_info.get('time', 0))
+            except (TypeError, ValueError):
+                continue
+            if time < 0:
+                continue
+            self._add_interchange(str(interchange_info.get('station1')),
+                                  str(interchange_info.get('station2')), time)
+        # Once for the whole file
+        self.topology.build(self.lines, self.connections)
+
+
+    def add_interchange(self, station1_id, station2_id, time):
+        """ Declare a walking interchange between two stations.
 
+        The interchange is added as a Connection on the special
+        "Interchange" line, so routing treats it like any other connection.
+        The topology index is rebuilt to include it (the name and spatial
+        indexes do not depend on connections). PathFinders built before
+        keep their own graph: build a new one to route through it.
 
-    def import_from_json(self, filepath):
+        Args:
+            station1_id (str) : id of the first station
+            station2_id (str) : id of the second station
+            time (int) : time needed (in minutes) to change
+
+        Returns:
+            Connection : the new connection, or None if a station is unknown.
+        """
+        connection = self._add_interchange(station1_id, station2_id, time)
+        if connection is not None:
+            self.topology.build(self.lines, self.connections)
+        return connection
+
+
+    def _add_interchange(self, station1_id, station2_id, time):
+        station1 = self.stations.get(station1_id)
+        station2 = self.stations.get(station2_id)
+        if not station1 or not station2:
+            return None
+
+        line = self.lines.get(INTERCHANGE_LINE_ID)
+        if line is None:
+            line = Line(id=INTERCHANGE_LINE_ID, name=INTERCHANGE_LINE_NAME)
+            self.lines[INTERCHANGE_LINE_ID] = line
+
+        connection = Connection(stations={station1, station2}, line=line, time=time)
+        self.connections.append(connection)
+        return connection
+
+
+    def import_profiles_from_json(self, filepath, namespace=None):
+        """ Import time-of-day travel time profiles (see TimeProfiles).
+
+        Args:
+            filepath (str) : path to the JSON file of the profiles. If 
+                filepath is invalid, nothing is updated.
+            namespace (str) : namespace of the network the profiles apply to
+
+        Returns:
+            None
+        """
+        try:
+            with open(filepath, 'r') as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+
+        if isinstance(data, dict):
+            self.profiles.import_from_json_data(data, lambda raw_id: self.make_id(raw_id, namespace))
+
+
+    def import_from_json(self, filepath, namespace=None):
         """ Import tube map information from a JSON file.
         
         During the import process, the `stations`, `lines` and `connections` 
@@ -43,6 +214,9 @@ class TubeMap:
                 containing all the information about the tube map graph to 
                 import. If filepath is invalid, no attribute should be updated, 
                 and no error should be raised.
+            namespace (str) : if given, station and line ids are prefixed with
+                "<namespace>:" so several networks can be imported in the 
+                same map without id collisions.
 
         Returns:
             None
@@ -52,17 +226,39 @@ class TubeMap:
                 data = json.load(f)
 
             # Process the data only if it is a valid, non-empty dictionary
-            if isinstance(data, dict) and data:
-                self.import_stations(data.get('stations', []))
-                self.import_lines(data.get('lines', []))
-                self.import_connections(data.get('connections', []))
+            if self.import_from_data(data, namespace) and namespace is not None:
+                self.networks[namespace] = filepath
 
         except (FileNotFoundError, json.JSONDecodeError):
             # If file is not found or invalid JSON, just return without updating
             return
+
+
+    def import_from_data(self, data, namespace=None):
+        """ Import tube map information from already decoded JSON data.
+
+        Args:
+            data (dict) : same content as the JSON files read by
+                import_from_json()
+            namespace (str) : see import_from_json()
+
+        Returns:
+            bool : True if the data was imported, False if it is not a valid,
+                non-empty dictionary (nothing is updated then).
+        """
+        if not isinstance(data, dict) or not data:
+            return False
+
+        self.import_stations(data.get('stations', []), namespace)
+        self.import_lines(data.get('lines', []), namespace)
+        self.import_connections(data.get('connections', []), namespace)
+        self.spatial_index.build(self.coordinates)
+        self.name_index.build(station.name for station in self.stations.values())
+        self.topology.build(self.lines, self.connections)
+        return True
     
 
-    def import_stations(self, stations_data):
+    def import_stations(self, stations_data, namespace=None):
 
         for station_info in stations_data:  # Iterate over the list directly
 
@@ -84,20 +280,38 @@ class TubeMap:
                 zones.add(int(zone))
             
             # Create Station instance (assuming Station class is defined)
+            # Names are interned: networks often share station names
+            station_id = self.make_id(station_id, namespace)
             station = Station(
-                id=str(station_id),
-                name=str(station_info.get('name')),
+                id=station_id,
+                name=sys.intern(str(station_info.get('name'))),
                 zones=zones,
             )
-            self.stations[str(station_id)] = station
+            self.stations[station_id] = station
+            self.import_coordinates(station_id, station_info)
 
 
-    def import_lines(self, lines_data):
+    def import_coordinates(self, station_id, station_info):
+        """ Record the (latitude, longitude) of a station, if available. """
+        try:
+            latitude = float(station_info['latitude'])
+            longitude = float(station_info['longitude'])
+        except (KeyError, TypeError, ValueError):
+            # Coordinates are optional: the station just won't be indexed
+            return
+        self.coordinates[station_id] = (latitude, longitude)
+
+
+    def import_lines(self, lines_data, namespace=None):
 
         for line_info in lines_data:
             # Get the Line ID and name
             line_id = line_info.get('line')
             line_name = line_info.get('name')
+            if namespace is not None:
+                line_id = self.make_id(line_id, namespace)
+            if isinstance(line_name, str):
+                line_name = sys.intern(line_name)
 
             # Create Line instance
             line = Line(
@@ -105,15 +319,23 @@ class TubeMap:
                 name=line_name,
             )
             self.lines[line_id] = line
+            self.import_colour(line_id, line_info)
+
+
+    def import_colour(self, line_id, line_info):
+        """ Record the colour of a line (hexadecimal RGB), if available. """
+        colour = str(line_info.get('colour') or '').lstrip('#')
+        if len(colour) == 6 and all(digit in string.hexdigits for digit in colour):
+            self.line_colours[line_id] = f"#{colour.upper()}"
 
 
-    def import_connections(self, connections_data):
+    def import_connections(self, connections_data, namespace=None):
 
         for connection_info in connections_data:
             # Get the station objects from the station IDs
-            station1 = self.stations.get(str(connection_info['station1']))
-            station2 = self.stations.get(str(connection_info['station2']))
-            line = self.lines.get(str(connection_info.get('line')))
+            station1 = self.stations.get(self.make_id(connection_info['station1'], namespace))
+            station2 = self.stations.get(self.make_id(connection_info['station2'], namespace))
+            line = self.lines.get(self.make_id(connection_info.get('line'), namespace))
             time=int(connection_info.get('time'))
 
             if station1 and station2 and line:  # Ensure all objects exist
@@ -0,0 +1,315 @@
+import math
+
+# Colour of the lines without one in the JSON file
+DEFAULT_COLOUR = "#888888"
+
+# Kinds of map items, from the coarsest level of detail to the finest
+KINDS = ("segment", "interchange", "stop", "label")
+
+# Pixel length of a typical connection from which each kind is drawn
+LEVELS_OF_DETAIL = {"segment": 0, "interchange": 8, "stop": 16, "label": 48}
+
+
+class MapLayers:
+    """ Projected geometry of a TubeMap, bucketed into square tiles.
+
+    Stations are placed with the projection of the TubeMap's spatial index
+    (metres, y pointing north). Every connection becomes a segment in the
+    colour of its line, stored in the tile of its midpoint, and every
+    station a point in the tile containing it, so that a view only has to
+    look at the tiles overlapping its viewport.
+
+    Attributes:
+        points (dict) : key: station id, value: (x, y) in metres
+        tiles (dict) : key: (column, row), value: {kind: list of items},
+            see KINDS. Segments are (x1, y1, x2, y2, colour), stations
+            (x, y, name).
+        bounds (tuple) : (min_x, min_y, max_x, max_y) of the stations
+        tile_size (float) : side of a tile (in metres)
+        reach (float) : how far a segment can stick out of its tile
+        typical_length (float) : median length of a segment (in metres)
+    """
+
+    def __init__(self, tubemap, tiles=8):
+        """
+        Args:
+            tubemap (TubeMap) : the map to draw
+            tiles (int) : number of tiles across the longest side of the map
+        """
+        self.points = dict(tubemap.spatial_index.points)
+        self.tiles = {}
+        self.bounds = None
+        self.tile_size = 1.0
+        self.reach = 0.0
+        self.typical_length = 0.0
+        if not self.points:
+            return
+
+        xs = [x for x, _ in self.points.values()]
+        ys = [y for _, y in self.points.values()]
+        self.bounds = (min(xs), min(ys), max(xs), max(ys))
+        self.tile_size = max(self.bounds[2] - self.bounds[0], self.bounds[3] - self.bounds[1], 1.0) / tiles
+
+        lengths = []
+        for connection in tubemap.connections:
+            if len(connection.stations) != 2:
+                continue
+            first, second = (self.points.get(station.id) for station in connection.stations)
+            if first is None or second is None:
+                continue
+            colour = tubemap.line_colours.get(connection.line.id, DEFAULT_COLOUR)
+            tile = self.get_tile((first[0] + second[0]) / 2, (first[1] + second[1]) / 2)
+            self.add(tile, "segment", (first[0], first[1], second[0], second[1], colour))
+            length = math.hypot(second[0] - first[0], second[1] - first[1])
+            lengths.append(length)
+            self.reach = max(self.reach, length / 2)
+        if lengths:
+            lengths.sort()
+            self.typical_length = lengths[len(lengths) // 2]
+
+        for station_id, (x, y) in self.points.items():
+            kind = "interchange" if len(tubemap.topology.lines_at(station_id)) > 1 else "stop"
+            self.add(self.get_tile(x, y), kind, (x, y, tubemap.stations[station_id].name))
+
+
+    def add(self, tile, kind, item):
+        self.tiles.setdefault(tile, {}).setdefault(kind, []).append(item)
+
+
+    def get_tile(self, x, y):
+        """ Return the (column, row) of the tile containing (x, y). """
+        return (math.floor(x / self.tile_size), math.floor(y / self.tile_size))
+
+
+    def tiles_in(self, min_x, min_y, max_x, max_y):
+        """ Return the tiles that may have items inside a rectangle (metres). """
+        first = self.get_tile(min_x - self.reach, min_y - self.reach)
+        last = self.get_tile(max_x + self.reach, max_y + self.reach)
+        if (last[0] - first[0] + 1) * (last[1] - first[1] + 1) > len(self.tiles):
+            return [tile for tile in self.tiles
+                    if first[0] <= tile[0] <= last[0] and first[1] <= tile[1] <= last[1]]
+        return [(column, row) for column in range(first[0], last[0] + 1)
+                for row in range(first[1], last[1] + 1) if (column, row) in self.tiles]
+
+
+class MapView:
+    """ Geographic map of a TubeMap on a Tk canvas, with a route overlay.
+
+    The base map is drawn in cached layers: the items of a tile are
+    created the first time the tile is in view at a level of detail
+    showing them, then only hidden or shown again. Panning and zooming
+    move and scale the existing items, and only draw the tiles or kinds
+    of items that come into view. Stations and their names appear as the
+    typical connection gets longer on screen (see LEVELS_OF_DETAIL), so a
+    zoomed-out view of a large network only holds its lines.
+
+    Showing a route only replaces the few items of the overlay.
+
+    Example:
+        canvas = tk.Canvas(root, width=800, height=600, background="white")
+        view = MapView(canvas, tubemap)
+        view.fit()
+        view.show_route(path_finder.get_shortest_path("Stockwell", "Hammersmith"))
+    """
+
+    def __init__(self, canvas, tubemap, tiles=8, margin=20):
+        """
+        Args:
+            canvas (tkinter.Canvas) : canvas to draw on
+            tubemap (TubeMap) : the map to draw
+            tiles (int) : see MapLayers
+            margin (int) : pixels left around the map by fit()
+        """
+        self.canvas = canvas
+        self.tubemap = tubemap
+        self.layers = MapLayers(tubemap, tiles)
+        self.margin = margin
+
+        # Screen = (x - origin_x, origin_y - y) * scale
+        self.scale = 1.0
+        self.origin_x = 0.0
+        self.origin_y = 0.0
+
+        self.drawn = {}  # key: (tile, kind), value: True if shown
+        self.route = None
+        self.stats = {"refreshes": 0, "tiles_drawn": 0, "items_drawn": 0, "route_items": 0}
+
+
+    def size(self):
+        """ Return the (width, height) of the canvas, in pixels. """
+        width, height = self.canvas.winfo_width(), self.canvas.winfo_height()
+        if width <= 1 or height <= 1:  # not mapped yet: use the requested size
+            width, height = int(self.canvas.cget("width")), int(self.canvas.cget("height"))
+        return width, height
+
+
+    def to_screen(self, x, y):
+        return (x - self.origin_x) * self.scale, (self.origin_y - y) * self.scale
+
+
+    def to_world(self, screen_x, screen_y):
+        return self.origin_x + screen_x / self.scale, self.origin_y - screen_y / self.scale
+
+
+    def fit(self):
+        """ Show the whole map in the canvas, redrawing it from scratch. """
+        if self.layers.bounds is None:
+            return
+        width, height = self.size()
+        min_x, min_y, max_x, max_y = self.layers.bounds
+        self.scale = min((width - 2 * self.margin) / max(max_x - min_x, 1.0),
+                         (height - 2 * self.margin) / max(max_y - min_y, 1.0))
+        self.scale = max(self.scale, 1e-9)
+        # Centre the map
+        self.origin_x = (min_x + max_x) / 2 - width / 2 / self.scale
+        self.origin_y = (min_y + max_y) / 2 + height / 2 / self.scale
+
+        self.canvas.delete("all")
+        self.drawn = {}
+        self.refresh()
+        if self.route is not None:
+            self.show_route(self.route)
+
+
+    def zoom(self, factor, screen_x, screen_y):
+        """ Zoom by `factor` around a point of the canvas.
+
+        Segments are scaled in place. Station markers and names keep their
+        size, so they are dropped and drawn again for the visible tiles
+        only, as is the route overlay.
+        """
+        x, y = self.to_world(screen_x, screen_y)
+        self.scale *= factor
+        self.origin_x = x - screen_x / self.scale
+        self.origin_y = y + screen_y / self.scale
+        self.canvas.scale("segment", screen_x, screen_y, factor, factor)
+        for kind in KINDS[1:]:
+            self.canvas.delete(kind)
+        self.drawn = {key: shown for key, shown in self.drawn.items() if key[1] == "segment"}
+        self.refresh()
+        if self.route is not None:
+            self.show_route(self.route)
+
+
+    def pan(self, dx, dy):
+        """ Move the map by (dx, dy) pixels. """
+        self.origin_x -= dx / self.scale
+        self.origin_y += dy / self.scale
+        self.canvas.move("all", dx, dy)
+        self.refresh()
+
+
+    def visible_kinds(self):
+        """ Kinds of items drawn at the current zoom (see LEVELS_OF_DETAIL). """
+        length = self.layers.typical_length * self.scale
+        return [kind for kind in KINDS if length >= LEVELS_OF_DETAIL[kind]]
+
+
+    def refresh(self):
+        """ Draw or show the visible tiles, and hide the others. """
+        self.stats["refreshes"] += 1
+        width, height = self.size()
+        min_x, max_y = self.to_world(0, 0)
+        max_x, min_y = self.to_world(width, height)
+        visible = set(self.layers.tiles_in(min_x, min_y, max_x, max_y))
+        kinds = self.visible_kinds()
+
+        for tile in visible:
+            if not any((tile, kind) in self.drawn for kind in KINDS):
+                self.stats["tiles_drawn"] += 1
+            for kind in kinds:
+                shown = self.drawn.get((tile, kind))
+                if shown is None:
+                    self.draw_items(tile, kind)
+                elif not shown:
+                    self.canvas.itemconfigure(self.get_tag(tile, kind), state="normal")
+                self.drawn[(tile, kind)] = True
+
+        for (tile, kind), shown in self.drawn.items():
+            if shown and (tile not in visible or kind not in kinds):
+                self.canvas.itemconfigure(self.get_tag(tile, kind), state="hidden")
+                self.drawn[(tile, kind)] = False
+        self.canvas.tag_raise("route")
+
+
+    def get_tag(self, tile, kind):
+        return f"t{tile[0]}_{tile[1]}:{kind}"
+
+
+    def draw_items(self, tile, kind):
+        """ Create the canvas items of one kind in a tile. """
+        tags = ("base", kind, self.get_tag(tile, kind))
+        canvas = self.canvas
+        items = self.layers.tiles[tile]
+        # Every station is named
+        items = items.get("interchange", []) + items.get("stop", []) if kind == "label" else items.get(kind, [])
+        for item in items:
+            if kind == "segment":
+                x1, y1 = self.to_screen(item[0], item[1])
+                x2, y2 = self.to_screen(item[2], item[3])
+                canvas.create_line(x1, y1, x2, y2, fill=item[4], width=3, capstyle="round", tags=tags)
+                continue
+            x, y = self.to_screen(item[0], item[1])
+            if kind == "interchange":
+                canvas.create_oval(x - 4, y - 4, x + 4, y + 4, fill="white", outline="black", width=2, tags=tags)
+            elif kind == "stop":
+                canvas.create_oval(x - 2, y - 2, x + 2, y + 2, fill="white", outline="black", tags=tags)
+            else:
+                canvas.create_text(x + 6, y, text=item[2], anchor="w", font=("Helvetica", 8), tags=tags)
+        self.stats["items_drawn"] += len(items)
+        # New items go below the stations and names drawn before
+        if kind == "segment":
+            canvas.tag_lower(tags[2])
+
+
+    def show_route(self, route):
+        """ Draw `route` over the map, replacing the previous route.
+
+        Every run of legs on the same line is one polyline in the colour of
+        the line, and the first and last stations are marked.
+
+        Args:
+            route (Route) : a route of a PathFinder (None clears the overlay)
+
+        Returns:
+            int : number of canvas items of the overlay.
+        """
+        self.clear_route()
+        self.route = route
+        if route is None:
+            return 0
+
+        points = [self.layers.points.get(station_id) for station_id in route.station_ids]
+        tags = ("route",)
+        count = 0
+        lines = route.lines
+        run_start = 0
+        for leg in range(1, len(lines) + 1):
+            if leg < len(lines) and lines[leg].id == lines[run_start].id:
+                continue
+            run = [point for point in points[run_start:leg + 1] if point is not None]
+            if len(run) >= 2:
+                colour = self.tubemap.line_colours.get(lines[run_start].id, DEFAULT_COLOUR)
+                coordinates = [value for point in run for value in self.to_screen(*point)]
+                self.canvas.create_line(*coordinates, fill="black", width=9, capstyle="round",
+                                        joinstyle="round", tags=tags)
+                self.canvas.create_line(*coordinates, fill=colour, width=5, capstyle="round",
+                                        joinstyle="round", tags=tags)
+                count += 2
+            run_start = leg
+
+        for point in (points[0], points[-1]):
+            if point is not None:
+                x, y = self.to_screen(*point)
+                self.canvas.create_oval(x - 6, y - 6, x + 6, y + 6, fill="white", outline="black",
+                                        width=3, tags=tags)
+                count += 1
+        self.canvas.tag_raise("route")
+        self.stats["route_items"] = count
+        return count
+
+
+    def clear_route(self):
+        self.canvas.delete("route")
+        self.route = None
+        self.stats["route_items"] = 0
@@ -0,0 +1,252 @@
+import re
+
+# Characters dropped from names before indexing ("King's" -> "kings")
+_DROPPED = re.compile(r"['’.]")
+# Anything else that is not a letter or a digit separates words
+_SEPARATORS = re.compile(r"[^0-9a-z]+")
+
+
+def normalise_name(name):
+    """ Lower-case a station name and strip its punctuation.
+
+    For instance "St. John's Wood" and "st johns  wood" both become
+    "st johns wood", and "&" is spelt "and".
+    """
+    name = _DROPPED.sub("", str(name).lower().replace("&", " and "))
+    return " ".join(_SEPARATORS.split(name)).strip()
+
+
+def edit_distance(first, second):
+    """ Levenshtein distance between two strings. """
+    if len(first) < len(second):
+        first, second = second, first
+    previous = list(range(len(second) + 1))
+    for i, first_char in enumerate(first, 1):
+        current = [i]
+        for j, second_char in enumerate(second, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1,
+                               previous[j - 1] + (first_char != second_char)))
+        previous = current
+    return previous[-1]
+
+
+def trigrams(key):
+    """ Trigrams of a normalised name, padded so that every character counts. """
+    padded = f"  {key} "
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+def default_max_distance(query):
+    """ Number of typos tolerated in a normalised query of this length. """
+    if len(query) <= 2:
+        return 0
+    if len(query) <= 5:
+        return 1
+    return 2
+
+
+class _TrieNode:
+    __slots__ = ("children", "entries")
+
+    def __init__(self):
+        self.children = {}  # key: character, value: _TrieNode
+        self.entries = set()  # (normalised name, word position) of every key below this node
+
+
+class NameIndex:
+    """ Typo-tolerant index of the station names, for completion and lookup.
+
+    Names are normalised (see normalise_name) and indexed twice:
+    - a prefix trie over the full name and over every word suffix ("cross st
+      pancras", "st pancras", "pancras"), walked with one row of the
+      edit-distance table per node, so that a partial query with typos
+      ("picadilly cir") still finds its completions. The first letter of
+      the query must be right, which keeps the walk to a small subtree.
+    - a trigram index over the full names, to resolve a complete but
+      misspelt name: k typos destroy at most 3k trigrams, so only the names
+      sharing enough trigrams with the query get their edit distance
+      computed.
+    """
+
+    def __init__(self):
+        self.names = {}  # key: normalised name, value: list of original names
+        self.root = _TrieNode()
+        self.trigrams = {}  # key: trigram, value: set of normalised names
+
+
+    def build(self, names):
+        """ (Re)build the index.
+
+        Args:
+            names (iterable[str]) : station names (duplicates are fine)
+
+        Returns:
+            None
+        """
+        self.names = {}
+        self.root = _TrieNode()
+        self.trigrams = {}
+        for name in names:
+            self.add(name)
+
+
+    def add(self, name):
+        """ Add one station name to the index. """
+        key = normalise_name(name)
+        if not key:
+            return
+        originals = self.names.setdefault(key, [])
+        if name in originals:
+            return
+        originals.append(name)
+        if len(originals) > 1:
+            return  # same normalised name, already indexed
+
+        # Trie over the full name and every word suffix
+        words = key.split(" ")
+        for position in range(len(words)):
+            entry = (key, position)
+            node = self.root
+            node.entries.add(entry)
+            for char in " ".join(words[position:]):
+                node = node.children.setdefault(char, _TrieNode())
+                node.entries.add(entry)
+
+        for trigram in set(trigrams(key)):
+            self.trigrams.setdefault(trigram, set()).add(key)
+
+
+    def __len__(self):
+        return len(self.names)
+
+
+    def suggest(self, query, limit=5, max_distance=None):
+        """ Rank the station names completing a (possibly misspelt) query.
+
+        Matches are ranked by number of typos, then names starting with the
+        query before names with a later word starting with it, then shorter
+        names first.
+
+        Args:
+            query (str) : what the user typed so far
+            limit (int) : maximum number of suggestions
+            max_distance (int) : typos tolerated (default depends on the
+                length of the query, see default_max_distance)
+
+        Returns:
+            list[str] : original station names, best first.
+        """
+        best = self.completions(query, max_distance)
+        ranked = sorted(best, key=lambda key: (best[key], len(key), key))
+        return [name for key in ranked for name in self.names[key]][:limit]
+
+
+    def completions(self, query, max_distance=None):
+        """ Find the names completing a (possibly misspelt) query.
+
+        Returns:
+            dict : key: normalised name, value: (number of typos, True if
+                the match starts at a later word of the name).
+        """
+        query = normalise_name(query)
+        if not query:
+            return {}
+        if max_distance is None:
+            max_distance = default_max_distance(query)
+
+        best = {}  # key: normalised name, value: (distance, word position)
+
+        def record(node, distance):
+            for key, position in node.entries:
+                rank = (distance, position > 0)
+                if key not in best or rank < best[key]:
+                    best[key] = rank
+
+        # Depth-first walk, one row of the edit-distance table per node. Only
+        # the band of cells within max_distance of the diagonal can stay
+        # under max_distance, the others are capped.
+        first = self.root.children.get(query[0])
+        if first is None:
+            return {}
+        length, cap = len(query), max_distance + 1
+        stack = [(first, query[0], 1, [min(j, cap) for j in range(length + 1)])]
+        while stack:
+            node, char, depth, previous = stack.pop()
+            row = [cap] * (length + 1)
+            row[0] = min(depth, cap)
+            for j in range(max(1, depth - max_distance), min(length, depth + max_distance) + 1):
+                # Plain comparisons: this is the hot loop of the completion
+                value = previous[j - 1] + (query[j - 1] != char)
+                if previous[j] < value:
+                    value = previous[j] + 1
+                if row[j - 1] < value:
+                    value = row[j - 1] + 1
+                row[j] = value if value < cap else cap
+
+            if row[-1] <= max_distance:
+                record(node, row[-1])
+            # Going deeper can still lower the distance of the whole query
+            if min(row) < row[-1]:
+                stack.extend((child, child_char, depth + 1, row) for child_char, child in node.children.items())
+        return best
+
+
+    def lookup(self, query, max_distance=None):
+        """ Return the names within max_distance typos of a complete name.
+
+        Returns:
+            list[tuple(int, str)] : (distance, normalised name), closest first.
+        """
+        query = normalise_name(query)
+        if not query:
+            return []
+        if max_distance is None:
+            max_distance = default_max_distance(query)
+
+        shared = {}
+        query_trigrams = set(trigrams(query))
+        for trigram in query_trigrams:
+            for key in self.trigrams.get(trigram, ()):
+                shared[key] = shared.get(key, 0) + 1
+
+        # Every typo destroys at most 3 trigrams of the query
+        minimum_shared = len(query_trigrams) - 3 * max_distance
+        matches = []
+        for key, count in shared.items():
+            if count < minimum_shared or abs(len(key) - len(query)) > max_distance:
+                continue
+            distance = edit_distance(query, key)
+            if distance <= max_distance:
+                matches.append((distance, key))
+        return sorted(matches, key=lambda match: (match[0], len(match[1]), match[1]))
+
+
+    def resolve(self, query):
+        """ Return the station name a user meant.
+
+        An exact (normalised) match wins, then the closest complete name
+        within the tolerated typos (see lookup), then the completion of a
+        partial name ("Kings Cros", "walthamstow") when it needs fewer
+        typos than any other one.
+
+        Returns:
+            str : original station name, or None if nothing is close enough
+                or if several names are equally close.
+        """
+        originals = self.names.get(normalise_name(query))
+        if originals:
+            if query in originals:
+                return query
+            return originals[0] if len(originals) == 1 else None
+        matches = self.lookup(query)
+        if matches:
+            closest = [key for distance, key in matches if distance == matches[0][0]]
+        else:
+            completions = self.completions(query)
+            if not completions:
+                return None
+            fewest = min(distance for distance, _ in completions.values())
+            closest = [key for key, (distance, _) in completions.items() if distance == fewest]
+        if len(closest) > 1 or len(self.names[closest[0]]) > 1:
+            return None
+        return self.names[closest[0]][0]
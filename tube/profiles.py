@@ -0,0 +1,158 @@
+import datetime
+
+
+class TimeBucket:
+    """ A named period of the day, e.g. the morning peak. """
+
+    def __init__(self, name, start, end):
+        """
+        Args:
+            name (str) : bucket name
+            start (int) : first minute of the bucket (minutes after midnight)
+            end (int) : minute the bucket ends (excluded). If end <= start,
+                the bucket wraps around midnight.
+        """
+        self.name = name
+        self.start = start
+        self.end = end
+
+    def contains(self, minute):
+        if self.start < self.end:
+            return self.start <= minute < self.end
+        return minute >= self.start or minute < self.end
+
+    def __repr__(self):
+        return f"TimeBucket({self.name}, {format_minutes(self.start)}-{format_minutes(self.end)})"
+
+
+class TimeProfiles:
+    """ Time-of-day dependent travel times.
+
+    Profiles split the day into buckets and, for every bucket, give
+    per-line multipliers of the scheduled connection times and per-connection
+    overrides. They are only read when precomputing the weight arrays of
+    every bucket, never during a search.
+
+    The JSON file has the form:
+    {
+        "buckets": [
+            {"name": "am_peak", "start": "07:00", "end": "10:00"},
+            {"name": "night", "start": "22:00", "end": "05:00"}
+        ],
+        "lines": {
+            "1": {"am_peak": 1.25, "night": 0.9}
+        },
+        "connections": [
+            {"station1": "11", "station2": "163", "line": "1",
+             "bucket": "am_peak", "time": "3"}
+        ]
+    }
+    """
+
+    def __init__(self):
+        self.buckets = []  # list of TimeBucket, first match wins
+        self.multipliers = {}  # key: (line id, bucket name), value: float
+        self.overrides = {}  # key: (frozenset of station ids, line id, bucket name), value: time
+
+
+    def import_from_json_data(self, data, make_id=str):
+        """ Import profiles from the decoded JSON data.
+
+        Invalid entries are skipped.
+
+        Args:
+            data (dict) : decoded JSON, as described in the class docstring
+            make_id (callable) : maps a raw station or line id of the file to
+                the id used in the TubeMap (e.g. to add a namespace)
+
+        Returns:
+            None
+        """
+        for bucket_info in data.get('buckets', []):
+            try:
+                bucket = TimeBucket(str(bucket_info['name']),
+                                    parse_minutes(bucket_info['start']),
+                                    parse_minutes(bucket_info['end']))
+            except (KeyError, TypeError, ValueError):
+                continue
+            self.buckets.append(bucket)
+
+        for line_id, multipliers in data.get('lines', {}).items():
+            for bucket_name, multiplier in multipliers.items():
+                try:
+                    self.multipliers[(make_id(line_id), bucket_name)] = float(multiplier)
+                except (TypeError, ValueError):
+                    continue
+
+        for override_info in data.get('connections', []):
+            try:
+                key = (frozenset({make_id(override_info['station1']), make_id(override_info['station2'])}),
+                       make_id(override_info['line']), str(override_info['bucket']))
+                self.overrides[key] = float(override_info['time'])
+            except (KeyError, TypeError, ValueError):
+                continue
+
+
+    @property
+    def bucket_names(self):
+        return [bucket.name for bucket in self.buckets]
+
+
+    def find_bucket(self, departure_time):
+        """ Return the name of the bucket containing `departure_time`.
+
+        Args:
+            departure_time (datetime.time, datetime.datetime, str or int) :
+                time of day, as a time/datetime, a "HH:MM" string or minutes
+                after midnight
+
+        Returns:
+            str : bucket name, or None if no bucket contains that time.
+        """
+        minute = parse_minutes(departure_time) % (24 * 60)
+        for bucket in self.buckets:
+            if bucket.contains(minute):
+                return bucket.name
+        return None
+
+
+    def connection_time(self, connection, bucket_name):
+        """ Travel time of a connection during a bucket.
+
+        An override for the connection wins over the line multiplier, which
+        wins over the scheduled time.
+        """
+        station_ids = frozenset(station.id for station in connection.stations)
+        override = self.overrides.get((station_ids, connection.line.id, bucket_name))
+        if override is not None:
+            return override
+        return connection.time * self.multipliers.get((connection.line.id, bucket_name), 1.0)
+
+
+def parse_minutes(value):
+    """ Convert a time of day to minutes after midnight.
+
+    Args:
+        value (datetime.time, datetime.datetime, str or int) : "HH:MM"
+            strings and minute counts are accepted too
+
+    Returns:
+        int : minutes after midnight.
+
+    Raises:
+        ValueError : if the value cannot be understood as a time of day.
+    """
+    if isinstance(value, datetime.datetime):
+        value = value.time()
+    if isinstance(value, datetime.time):
+        return value.hour * 60 + value.minute
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str) and ':' in value:
+        hours, minutes = value.split(':', 1)
+        return int(hours) * 60 + int(minutes)
+    raise ValueError(f"Invalid time of day: {value!r}")
+
+
+def format_minutes(minute):
+    return f"{minute // 60:02d}:{minute % 60:02d}"
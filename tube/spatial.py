@@ -0,0 +1,197 @@
+import heapq
+import math
+
+# Mean radius of the Earth (in metres)
+EARTH_RADIUS = 6371008.8
+
+
+class SpatialIndex:
+    """ A uniform grid indexing station coordinates in projected metres.
+
+    Coordinates are projected with an equirectangular projection centred on
+    the mean latitude of the indexed stations, which is accurate to well
+    under a metre at the scale of a city network. Each station is then put
+    in a square grid cell of `cell_size` metres, so that nearest-station and
+    within-radius queries only look at a handful of cells around the query
+    point.
+    """
+
+    def __init__(self, cell_size=500):
+        """
+        Args:
+            cell_size (float) : side of a grid cell (in metres)
+        """
+        self.cell_size = cell_size
+        self.cells = {}  # key: (column, row), value: list of (station_id, x, y)
+        self.points = {}  # key: station_id, value: (x, y)
+        self.reference_latitude = 0.0
+        self.reference_longitude = 0.0
+        self.bounds = None  # (min_column, min_row, max_column, max_row)
+
+
+    def build(self, coordinates):
+        """ (Re)build the index from station coordinates.
+
+        Args:
+            coordinates (dict) : key: station id (str),
+                value: (latitude, longitude) in degrees
+
+        Returns:
+            None
+        """
+        self.cells = {}
+        self.points = {}
+        self.bounds = None
+
+        if not coordinates:
+            return
+
+        # Centre the projection on the network
+        self.reference_latitude = sum(lat for lat, _ in coordinates.values()) / len(coordinates)
+        self.reference_longitude = sum(lon for _, lon in coordinates.values()) / len(coordinates)
+
+        for station_id, (latitude, longitude) in coordinates.items():
+            x, y = self.project(latitude, longitude)
+            self.points[station_id] = (x, y)
+            self.cells.setdefault(self.get_cell(x, y), []).append((station_id, x, y))
+
+        columns = [column for column, _ in self.cells]
+        rows = [row for _, row in self.cells]
+        self.bounds = (min(columns), min(rows), max(columns), max(rows))
+
+
+    def project(self, latitude, longitude):
+        """ Project a (latitude, longitude) pair to (x, y) metres. """
+        cos_reference = math.cos(math.radians(self.reference_latitude))
+        x = EARTH_RADIUS * math.radians(longitude - self.reference_longitude) * cos_reference
+        y = EARTH_RADIUS * math.radians(latitude - self.reference_latitude)
+        return x, y
+
+
+    def get_cell(self, x, y):
+        """ Return the (column, row) of the grid cell containing (x, y). """
+        return (math.floor(x / self.cell_size), math.floor(y / self.cell_size))
+
+
+    def nearest(self, latitude, longitude, k=1):
+        """ Find the k stations closest to a point.
+
+        The grid is scanned ring by ring around the cell of the query point,
+        starting at the first ring reaching the populated cells and only
+        visiting the cells within them. Points further from the network
+        than its own size are answered with a linear scan instead, which is
+        then cheaper than the rings.
+        A station in ring r+1 is at least r * cell_size away, so the scan
+        stops as soon as the k-th best distance is below that bound.
+
+        Args:
+            latitude (float) : latitude of the query point (in degrees)
+            longitude (float) : longitude of the query point (in degrees)
+            k (int) : number of stations to return
+
+        Returns:
+            list[tuple(str, float)] : up to k (station_id, distance in metres)
+                pairs, sorted by increasing distance.
+        """
+        if not self.points or k <= 0:
+            return []
+
+        x, y = self.project(latitude, longitude)
+        column, row = self.get_cell(x, y)
+        min_ring, max_ring = self.get_min_ring(column, row), self.get_max_ring(column, row)
+        min_column, min_row, max_column, max_row = self.bounds
+        if min_ring > max(max_column - min_column, max_row - min_row):
+            nearest = heapq.nsmallest(k, ((math.hypot(px - x, py - y), station_id)
+                                          for station_id, (px, py) in self.points.items()))
+            return [(station_id, distance) for distance, station_id in nearest]
+
+        candidates = []
+        for ring in range(min_ring, max_ring + 1):
+            for station_id, px, py in self.get_ring(column, row, ring):
+                candidates.append((math.hypot(px - x, py - y), station_id))
+
+            if len(candidates) >= k:
+                candidates.sort()
+                candidates = candidates[:k]
+                # No station left in the outer rings can be closer
+                if candidates[-1][0] <= ring * self.cell_size:
+                    break
+
+        candidates.sort()
+        return [(station_id, distance) for distance, station_id in candidates[:k]]
+
+
+    def within_radius(self, latitude, longitude, radius):
+        """ Find all the stations within `radius` metres of a point.
+
+        Args:
+            latitude (float) : latitude of the query point (in degrees)
+            longitude (float) : longitude of the query point (in degrees)
+            radius (float) : search radius (in metres)
+
+        Returns:
+            list[tuple(str, float)] : (station_id, distance in metres) pairs,
+                sorted by increasing distance.
+        """
+        if not self.points or radius < 0:
+            return []
+
+        x, y = self.project(latitude, longitude)
+        min_column, min_row = self.get_cell(x - radius, y - radius)
+        max_column, max_row = self.get_cell(x + radius, y + radius)
+
+        # Clip the scanned window to the populated part of the grid
+        min_column, min_row = max(min_column, self.bounds[0]), max(min_row, self.bounds[1])
+        max_column, max_row = min(max_column, self.bounds[2]), min(max_row, self.bounds[3])
+
+        found = []
+        for cell_column in range(min_column, max_column + 1):
+            for cell_row in range(min_row, max_row + 1):
+                for station_id, px, py in self.cells.get((cell_column, cell_row), ()):
+                    distance = math.hypot(px - x, py - y)
+                    if distance <= radius:
+                        found.append((distance, station_id))
+
+        found.sort()
+        return [(station_id, distance) for distance, station_id in found]
+
+
+    def get_ring(self, column, row, ring):
+        """ Yield the stations in the cells at Chebyshev distance `ring`.
+
+        Only the part of the ring inside the populated bounds is visited.
+        """
+        if ring == 0:
+            yield from self.cells.get((column, row), ())
+            return
+
+        min_column, min_row, max_column, max_row = self.bounds
+        first_column, last_column = max(column - ring, min_column), min(column + ring, max_column)
+        for cell_row in (row - ring, row + ring):
+            # Top and bottom edges of the ring
+            if min_row <= cell_row <= max_row:
+                for cell_column in range(first_column, last_column + 1):
+                    yield from self.cells.get((cell_column, cell_row), ())
+        first_row, last_row = max(row - ring + 1, min_row), min(row + ring - 1, max_row)
+        for cell_column in (column - ring, column + ring):
+            # Left and right edges (corners already visited)
+            if min_column <= cell_column <= max_column:
+                for cell_row in range(first_row, last_row + 1):
+                    yield from self.cells.get((cell_column, cell_row), ())
+
+
+    def get_min_ring(self, column, row):
+        """ Return the first ring reaching a populated cell from (column, row). """
+        min_column, min_row, max_column, max_row = self.bounds
+        return max(min_column - column, column - max_column, min_row - row, row - max_row, 0)
+
+
+    def get_max_ring(self, column, row):
+        """ Return the ring that covers every populated cell from (column, row). """
+        min_column, min_row, max_column, max_row = self.bounds
+        return max(abs(column - min_column), abs(column - max_column),
+                   abs(row - min_row), abs(row - max_row))
+
+
+    def __len__(self):
+        return len(self.points)
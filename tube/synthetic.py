@@ -0,0 +1,61 @@
+import random
+from .map import TubeMap
+
+
+def build_grid_data(rows, columns, seed=0, spacing=0.01):
+    """ Generate a synthetic grid network, in the format of london.json.
+
+    Stations sit on a rows x columns grid centred on London. Every row and
+    every column is served by its own line, with random connection times
+    between 1 and 4 minutes. Zones grow with the distance to the centre.
+    Useful to test and benchmark the routing code on larger networks.
+
+    Args:
+        rows (int) : number of grid rows
+        columns (int) : number of grid columns
+        seed (int) : seed of the random connection times
+        spacing (float) : distance between two stations (in degrees)
+
+    Returns:
+        dict : {"stations": [...], "lines": [...], "connections": [...]}
+    """
+    rng = random.Random(seed)
+    centre_row, centre_column = (rows - 1) / 2, (columns - 1) / 2
+
+    def station_id(row, column):
+        return str(row * columns + column + 1)
+
+    stations = []
+    for row in range(rows):
+        for column in range(columns):
+            ring = max(abs(row - centre_row), abs(column - centre_column))
+            stations.append({
+                "id": station_id(row, column),
+                "name": f"Grid {row}-{column}",
+                "latitude": str(51.5074 + (row - centre_row) * spacing),
+                "longitude": str(-0.1278 + (column - centre_column) * spacing),
+                "zone": str(1 + int(ring * 6 / max(centre_row, centre_column, 1))),
+            })
+
+    lines, connections = [], []
+    for row in range(rows):
+        line_id = str(row + 1)
+        lines.append({"line": line_id, "name": f"Row {row} Line", "colour": "888888"})
+        for column in range(columns - 1):
+            connections.append({"station1": station_id(row, column), "station2": station_id(row, column + 1),
+                                "line": line_id, "time": str(rng.randint(1, 4))})
+    for column in range(columns):
+        line_id = str(rows + column + 1)
+        lines.append({"line": line_id, "name": f"Column {column} Line", "colour": "444444"})
+        for row in range(rows - 1):
+            connections.append({"station1": station_id(row, column), "station2": station_id(row + 1, column),
+                                "line": line_id, "time": str(rng.randint(1, 4))})
+
+    return {"stations": stations, "lines": lines, "connections": connections}
+
+
+def make_grid_tubemap(rows, columns, seed=0):
+    """ Return a TubeMap of a synthetic grid network (see build_grid_data). """
+    tubemap = TubeMap()
+    tubemap.import_from_data(build_grid_data(rows, columns, seed))
+    return tubemap
@@ -0,0 +1,290 @@
+from collections import deque
+
+
+class StopSequence:
+    """ Stations served in order along (part of) a line.
+
+    Attributes:
+        stations (list[str]) : station ids, in order
+        cyclic (bool) : True if the last station connects back to the first
+        positions (dict) : key: station id, value: index in `stations`
+    """
+
+    __slots__ = ("stations", "cyclic", "positions")
+
+    def __init__(self, stations, cyclic=False):
+        self.stations = stations
+        self.cyclic = cyclic
+        self.positions = {station_id: position for position, station_id in enumerate(stations)}
+
+    def __len__(self):
+        return len(self.stations)
+
+    def __repr__(self):
+        kind = "cyclic " if self.cyclic else ""
+        return f"StopSequence({kind}{self.stations[0]} .. {self.stations[-1]}, {len(self.stations)} stops)"
+
+
+    def offset(self, first, second):
+        """ Signed number of stops from `first` to `second`, the short way
+        round on a cyclic sequence (both must be on the sequence). """
+        offset = self.positions[second] - self.positions[first]
+        if self.cyclic and abs(offset) * 2 > len(self.stations):
+            offset -= len(self.stations) if offset > 0 else -len(self.stations)
+        return offset
+
+
+    def walk(self, station_id, step, count):
+        """ Return the next `count` stations after `station_id`, one stop
+        at a time in direction `step` (+1 or -1). """
+        position, length = self.positions[station_id], len(self.stations)
+        stops = []
+        for _ in range(min(count, length - 1) if self.cyclic else count):
+            position += step
+            if self.cyclic:
+                position %= length
+            elif not 0 <= position < length:
+                break
+            stops.append(self.stations[position])
+        return stops
+
+
+class LineTopology:
+    """ Ordered layout of one line, rebuilt from its unordered connections.
+
+    - `branches`: the line split at its junctions and termini. Every
+      connection of the line belongs to exactly one branch, and a loop
+      (such as a terminal loop) is one cyclic branch.
+    - `sequences`: the terminus-to-terminus stop sequences (the fewest stops
+      between every pair of termini), plus the branches no such sequence
+      covers (e.g. a loop), so that every station is on one.
+    - a position table, giving in O(1) where a station sits on every
+      sequence through it, so "next stops" or "stops between" are slices.
+
+    Attributes:
+        line_id (str) : id of the line
+        termini (list[str]) : stations with a single neighbour on the line
+        junctions (list[str]) : stations with three or more neighbours
+        branches (list[StopSequence]) : see above
+        sequences (list[StopSequence]) : see above
+    """
+
+    def __init__(self, line_id, neighbours):
+        """
+        Args:
+            line_id (str) : id of the line
+            neighbours (dict) : key: station id, value: list of the ids of
+                its neighbours on the line (no duplicates), in a
+                deterministic order
+        """
+        self.line_id = line_id
+        self.neighbours = neighbours
+        self.termini = [station for station, around in neighbours.items() if len(around) == 1]
+        self.junctions = [station for station, around in neighbours.items() if len(around) >= 3]
+        self.branches = self.build_branches()
+        self.sequences = self.build_sequences()
+
+        # key: station id, value: list of (sequence index, position)
+        self.positions = {}
+        for index, sequence in enumerate(self.sequences):
+            for station, position in sequence.positions.items():
+                self.positions.setdefault(station, []).append((index, position))
+
+
+    def build_branches(self):
+        """ Split the line into chains between junctions and termini. """
+        neighbours = self.neighbours
+        ends = [station for station, around in neighbours.items() if len(around) != 2]
+        visited = set()  # (station, neighbour) pairs already walked
+
+        branches = []
+        for end in ends:
+            for neighbour in neighbours[end]:
+                if (end, neighbour) in visited:
+                    continue
+                chain, previous, current = [end], end, neighbour
+                while True:
+                    visited.add((previous, current))
+                    visited.add((current, previous))
+                    if current == end:
+                        break  # a loop back to the same junction
+                    chain.append(current)
+                    if len(neighbours[current]) != 2:
+                        break
+                    previous, current = current, next(station for station in neighbours[current]
+                                                      if station != previous)
+                branches.append(StopSequence(chain, cyclic=current == end))
+
+        # What is left are loops without any junction
+        for start, around in neighbours.items():
+            if len(around) != 2 or (start, around[0]) in visited:
+                continue
+            chain, previous, current = [start], start, around[0]
+            while current != start:
+                visited.add((previous, current))
+                visited.add((current, previous))
+                chain.append(current)
+                previous, current = current, next(station for station in neighbours[current]
+                                                  if station != previous)
+            visited.add((previous, current))
+            visited.add((current, previous))
+            branches.append(StopSequence(chain, cyclic=True))
+        return branches
+
+
+    def build_sequences(self):
+        """ Terminus-to-terminus sequences, then the uncovered branches. """
+        sequences = []
+        for index, first in enumerate(self.termini):
+            for second in self.termini[index + 1:]:
+                path = self.fewest_stops(first, second)
+                if path is not None:
+                    sequences.append(StopSequence(path))
+
+        covered = set()
+        for sequence in sequences:
+            covered.update(zip(sequence.stations, sequence.stations[1:]))
+        for branch in self.branches:
+            legs = list(zip(branch.stations, branch.stations[1:]))
+            if branch.cyclic:
+                legs.append((branch.stations[-1], branch.stations[0]))
+            if any(leg not in covered and leg[::-1] not in covered for leg in legs):
+                sequences.append(branch)
+        return sequences
+
+
+    def fewest_stops(self, first, second):
+        """ Breadth-first search between two stations of the line. """
+        previous = {first: None}
+        queue = deque([first])
+        while queue:
+            current = queue.popleft()
+            if current == second:
+                path = []
+                while current is not None:
+                    path.append(current)
+                    current = previous[current]
+                return path[::-1]
+            for neighbour in self.neighbours[current]:
+                if neighbour not in previous:
+                    previous[neighbour] = current
+                    queue.append(neighbour)
+        return None
+
+
+    @property
+    def stations(self):
+        """ list[str] : every station of the line. """
+        return list(self.neighbours)
+
+
+    def __contains__(self, station_id):
+        return station_id in self.positions
+
+
+    def common_sequence(self, first, second):
+        """ Find the sequence joining two stations of the line in the fewest stops.
+
+        Returns:
+            tuple(StopSequence, int) : the sequence and the signed number of
+                stops from `first` to `second` on it. Returns None if no
+                sequence contains both.
+        """
+        best = None
+        for index, _ in self.positions.get(first, ()):
+            sequence = self.sequences[index]
+            if second in sequence.positions:
+                offset = sequence.offset(first, second)
+                if best is None or abs(offset) < abs(best[1]):
+                    best = (sequence, offset)
+        return best
+
+
+    def hops(self, first, second):
+        """ Number of stops between two stations on one sequence (None if none). """
+        common = self.common_sequence(first, second)
+        return None if common is None else abs(common[1])
+
+
+    def stops_between(self, first, second):
+        """ Return the stations from `first` to `second`, both included.
+
+        Returns:
+            list[str] : station ids in travel order, or an empty list if no
+                sequence of the line contains both stations.
+        """
+        common = self.common_sequence(first, second)
+        if common is None:
+            return []
+        sequence, offset = common
+        return [first] + sequence.walk(first, 1 if offset > 0 else -1, abs(offset))
+
+
+    def next_stops(self, station_id, towards, count=3):
+        """ Return the next stops after a station, travelling towards another.
+
+        Args:
+            station_id (str) : current station
+            towards (str) : any station further along (e.g. a terminus)
+            count (int) : maximum number of stops returned
+
+        Returns:
+            list[str] : station ids (fewer than `count` at the end of the
+                line, empty if the two stations share no sequence).
+        """
+        common = self.common_sequence(station_id, towards)
+        if common is None or common[1] == 0:
+            return []
+        sequence, offset = common
+        return sequence.walk(station_id, 1 if offset > 0 else -1, count)
+
+
+class TopologyIndex:
+    """ Ordered stop sequences and branches of every line of a TubeMap. """
+
+    def __init__(self):
+        self.lines = {}  # key: line id, value: LineTopology
+        self.line_ids = {}  # key: line name, value: line id
+        self.station_lines = {}  # key: station id, value: list of line ids
+
+
+    def build(self, lines, connections):
+        """ (Re)build the index.
+
+        Args:
+            lines (dict) : key: line id, value: Line
+            connections (list[Connection]) : connections of the map
+
+        Returns:
+            None
+        """
+        neighbours = {}  # key: line id, value: {station id: [neighbour ids]}
+        for connection in connections:
+            if len(connection.stations) != 2:
+                continue
+            first, second = sorted(station.id for station in connection.stations)
+            line_neighbours = neighbours.setdefault(connection.line.id, {})
+            around = line_neighbours.setdefault(first, [])
+            if second not in around:  # parallel connections are one link
+                around.append(second)
+                line_neighbours.setdefault(second, []).append(first)
+
+        self.lines = {line_id: LineTopology(line_id, neighbours[line_id])
+                      for line_id in lines if line_id in neighbours}
+        self.line_ids = {line.name: line_id for line_id, line in lines.items()}
+        self.station_lines = {}
+        for line_id, topology in self.lines.items():
+            for station_id in topology.neighbours:
+                self.station_lines.setdefault(station_id, []).append(line_id)
+
+
+    def get(self, line):
+        """ Return the topology of a line given by id or name (None if unknown). """
+        if line in self.lines:
+            return self.lines[line]
+        return self.lines.get(self.line_ids.get(line))
+
+
+    def lines_at(self, station_id):
+        """ Return the ids of the lines serving a station. """
+        return self.station_lines.get(station_id, [])